@@ -3,23 +3,31 @@ HarpoTab - Application Flask principale
 Convertisseur de partitions musicales vers tablature harmonica
 """
 import os
+import re
 import logging
 import traceback
 import threading
 import uuid
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, send_file
 from werkzeug.utils import secure_filename
 from config import config, Config
 
 # Import des modules de traitement
-from modules.ocr_reader import read_partition_from_pdf
-from modules.melody_extractor import extract_melody_from_musicxml
+from modules.deadline import Deadline, DeadlineExceededError
+from modules.ocr_backends import create_backend
+from modules.ocr_cache import OCRCache
+from modules.ocr_progress import OCRCancelledError
+from modules.ocr_reader_http import UploadRelay
+from modules.omr_store import BookStore
+from modules.parse_cache import ParseCache
+from modules.melody_extractor import extract_melody_from_musicxml, read_main_part
+from modules.midi_reader import read_midi
 from modules.music_analyzer import analyze_music
 from modules.transposer import transpose_for_harmonica
 from modules.harmonica_mapper import map_to_harmonica
 from modules.lilypond_generator import generate_pdf
-from modules.progress_tracker import create_tracker, get_tracker, remove_tracker
+from modules.progress_tracker import ProgressTracker, create_tracker, get_tracker, remove_tracker
 
 # Configuration du logging
 logging.basicConfig(
@@ -28,17 +36,139 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cache OCR partagé par tous les threads de conversion (créé à la demande)
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Retourne le cache OCR de l'application (None si désactivé)"""
+    global _ocr_cache
+    if not Config.OCR_CACHE_ENABLED:
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache(
+                cache_dir=Config.OCR_CACHE_FOLDER,
+                max_size=Config.OCR_CACHE_MAX_SIZE,
+                audiveris_version=Config.AUDIVERIS_VERSION
+            )
+        return _ocr_cache
+
+
+# Cache des partitions parsées, partagé par tous les threads (créé à la demande)
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache():
+    """Retourne le cache de parsing de l'application (None si désactivé)"""
+    global _parse_cache
+    if not Config.PARSE_CACHE_ENABLED:
+        return None
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            _parse_cache = ParseCache(
+                cache_dir=Config.PARSE_CACHE_FOLDER,
+                max_size=Config.PARSE_CACHE_MAX_SIZE
+            )
+        return _parse_cache
+
+
+# Backend OCR choisi par Config.OCR_BACKEND (créé à la demande)
+_ocr_backend = None
+_ocr_backend_lock = threading.Lock()
+
+
+def get_ocr_backend():
+    """Retourne le backend OCR de l'application"""
+    global _ocr_backend
+    with _ocr_backend_lock:
+        if _ocr_backend is None:
+            if Config.OCR_BACKEND == 'cli':
+                options = {
+                    'audiveris_path': Config.AUDIVERIS_PATH,
+                    'dpi': Config.OCR_DPI,
+                    'parallel_pages': Config.OCR_PARALLEL_PAGES,
+                    'max_workers': Config.OCR_PAGE_WORKERS,
+                    'preprocess': Config.OCR_PREPROCESS,
+                    # Projets .omr conservés: une partition déjà transcrite est seulement ré-exportée
+                    'book_store': BookStore(
+                        Config.OCR_BOOK_STORE_FOLDER,
+                        max_size=Config.OCR_BOOK_STORE_MAX_SIZE,
+                        audiveris_version=Config.AUDIVERIS_VERSION
+                    ) if Config.OCR_BOOK_STORE_ENABLED else None
+                }
+            elif Config.OCR_BACKEND == 'fixture':
+                options = {
+                    'fixture_path': Config.OCR_FIXTURE_PATH,
+                    'latency': Config.OCR_FIXTURE_LATENCY,
+                    'jitter': Config.OCR_FIXTURE_JITTER
+                }
+            else:
+                options = {}
+            _ocr_backend = create_backend(Config.OCR_BACKEND, **options)
+            logger.info(f"Backend OCR: {_ocr_backend.name}")
+        return _ocr_backend
+
+
+class ConversionRequest(Request):
+    """
+    Requête dont les partitions à lire par OCR sont relayées au service au fil de l'upload
+
+    Si le backend le permet (service HTTP, Config.OCR_STREAM_UPLOADS), le
+    parseur multipart écrit chaque PDF ou image dans un UploadRelay au lieu
+    d'un fichier temporaire : le service reçoit la partition pendant qu'elle
+    est uploadée et rien n'est enregistré dans UPLOAD_FOLDER. Les autres
+    fichiers (MIDI, MusicXML) suivent le chemin habituel.
+    """
+
+    # Délai de la conversion, fixé par la route avant la lecture du formulaire
+    conversion_deadline = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Uploads relayés ouverts par cette requête (coupés en fin de requête s'ils sont inachevés)
+        self.ocr_relays = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if (Config.OCR_STREAM_UPLOADS and self.endpoint == 'convert' and filename
+                and allowed_file(filename) and not is_musicxml_file(filename) and not is_midi_file(filename)):
+            relay = get_ocr_backend().start_upload(secure_filename(filename), self.conversion_deadline)
+            if relay is not None:
+                self.ocr_relays.append(relay)
+                return relay
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+def check_deadline(deadline, tracker, step_id):
+    """Arrête la conversion avant l'étape step_id si elle ne peut plus aboutir à temps"""
+    if deadline.expired:
+        if tracker:
+            tracker.error_step(step_id, "Délai de conversion dépassé")
+        raise DeadlineExceededError("Délai de conversion dépassé")
 
-def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tracker=None):
+
+def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tracker=None, deadline=None,
+                       page_files=None, ocr_uploads=None):
     """
     Pipeline complet de conversion : PDF -> MusicXML -> Mélodie -> Tablature -> PDF final
 
+    Toutes les étapes partagent le délai de la conversion : l'OCR et Lilypond
+    prennent leurs timeouts sur le temps restant, et la conversion s'arrête
+    dès qu'il est dépassé.
+
     Args:
         input_file (Path): Chemin du fichier PDF d'entrée
         harmonica_type (str): Type d'harmonica (ex: 'diatonic')
         harmonica_key (str): Tonalité de l'harmonica (ex: 'C')
         output_dir (Path): Répertoire de sortie
         tracker (ProgressTracker, optional): Tracker de progression
+        deadline (Deadline, optional): Délai de la conversion (défaut: CONVERSION_TIMEOUT à partir de maintenant)
+        page_files (list, optional): Images des pages d'une même partition (upload de
+            plusieurs images), lues en parallèle ; input_file est alors la première
+        ocr_uploads (list, optional): Uploads déjà relayés au service OCR (UploadRelay),
+            dans l'ordre des pages ; input_file n'existe alors pas sur le disque
 
     Returns:
         dict: Résultat avec chemin du PDF généré et métadonnées
@@ -53,45 +183,119 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         'error': None
     }
 
+    if deadline is None:
+        deadline = Deadline(Config.CONVERSION_TIMEOUT)
+
     try:
         # ============================================================
-        # ÉTAPE 1: OCR Musical (Audiveris)
+        # ÉTAPE 1: Lecture de la partition (MIDI/MusicXML direct ou OCR Audiveris)
         # ============================================================
-        if tracker:
-            tracker.start_step('ocr', f"Lecture de {input_file.name}")
-            tracker.start_substep('ocr', 'ocr_init', "Initialisation Audiveris")
-
-        logger.info(f"Étape 1/7: OCR de la partition {input_file.name}")
+        # Un fichier MIDI fournit directement la mélodie (pas de MusicXML)
+        midi_melody = None
 
-        try:
+        if is_midi_file(input_file.name):
+            # Notes déjà numériques: lecture directe, sans OCR
+            check_deadline(deadline, tracker, 'midi')
             if tracker:
-                tracker.complete_substep('ocr', 'ocr_init', "Audiveris prêt")
-                tracker.start_substep('ocr', 'ocr_process', "Analyse de la partition...")
+                tracker.start_step('midi', f"Lecture de {input_file.name}")
 
-            musicxml_data = read_partition_from_pdf(
-                pdf_path=input_file,
-                output_dir=Config.TEMP_FOLDER
-            )
-            if not musicxml_data:
-                raise Exception("Échec de la lecture de la partition")
+            logger.info(f"Étape 1/7: lecture directe du MIDI {input_file.name}")
+
+            midi_melody = read_midi(input_file, keep_rests=True, simplify_chords=True)
+            if not midi_melody:
+                if tracker:
+                    tracker.error_step('midi', "Fichier MIDI invalide")
+                raise Exception("Fichier MIDI invalide")
 
             if tracker:
-                tracker.complete_substep('ocr', 'ocr_process', "Partition analysée")
-                tracker.start_substep('ocr', 'ocr_parse', "Extraction des données MusicXML")
+                tracker.complete_step('midi', f"{len(midi_melody['notes'])} notes lues")
+        elif is_musicxml_file(input_file.name):
+            # Partition déjà numérique: lecture directe, sans OCR
+            check_deadline(deadline, tracker, 'musicxml')
+            if tracker:
+                tracker.start_step('musicxml', f"Lecture de {input_file.name}")
+
+            logger.info(f"Étape 1/7: lecture directe du MusicXML {input_file.name}")
 
-            logger.info(f"✓ Partition lue avec succès")
+            # Pré-lecture de toutes les parties, lecture complète de la partie principale seulement
+            musicxml_data = read_main_part(input_file, cache=get_parse_cache())
+            if not musicxml_data:
+                if tracker:
+                    tracker.error_step('musicxml', "Fichier MusicXML invalide")
+                raise Exception("Fichier MusicXML invalide")
 
             if tracker:
-                tracker.complete_substep('ocr', 'ocr_parse', "MusicXML extrait")
-                tracker.complete_step('ocr', f"{len(musicxml_data.get('parts', []))} parties détectées")
-        except Exception as e:
+                tracker.complete_step('musicxml', f"{musicxml_data['part_count']} parties détectées")
+        else:
+            check_deadline(deadline, tracker, 'ocr')
             if tracker:
-                tracker.error_step('ocr', str(e))
-            raise Exception(f"Échec de l'OCR musical: {str(e)}")
+                tracker.start_step('ocr', f"Lecture de {input_file.name}")
+                tracker.start_substep('ocr', 'ocr_init', "Initialisation Audiveris")
+
+            logger.info(f"Étape 1/7: OCR de la partition {input_file.name}")
+
+            try:
+                if tracker:
+                    tracker.complete_substep('ocr', 'ocr_init', "Audiveris prêt")
+                    tracker.start_substep('ocr', 'ocr_process', "Analyse de la partition...")
+
+                # Progression d'Audiveris en direct; annulation depuis la page de progression
+                def ocr_progress(percent, message):
+                    tracker.update_substep('ocr', 'ocr_process', percent, message)
+
+                ocr_options = {
+                    'cache': get_ocr_cache(),
+                    'progress': ocr_progress if tracker else None,
+                    'cancel_event': tracker.cancel_event if tracker else None,
+                    # Le temps des étapes suivantes (jusqu'au PDF) reste disponible après l'OCR
+                    'deadline': deadline.reserve(Config.CONVERSION_PDF_RESERVE)
+                }
+                if ocr_uploads:
+                    # Fichiers transmis au service pendant l'upload: seul le résultat reste à attendre
+                    musicxml_data = get_ocr_backend().read_uploads(ocr_uploads, **ocr_options)
+                elif page_files and len(page_files) > 1:
+                    # Plusieurs images: une page chacune, lues en parallèle puis fusionnées
+                    musicxml_data = get_ocr_backend().read_pages(
+                        page_files,
+                        Config.TEMP_FOLDER,
+                        max_workers=Config.OCR_PAGE_WORKERS,
+                        **ocr_options
+                    )
+                else:
+                    musicxml_data = get_ocr_backend().read(input_file, Config.TEMP_FOLDER, **ocr_options)
+                if not musicxml_data:
+                    raise Exception("Échec de la lecture de la partition")
+                if musicxml_data.get('failed_pages'):
+                    # Une tablature amputée d'une page serait fausse: la conversion échoue
+                    pages = ', '.join(str(number) for number in musicxml_data['failed_pages'])
+                    raise Exception(f"Page(s) illisible(s): {pages} sur {musicxml_data['pages']}")
+
+                if tracker:
+                    tracker.complete_substep('ocr', 'ocr_process', "Partition analysée")
+                    tracker.start_substep('ocr', 'ocr_parse', "Extraction des données MusicXML")
+
+                logger.info(f"✓ Partition lue avec succès")
+
+                if tracker:
+                    tracker.complete_substep('ocr', 'ocr_parse', "MusicXML extrait")
+                    tracker.complete_step('ocr', f"{len(musicxml_data.get('parts', []))} parties détectées")
+            except OCRCancelledError:
+                if tracker:
+                    tracker.error_step('ocr', "Conversion annulée")
+                raise Exception("Conversion annulée")
+            except DeadlineExceededError:
+                if tracker:
+                    tracker.error_step('ocr', "Délai de conversion dépassé")
+                raise Exception("Délai de conversion dépassé")
+            except Exception as e:
+                if tracker:
+                    tracker.error_step('ocr', str(e))
+                raise Exception(f"Échec de l'OCR musical: {str(e)}")
 
         # ============================================================
         # ÉTAPE 2: Extraction de la mélodie
         # ============================================================
+        check_deadline(deadline, tracker, 'melody')
         if tracker:
             tracker.start_step('melody', "Extraction de la ligne mélodique")
             tracker.start_substep('melody', 'melody_select', "Sélection de la partie principale")
@@ -103,11 +307,14 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
                 tracker.complete_substep('melody', 'melody_select', "Partie sélectionnée")
                 tracker.start_substep('melody', 'melody_extract', "Extraction des notes...")
 
-            melody_data = extract_melody_from_musicxml(
-                musicxml_data=musicxml_data,
-                keep_rests=True,
-                simplify_chords=True
-            )
+            if midi_melody is not None:
+                melody_data = midi_melody
+            else:
+                melody_data = extract_melody_from_musicxml(
+                    musicxml_data=musicxml_data,
+                    keep_rests=True,
+                    simplify_chords=True
+                )
             if not melody_data or not melody_data.get('notes'):
                 raise Exception("Aucune mélodie détectée dans la partition")
 
@@ -124,6 +331,7 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         # ============================================================
         # ÉTAPE 3: Analyse musicale
         # ============================================================
+        check_deadline(deadline, tracker, 'analysis')
         if tracker:
             tracker.start_step('analysis', "Analyse de la tessiture et tonalité")
             tracker.start_substep('analysis', 'analysis_key', "Détection de la tonalité...")
@@ -155,6 +363,7 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         # ============================================================
         # ÉTAPE 4: Charger le mapping de l'harmonica
         # ============================================================
+        check_deadline(deadline, tracker, 'mapping_load')
         if tracker:
             tracker.start_step('mapping_load', f"Chargement harmonica {harmonica_type} {harmonica_key}")
 
@@ -182,6 +391,7 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         # ============================================================
         # ÉTAPE 5: Transposition automatique
         # ============================================================
+        check_deadline(deadline, tracker, 'transpose')
         if tracker:
             tracker.start_step('transpose', "Vérification de la jouabilité")
             tracker.start_substep('transpose', 'transpose_check', "Analyse de la jouabilité...")
@@ -232,6 +442,7 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         # ============================================================
         # ÉTAPE 6: Génération de la tablature
         # ============================================================
+        check_deadline(deadline, tracker, 'tablature')
         if tracker:
             tracker.start_step('tablature', "Génération de la tablature")
             tracker.start_substep('tablature', 'tablature_map', "Mapping notes → trous d'harmonica...")
@@ -266,6 +477,7 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
         # ============================================================
         # ÉTAPE 7: Génération du PDF final (Lilypond)
         # ============================================================
+        check_deadline(deadline, tracker, 'pdf')
         if tracker:
             tracker.start_step('pdf', "Génération du PDF final")
             tracker.start_substep('pdf', 'pdf_format', "Formatage Lilypond...")
@@ -296,7 +508,8 @@ def process_conversion(input_file, harmonica_type, harmonica_key, output_dir, tr
                 melody=final_melody['notes'],
                 tabs=tablature,
                 metadata=metadata,
-                output_path=output_pdf
+                output_path=output_pdf,
+                deadline=deadline
             )
 
             if not success or not output_pdf.exists():
@@ -349,9 +562,16 @@ def create_app(config_name='default'):
     """Factory pour créer l'application Flask"""
 
     app = Flask(__name__)
+    app.request_class = ConversionRequest
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
 
+    @app.teardown_request
+    def abort_ocr_relays(exc):
+        """Coupe les envois au service OCR d'un upload interrompu (client déconnecté)"""
+        for relay in getattr(request, 'ocr_relays', ()):
+            relay.abort()
+
     # Routes
     @app.route('/')
     def index():
@@ -365,31 +585,69 @@ def create_app(config_name='default'):
             # Afficher le formulaire
             return render_template('convert.html', harmonica_types=Config.HARMONICA_TYPES)
 
-        # POST: traiter l'upload
-        if 'file' not in request.files:
-            flash('Aucun fichier sélectionné', 'error')
+        # Le délai de la conversion court dès l'upload (transmis au service OCR s'il reçoit le fichier)
+        deadline = Deadline(Config.CONVERSION_TIMEOUT)
+        request.conversion_deadline = deadline
+
+        # POST: traiter l'upload (un fichier, ou plusieurs images formant les pages d'une partition)
+        # Pages dans l'ordre naturel des noms (IMG_2 avant IMG_10)
+        files = sorted((file for file in request.files.getlist('file') if file.filename),
+                       key=lambda file: natural_sort_key(file.filename))
+        # Fichiers déjà transmis au service OCR pendant l'upload (voir ConversionRequest)
+        relays = [file.stream for file in files if isinstance(file.stream, UploadRelay)]
+
+        def reject(message):
+            for relay in relays:
+                relay.cancel()
+            flash(message, 'error')
             return redirect(request.url)
 
-        file = request.files['file']
+        if not files:
+            return reject('Aucun fichier sélectionné')
 
-        if file.filename == '':
-            flash('Aucun fichier sélectionné', 'error')
-            return redirect(request.url)
+        if not all(allowed_file(file.filename) for file in files):
+            return reject('Format de fichier non supporté')
 
-        if not allowed_file(file.filename):
-            flash('Format de fichier non supporté', 'error')
-            return redirect(request.url)
+        if len(files) > 1 and not all(is_image_file(file.filename) for file in files):
+            return reject('Plusieurs fichiers: seules des images PNG ou JPEG (une par page) sont acceptées')
+
+        if len(files) > Config.MAX_UPLOAD_PAGES:
+            return reject(f'Trop de pages: {Config.MAX_UPLOAD_PAGES} images au maximum')
+
+        if relays and (len(relays) < len(files) or not all(relay.wait() for relay in relays)):
+            # Le contenu déjà relayé n'a pas été conservé: l'upload doit être refait
+            return reject('Service OCR indisponible, réessayez plus tard')
 
         # Récupérer les paramètres
         harmonica_type = request.form.get('harmonica_type', 'diatonic')
         harmonica_key = request.form.get('harmonica_key', 'C')
 
-        # Sauvegarder le fichier
-        filename = secure_filename(file.filename)
-        upload_path = Config.UPLOAD_FOLDER / filename
-        file.save(str(upload_path))
-
-        logger.info(f"Fichier uploadé: {filename}")
+        # Sauvegarder le(s) fichier(s)
+        page_files = None
+        if relays:
+            # Déjà reçus par le service OCR: rien à enregistrer localement
+            filename = secure_filename(files[0].filename)
+            upload_path = Config.UPLOAD_FOLDER / filename
+        elif len(files) == 1:
+            filename = secure_filename(files[0].filename)
+            upload_path = Config.UPLOAD_FOLDER / filename
+            files[0].save(str(upload_path))
+        else:
+            # Pages dans un dossier propre à l'upload
+            pages_dir = Config.UPLOAD_FOLDER / uuid.uuid4().hex
+            pages_dir.mkdir(parents=True)
+            page_files = []
+            for number, file in enumerate(files, start=1):
+                page_path = pages_dir / secure_filename(file.filename)
+                if page_path in page_files:
+                    page_path = page_path.with_name(f"{page_path.stem}_{number}{page_path.suffix}")
+                file.save(str(page_path))
+                page_files.append(page_path)
+            # La première page donne son nom à la tablature
+            upload_path = page_files[0]
+            filename = upload_path.name
+
+        logger.info(f"Fichier uploadé: {filename}" + (f" ({len(files)} pages)" if len(files) > 1 else ""))
         logger.info(f"Harmonica: {harmonica_type} en {harmonica_key}")
 
         # ============================================================
@@ -397,7 +655,13 @@ def create_app(config_name='default'):
         # ============================================================
         # Créer un tracker de progression
         session_id = str(uuid.uuid4())
-        tracker = create_tracker(session_id)
+        if is_midi_file(filename):
+            pipeline_steps = ProgressTracker.MIDI_PIPELINE_STEPS
+        elif is_musicxml_file(filename):
+            pipeline_steps = ProgressTracker.MUSICXML_PIPELINE_STEPS
+        else:
+            pipeline_steps = None
+        tracker = create_tracker(session_id, pipeline_steps, deadline)
 
         # Préparer le nom du fichier de sortie
         output_filename = f"{upload_path.stem}_tablature.pdf"
@@ -412,7 +676,10 @@ def create_app(config_name='default'):
                     harmonica_type=harmonica_type,
                     harmonica_key=harmonica_key,
                     output_dir=Config.OUTPUT_FOLDER,
-                    tracker=tracker
+                    tracker=tracker,
+                    deadline=deadline,
+                    page_files=page_files,
+                    ocr_uploads=relays or None
                 )
                 logger.info(f"process_conversion terminé: success={conversion_result.get('success')}")
 
@@ -477,12 +744,24 @@ def create_app(config_name='default'):
         filename = request.args.get('filename', '')
         return render_template('progress.html', session_id=session_id, filename=filename)
 
+    @app.route('/cancel/<session_id>', methods=['POST'])
+    def cancel_conversion(session_id):
+        """Annule une conversion en cours (l'OCR est interrompu)"""
+        tracker = get_tracker(session_id)
+        if not tracker:
+            return {'error': 'Session not found'}, 404
+
+        logger.info(f"Annulation demandée pour session {session_id}")
+        tracker.cancel()
+        return {'session_id': session_id, 'cancelled': True}
+
     @app.route('/progress/<session_id>')
     def progress_stream(session_id):
         """Stream SSE de progression en temps réel"""
         from flask import Response, stream_with_context
         import json
         import time
+        import itertools
 
         def generate():
             logger.info(f"SSE stream démarré pour session {session_id}")
@@ -507,9 +786,14 @@ def create_app(config_name='default'):
                 yield f"data: {json.dumps({'error': str(e)})}\n\n"
                 return
 
-            # Polling toutes les 0.5 secondes
+            # Polling toutes les 0.5 secondes, jusqu'au délai de la conversion
+            # (plus une marge pour transmettre l'erreur de délai dépassé)
+            stream_deadline = (tracker.deadline or Deadline(Config.CONVERSION_TIMEOUT)).reserve(-5)
             last_status = initial_status
-            for i in range(300):  # Max 2.5 minutes
+            for i in itertools.count():
+                if stream_deadline.expired:
+                    logger.warning(f"Délai de conversion dépassé, fin du stream pour session {session_id}")
+                    break
                 time.sleep(0.5)
 
                 tracker = get_tracker(session_id)
@@ -534,6 +818,10 @@ def create_app(config_name='default'):
                     logger.info(f"Progression terminée à 100% pour session {session_id}")
                     break
 
+                if current_status['cancelled']:
+                    logger.info(f"Conversion annulée pour session {session_id}")
+                    break
+
             logger.info(f"SSE stream terminé pour session {session_id}")
 
         response = Response(
@@ -564,6 +852,29 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 
+def is_image_file(filename):
+    """Vérifie si le fichier est une image (page d'une partition multi-images)"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in Config.IMAGE_EXTENSIONS
+
+
+def natural_sort_key(filename):
+    """Clé de tri naturel: les nombres des noms sont comparés par valeur (page2 < page10)"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', filename)]
+
+
+def is_musicxml_file(filename):
+    """Vérifie si le fichier est une partition MusicXML (lue sans OCR)"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in Config.MUSICXML_EXTENSIONS
+
+
+def is_midi_file(filename):
+    """Vérifie si le fichier est un fichier MIDI (notes lues sans OCR)"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in Config.MIDI_EXTENSIONS
+
+
 if __name__ == '__main__':
     # Mode développement
     app = create_app('development')
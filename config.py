@@ -24,7 +24,15 @@ class Config:
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB pour PDF/images
 
     # Extensions autorisées (Phase 1)
-    ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+    ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'mxl', 'xml', 'musicxml', 'mid', 'midi'}
+
+    # Partitions déjà numériques: lues directement, sans passer par l'OCR
+    MUSICXML_EXTENSIONS = {'mxl', 'xml', 'musicxml'}
+    MIDI_EXTENSIONS = {'mid', 'midi'}
+
+    # Upload de plusieurs images: les pages d'une même partition, lues en parallèle
+    IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+    MAX_UPLOAD_PAGES = int(os.environ.get('MAX_UPLOAD_PAGES', '20'))
 
     # Extensions Phase 2 (futures)
     ALLOWED_EXTENSIONS_AUDIO = {'mp3', 'wav', 'ogg'}
@@ -32,11 +40,46 @@ class Config:
     # === Configuration Audiveris ===
     AUDIVERIS_PATH = os.environ.get('AUDIVERIS_PATH') or '/usr/local/bin/audiveris'
     AUDIVERIS_BATCH = True
+    AUDIVERIS_VERSION = os.environ.get('AUDIVERIS_VERSION') or '5.9.0'
+
+    # Backend OCR: 'cli' (Audiveris local), 'http' (service Audiveris) ou
+    # 'fixture' (MusicXML pré-enregistrés, pour les tests de charge sans JVM)
+    OCR_BACKEND = os.environ.get('OCR_BACKEND') or 'cli'
+    OCR_FIXTURE_PATH = Path(os.environ.get('OCR_FIXTURE_PATH') or BASE_DIR / 'tests' / 'fixtures')
+    OCR_FIXTURE_LATENCY = float(os.environ.get('OCR_FIXTURE_LATENCY', '0'))
+    OCR_FIXTURE_JITTER = float(os.environ.get('OCR_FIXTURE_JITTER', '0'))
+    # Relayer les partitions uploadées au service OCR au fil de leur réception,
+    # sans les enregistrer dans UPLOAD_FOLDER (backend http uniquement)
+    OCR_STREAM_UPLOADS = os.environ.get('OCR_STREAM_UPLOADS', 'True').lower() == 'true'
+
+    # Cache des résultats OCR (clé: SHA-256 du fichier + version Audiveris + options)
+    OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'True').lower() == 'true'
+    OCR_CACHE_FOLDER = TEMP_FOLDER / 'ocr_cache'
+    OCR_CACHE_MAX_SIZE = int(os.environ.get('OCR_CACHE_MAX_SIZE_MB', '500')) * 1024 * 1024
+
+    # Partitions MusicXML/MXL uploadées déjà parsées, conservées au format binaire
+    # (clé: SHA-256 du fichier, un dossier par version du parser)
+    PARSE_CACHE_ENABLED = os.environ.get('PARSE_CACHE_ENABLED', 'True').lower() == 'true'
+    PARSE_CACHE_FOLDER = TEMP_FOLDER / 'parse_cache'
+    PARSE_CACHE_MAX_SIZE = int(os.environ.get('PARSE_CACHE_MAX_SIZE_MB', '200')) * 1024 * 1024
+
+    # Projets Audiveris (.omr) conservés par contenu: ré-export en quelques
+    # secondes au lieu d'une transcription complète (backend cli)
+    OCR_BOOK_STORE_ENABLED = os.environ.get('OCR_BOOK_STORE_ENABLED', 'True').lower() == 'true'
+    OCR_BOOK_STORE_FOLDER = TEMP_FOLDER / 'omr_books'
+    OCR_BOOK_STORE_MAX_SIZE = int(os.environ.get('OCR_BOOK_STORE_MAX_SIZE_MB', '1000')) * 1024 * 1024
 
     # === Configuration Lilypond ===
     LILYPOND_PATH = os.environ.get('LILYPOND_PATH') or 'lilypond'
     LILYPOND_VERSION = '2.24.0'
 
+    # === Délai des conversions ===
+    # Délai unique d'une conversion, de l'upload au PDF: les timeouts d'Audiveris,
+    # du service OCR et de Lilypond sont pris sur le temps restant
+    CONVERSION_TIMEOUT = int(os.environ.get('CONVERSION_TIMEOUT', '900'))
+    # Temps gardé pour les étapes suivant l'OCR (mélodie, tablature, Lilypond)
+    CONVERSION_PDF_RESERVE = int(os.environ.get('CONVERSION_PDF_RESERVE', '30'))
+
     # === Configuration des harmonicas ===
     HARMONICA_MAPS_DIR = DATA_FOLDER / 'harmonica_maps'
 
@@ -55,6 +98,11 @@ class Config:
     # === Options de traitement ===
     # OCR
     OCR_DPI = 300
+    # Découper les PDF multi-pages et lancer un processus Audiveris par page
+    OCR_PARALLEL_PAGES = os.environ.get('OCR_PARALLEL_PAGES', 'False').lower() == 'true'
+    OCR_PAGE_WORKERS = int(os.environ.get('OCR_PAGE_WORKERS', '0')) or os.cpu_count() or 1
+    # Normaliser les images avant l'OCR (redressement, binarisation, rognage, OCR_DPI)
+    OCR_PREPROCESS = os.environ.get('OCR_PREPROCESS', 'False').lower() == 'true'
     OCR_THRESHOLD = 0.8  # Confiance minimale
 
     # Transposition
@@ -5,9 +5,21 @@ Serveur HTTP pour Audiveris OCR
 API REST simple qui expose Audiveris en ligne de commande.
 """
 
+import bisect
+import hashlib
+import json
+import math
 import os
+import shutil
+import signal
 import subprocess
+import tempfile
+import threading
+import time
+import uuid
 import logging
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError, wait as futures_wait
 from pathlib import Path
 from flask import Flask, request, jsonify, send_file
 from werkzeug.utils import secure_filename
@@ -26,9 +38,840 @@ UPLOAD_FOLDER = Path('/uploads')
 OUTPUT_FOLDER = Path('/outputs')
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Blocs d'écriture des uploads envoyés en flux
+MUSICXML_MIMETYPES = {
+    '.mxl': 'application/vnd.recordare.musicxml',
+    '.xml': 'application/vnd.recordare.musicxml+xml'
+}
 
-UPLOAD_FOLDER.mkdir(exist_ok=True)
-OUTPUT_FOLDER.mkdir(exist_ok=True)
+WORK_FOLDER = Path(os.environ.get('AUDIVERIS_WORK_FOLDER', '/tmp/audiveris-work'))
+AUDIVERIS_VERSION = '5.9.0'
+JOB_TIMEOUT = 300  # 5 minutes max par travail
+# En-tête indiquant le temps (secondes) au-delà duquel le client n'attend plus le résultat
+DEADLINE_HEADER = 'X-Request-Timeout'
+JOB_RETENTION = 3600  # Durée de conservation des travaux terminés (secondes)
+MAX_POLL_WAIT = 60  # Attente maximale d'un long-poll sur GET /jobs/<id>
+
+# Pool de workers Audiveris
+AUDIVERIS_WORKERS = int(os.environ.get('AUDIVERIS_WORKERS', '2'))
+AUDIVERIS_JOBS_PER_JVM = int(os.environ.get('AUDIVERIS_JOBS_PER_JVM', '4'))
+AUDIVERIS_MAX_RSS_MB = int(os.environ.get('AUDIVERIS_MAX_RSS_MB', '3072'))
+AUDIVERIS_HEAP = os.environ.get('AUDIVERIS_HEAP', '2g')
+AUDIVERIS_CDS_ARCHIVE = Path(os.environ.get('AUDIVERIS_CDS_ARCHIVE', '/var/cache/audiveris/audiveris.jsa'))
+
+# Contrôle d'admission: travaux en attente au-delà desquels les soumissions
+# sont refusées (429), au total et par client (0 = pas de limite par client)
+AUDIVERIS_MAX_QUEUE = int(os.environ.get('AUDIVERIS_MAX_QUEUE', '16'))
+AUDIVERIS_MAX_QUEUE_PER_CLIENT = int(os.environ.get('AUDIVERIS_MAX_QUEUE_PER_CLIENT', '0'))
+# Durée estimée d'un travail tant qu'aucun n'a été mesuré (secondes)
+AUDIVERIS_JOB_ESTIMATE = float(os.environ.get('AUDIVERIS_JOB_ESTIMATE', '60'))
+
+# Ménage de /outputs: durée de conservation des MusicXML (secondes) et quota
+# disque (MB), vérifiés toutes les AUDIVERIS_JANITOR_INTERVAL secondes (0 = désactivé) ;
+# les uploads orphelins de /uploads sont supprimés après JOB_RETENTION secondes
+AUDIVERIS_OUTPUT_TTL = int(os.environ.get('AUDIVERIS_OUTPUT_TTL', '86400'))
+AUDIVERIS_OUTPUT_QUOTA_MB = int(os.environ.get('AUDIVERIS_OUTPUT_QUOTA_MB', '0'))
+AUDIVERIS_JANITOR_INTERVAL = int(os.environ.get('AUDIVERIS_JANITOR_INTERVAL', '300'))
+# Âge minimal d'un fichier évincé pour respecter le quota: laisse au client le
+# temps de récupérer un résultat tout juste produit
+OUTPUT_EVICTION_GRACE = 600
+LIST_PAGE_SIZE = 100  # Taille par défaut d'une page de /list
+
+# Projets Audiveris (.omr) conservés par contenu: une partition déjà transcrite
+# est seulement ré-exportée (0 = désactivé)
+AUDIVERIS_BOOK_FOLDER = Path(os.environ.get('AUDIVERIS_BOOK_FOLDER', '/var/cache/audiveris/books'))
+AUDIVERIS_BOOK_STORE_MB = int(os.environ.get('AUDIVERIS_BOOK_STORE_MB', '2048'))
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_LIST_PAGE_SIZE = 1000
+
+
+class QueueFullError(Exception):
+    """Levée lorsque la file d'attente est pleine; retry_after estime le délai avant une place libre"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FairJobQueue:
+    """
+    File d'attente bornée, équitable entre clients
+
+    Chaque client a sa propre sous-file ; les travaux sont servis à tour de
+    rôle d'un client à l'autre, si bien qu'un client qui soumet beaucoup de
+    fichiers ne retarde pas les autres. Au-delà de `max_size` travaux en
+    attente (ou `max_per_client` pour un même client), put() refuse le travail.
+    """
+
+    def __init__(self, max_size, max_per_client=0):
+        self.max_size = max_size
+        self.max_per_client = max_per_client
+        self.clients = OrderedDict()  # client → deque de travaux, dans l'ordre de service
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def put(self, job, force=False):
+        """
+        Ajoute un travail dans la sous-file de son client
+
+        Paramètres:
+            - force: Ignorer les limites et servir le travail en priorité (relance)
+
+        Retourne:
+            False si la file (ou la part du client) est pleine
+        """
+        with self.condition:
+            if not force and not self._has_room(job.client_id):
+                return False
+
+            pending = self.clients.get(job.client_id)
+            if pending is None:
+                pending = self.clients[job.client_id] = deque()
+            if force:
+                pending.appendleft(job)
+            else:
+                pending.append(job)
+            self.size += 1
+            self.condition.notify()
+            return True
+
+    def has_room(self, client_id):
+        """Indique si un travail de ce client serait accepté"""
+        with self.condition:
+            return self._has_room(client_id)
+
+    def _has_room(self, client_id):
+        """has_room (verrou déjà acquis)"""
+        if self.size >= self.max_size:
+            return False
+        pending = self.clients.get(client_id)
+        return not (self.max_per_client and pending and len(pending) >= self.max_per_client)
+
+    def get(self, timeout=None):
+        """
+        Retire le prochain travail (client suivant dans le tourniquet)
+
+        Retourne:
+            Le travail, ou None si la file est restée vide pendant `timeout` secondes
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.size > 0, timeout=timeout):
+                return None
+            client_id, pending = next(iter(self.clients.items()))
+            job = pending.popleft()
+            self.size -= 1
+            # Le client passe en fin de tourniquet (ou sort s'il n'a plus rien en file)
+            del self.clients[client_id]
+            if pending:
+                self.clients[client_id] = pending
+            return job
+
+    def qsize(self):
+        with self.condition:
+            return self.size
+
+    def clients_waiting(self):
+        """Nombre de travaux en attente par client"""
+        with self.condition:
+            return {client_id: len(pending) for client_id, pending in self.clients.items()}
+
+
+class OCRJob:
+    """Travail OCR soumis au pool de workers"""
+
+    def __init__(self, input_path, output_dir, job_id=None, client_id=None, timeout=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.client_id = client_id or 'anonymous'
+        self.future = Future()
+        self.attempts = 0
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.book_key = None  # Clé du projet .omr de l'entrée (None si non conservé)
+        self.book = None  # Projet .omr existant: ré-export au lieu d'une transcription
+        # Instant (horloge monotone) où le client abandonne le résultat (None: pas de délai)
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        self.deadline_exceeded = False
+
+    @property
+    def expired(self):
+        """Indique si le client n'attend plus le résultat de ce travail"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def status(self):
+        """État du travail: queued, running, done, failed ou cancelled"""
+        if self.future.cancelled():
+            return 'cancelled'
+        if self.future.done():
+            return 'failed' if self.future.exception() else 'done'
+        return 'running' if self.started_at else 'queued'
+
+    def cancel(self):
+        """
+        Annule le travail
+
+        Un travail en file est simplement ignoré par les workers ; un travail en
+        cours provoque l'arrêt de la JVM qui le traite (voir _supervise).
+
+        Retourne:
+            False si le travail était déjà terminé
+        """
+        return self.future.cancel()
+
+    def to_dict(self):
+        """Représentation JSON du travail"""
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'input_file': self.input_path.name,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at
+        }
+        if self.status == 'done':
+            relative_path = str(self.future.result().relative_to(OUTPUT_FOLDER))
+            data['output_file'] = relative_path
+            data['output_path'] = f'/outputs/{relative_path}'
+        elif self.status == 'failed':
+            data['error'] = 'Audiveris processing failed'
+            data['details'] = str(self.future.exception())
+        elif self.status == 'cancelled' and self.deadline_exceeded:
+            data['error'] = 'Client deadline exceeded'
+        return data
+
+    @property
+    def batch_stem(self):
+        """Nom unique de l'entrée dans un lot (Audiveris nomme ses sorties d'après lui)"""
+        return f"{self.id}-{self.input_path.stem}"
+
+
+class AudiverisWorkerPool:
+    """
+    Pool de workers Audiveris alimenté par une file interne
+
+    Audiveris ne possède pas de mode serveur : une JVM ne peut pas recevoir de
+    nouveaux travaux une fois lancée. Chaque worker vide donc la file au moment
+    où il démarre une JVM et lui confie jusqu'à `jobs_per_jvm` fichiers en une
+    seule invocation `-batch`. Le démarrage de la JVM et le chargement des
+    classes sont ainsi payés une fois par lot et non une fois par fichier.
+
+    Une JVM est recyclée après `jobs_per_jvm` travaux, ou tuée dès que sa
+    mémoire résidente dépasse `max_rss_mb` : les travaux non terminés sont
+    alors remis en file. L'archive CDS (Class Data Sharing) partagée réduit en
+    plus le temps de chargement des classes à chaque lancement.
+
+    Le nombre de workers borne le nombre de JVM simultanées ; la file est
+    bornée (voir FairJobQueue) et une soumission refusée indique, d'après la
+    durée moyenne récente des travaux, quand réessayer.
+    """
+
+    MAX_ATTEMPTS = 2
+    # Poids des nouvelles mesures dans la moyenne mobile de la durée d'un travail
+    DURATION_SMOOTHING = 0.3
+
+    def __init__(self, workers, jobs_per_jvm, max_rss_mb, max_queue=16, max_queue_per_client=0,
+                 job_estimate=60.0, output_index=None, book_store=None):
+        self.workers = workers
+        self.jobs_per_jvm = max(1, jobs_per_jvm)
+        self.max_rss_mb = max_rss_mb
+        self.queue = FairJobQueue(max_queue, max_queue_per_client)
+        self.avg_job_duration = job_estimate
+        self.output_index = output_index  # Index de /outputs tenu à jour (OutputIndex, optionnel)
+        self.book_store = book_store  # Projets .omr conservés (BookStore, optionnel)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.stats = {
+            'jvm_launches': 0,
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'memory_recycles': 0,
+            'jobs_rejected': 0,
+            'jobs_reexported': 0,
+            'jobs_expired': 0
+        }
+
+    def start(self):
+        """Démarre les threads workers"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"audiveris-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Audiveris pool started: {self.workers} worker(s), {self.jobs_per_jvm} jobs per JVM")
+
+    def submit(self, input_path, output_dir, job_id=None, client_id=None, timeout=None):
+        """
+        Met un fichier en file d'attente
+
+        Paramètres:
+            timeout: Secondes au-delà desquelles le client n'attend plus le
+                résultat: le travail est alors abandonné (None: pas de délai)
+
+        Retourne:
+            OCRJob dont le future donne le chemin du MusicXML généré
+
+        Lève:
+            QueueFullError: La file (ou la part du client) est pleine
+        """
+        job = OCRJob(input_path, output_dir, job_id, client_id, timeout)
+        if self.book_store is not None:
+            job.book_key = self.book_store.make_key(input_path)
+            job.book = self.book_store.get(job.book_key)
+        if not self.queue.put(job):
+            self._reject()
+        return job
+
+    def admit(self, client_id):
+        """
+        Vérifie, avant de recevoir le fichier, qu'un travail du client serait accepté
+
+        Lève:
+            QueueFullError: La file (ou la part du client) est pleine
+        """
+        if not self.queue.has_room(client_id):
+            self._reject()
+
+    def _reject(self):
+        with self.lock:
+            self.stats['jobs_rejected'] += 1
+        raise QueueFullError('OCR queue is full', self.retry_after())
+
+    def retry_after(self):
+        """
+        Délai estimé (secondes) avant qu'une place se libère dans la file
+
+        Une place se libère chaque fois qu'un worker prend un travail, soit en
+        moyenne toutes les avg_job_duration / workers secondes.
+        """
+        with self.lock:
+            return max(1, math.ceil(self.avg_job_duration / self.workers))
+
+    def _record_duration(self, duration, job_count):
+        """Met à jour la moyenne mobile de la durée d'un travail"""
+        with self.lock:
+            per_job = duration / job_count
+            self.avg_job_duration += self.DURATION_SMOOTHING * (per_job - self.avg_job_duration)
+
+    def get_stats(self):
+        """Statistiques du pool"""
+        with self.lock:
+            stats = dict(self.stats, workers=self.workers, avg_job_duration=round(self.avg_job_duration, 1))
+        return dict(stats, queued=self.queue.qsize(), max_queue=self.queue.max_size,
+                    queued_by_client=self.queue.clients_waiting())
+
+    def _worker_loop(self):
+        """Boucle d'un worker: prend un lot dans la file et l'exécute"""
+        while True:
+            batch = self._next_batch()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                logger.exception("Unexpected error in Audiveris worker")
+                for job in batch:
+                    if not job.future.done():
+                        self._resolve(job, error=e)
+
+    def _next_batch(self):
+        """Attend un travail puis complète le lot avec ceux déjà en file"""
+        batch = []
+        while not batch:
+            batch = [job for job in [self.queue.get()] if self._is_runnable(job)]
+        while len(batch) < self.jobs_per_jvm:
+            job = self.queue.get(timeout=0)
+            if job is None:
+                break
+            if self._is_runnable(job):
+                batch.append(job)
+        now = time.time()
+        for job in batch:
+            job.started_at = now
+        return batch
+
+    def _jvm_env(self):
+        """Environnement de la JVM: heap bornée et archive CDS partagée"""
+        AUDIVERIS_CDS_ARCHIVE.parent.mkdir(parents=True, exist_ok=True)
+        env = os.environ.copy()
+        jvm_options = [
+            f"-Xmx{AUDIVERIS_HEAP}",
+            f"-XX:SharedArchiveFile={AUDIVERIS_CDS_ARCHIVE}",
+            "-XX:+AutoCreateSharedArchive",
+        ]
+        env['JAVA_TOOL_OPTIONS'] = ' '.join(jvm_options + [env.get('JAVA_TOOL_OPTIONS', '')]).strip()
+        return env
+
+    def _run_batch(self, batch):
+        """Exécute un lot de travaux dans une seule JVM Audiveris"""
+        batch_dir = Path(tempfile.mkdtemp(prefix='batch-', dir=WORK_FOLDER))
+        try:
+            inputs = []
+            for job in batch:
+                job.attempts += 1
+                inputs.append(str(self._link_input(job, batch_dir)))
+
+            save = ['-save'] if self.book_store is not None else []
+            cmd = ['audiveris', '-batch', '-export'] + save + ['-output', str(batch_dir)] + inputs
+            logger.info(f"Running command: {' '.join(cmd)}")
+
+            with self.lock:
+                self.stats['jvm_launches'] += 1
+
+            log_path = batch_dir / 'audiveris.log'
+            with open(log_path, 'w') as log_file:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    env=self._jvm_env(),
+                    # Groupe de processus propre: le script et la JVM qu'il lance sont tués ensemble
+                    start_new_session=True
+                )
+                started = time.monotonic()
+                recycled = self._supervise(process, batch, timeout=JOB_TIMEOUT * len(batch))
+                if not recycled and process.returncode == 0:
+                    self._record_duration(time.monotonic() - started, len(batch))
+
+            log_tail = log_path.read_text(errors='replace')[-2000:]
+            self._finish_batch(batch, batch_dir, recycled, log_tail)
+        finally:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+
+    def _link_input(self, job, batch_dir):
+        """
+        Place l'entrée d'un travail dans le dossier du lot
+
+        Le projet .omr a été trouvé à la soumission : s'il a été évincé
+        depuis, le travail repart de son fichier d'origine (transcription).
+
+        Retourne:
+            Chemin à passer à Audiveris
+        """
+        if job.book is not None:
+            # Copie du projet: Audiveris le réécrit en le ré-exportant
+            link = batch_dir / f"{job.batch_stem}.omr"
+            try:
+                shutil.copyfile(job.book, link)
+                return link
+            except OSError as e:
+                logger.warning(f"Book {job.book.name} no longer available ({e}), transcribing job {job.id}")
+                job.book = None
+        link = batch_dir / f"{job.batch_stem}{job.input_path.suffix}"
+        link.symlink_to(job.input_path.resolve())
+        return link
+
+    def _finish_batch(self, batch, batch_dir, recycled, log_tail):
+        """Termine chaque travail du lot: l'échec de l'un ne prive pas les autres de leur résultat"""
+        for job in batch:
+            try:
+                self._finish_job(job, batch_dir, recycled, log_tail)
+            except Exception as e:
+                logger.exception(f"Unable to finish job {job.id}")
+                self._resolve(job, error=e)
+
+    def _resolve(self, job, result=None, error=None):
+        """
+        Donne son résultat (ou son erreur) à un travail
+
+        Un travail peut être annulé (DELETE /jobs/<id>, délai du client) à tout
+        moment, y compris pendant la récupération de sa sortie.
+
+        Retourne:
+            False si le travail a été annulé entre-temps
+        """
+        try:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+        except InvalidStateError:
+            logger.info(f"Job {job.id} cancelled before its result was delivered")
+            return False
+        return True
+
+    def _is_runnable(self, job):
+        """Indique si un travail sorti de la file doit être exécuté (ni annulé, ni expiré)"""
+        if job.expired:
+            self._expire(job)
+        return not job.future.cancelled()
+
+    def _expire(self, job):
+        """Abandonne un travail dont le client n'attend plus le résultat"""
+        if job.cancel():
+            job.deadline_exceeded = True
+            logger.info(f"Job {job.id} dropped: client deadline exceeded")
+            with self.lock:
+                self.stats['jobs_expired'] += 1
+
+    def _supervise(self, process, batch, timeout):
+        """
+        Surveille une JVM jusqu'à sa fin
+
+        Retourne:
+            True si la JVM a été tuée avant la fin (mémoire ou annulation) et
+            que les travaux restants doivent être relancés
+        """
+        deadline = time.monotonic() + timeout
+        while process.poll() is None:
+            for job in batch:
+                if job.expired:
+                    self._expire(job)
+
+            if any(job.future.cancelled() for job in batch):
+                logger.info("Job cancelled, stopping its Audiveris JVM")
+                _kill_process_group(process)
+                for job in batch:
+                    # L'annulation d'un voisin ne consomme pas de tentative
+                    job.attempts -= 1
+                return True
+
+            if time.monotonic() > deadline:
+                logger.error("Audiveris processing timed out")
+                _kill_process_group(process)
+                return False
+
+            rss_mb = _process_tree_rss_mb(process.pid)
+            if rss_mb > self.max_rss_mb:
+                logger.warning(f"Audiveris JVM uses {rss_mb} MB (> {self.max_rss_mb} MB), recycling")
+                _kill_process_group(process)
+                with self.lock:
+                    self.stats['memory_recycles'] += 1
+                return True
+
+            time.sleep(1)
+        return False
+
+    def _finish_job(self, job, batch_dir, recycled, log_tail):
+        """Récupère la sortie d'un travail, le relance ou le marque en échec"""
+        if job.future.cancelled():
+            return
+
+        outputs = sorted(batch_dir.rglob(f"{job.batch_stem}*.mxl")) + \
+            sorted(batch_dir.rglob(f"{job.batch_stem}*.xml"))
+
+        if outputs:
+            job.output_dir.mkdir(parents=True, exist_ok=True)
+            name = outputs[0].name.replace(f"{job.id}-", '', 1)
+            musicxml_path = job.output_dir / name
+            shutil.move(str(outputs[0]), musicxml_path)
+            if self.output_index is not None:
+                self.output_index.add(musicxml_path)
+            book = batch_dir / f"{job.batch_stem}.omr"
+            if job.book is None and job.book_key and book.exists():
+                self.book_store.put(job.book_key, book)
+            if self._resolve(job, musicxml_path):
+                with self.lock:
+                    self.stats['jobs_completed'] += 1
+                    if job.book is not None:
+                        self.stats['jobs_reexported'] += 1
+        elif (recycled or job.book is not None) and job.attempts < self.MAX_ATTEMPTS:
+            if job.book is not None:
+                logger.warning(f"Re-export of {job.book.name} failed, requeueing job {job.id} for transcription")
+                job.book = None
+            else:
+                logger.info(f"Requeueing job {job.id} after JVM recycle")
+            job.started_at = None
+            self.queue.put(job, force=True)
+        elif self._resolve(job, error=RuntimeError(log_tail)):
+            with self.lock:
+                self.stats['jobs_failed'] += 1
+
+
+def _kill_process_group(process):
+    """Tue le script audiveris et la JVM qu'il a lancée (groupe du processus), puis attend sa fin"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _process_tree_rss_mb(pid):
+    """Mémoire résidente (MB) d'un processus et de ses descendants, via /proc"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb // 1024
+
+
+class OutputIndex:
+    """
+    Index en mémoire des MusicXML générés dans /outputs
+
+    L'index est reconstruit par un unique parcours du dossier au démarrage,
+    puis tenu à jour à chaque travail terminé : /list et /download ne
+    parcourent plus le volume. Les chemins sont gardés triés pour paginer
+    sans retrier, et le ménage (durée de conservation, quota disque)
+    s'appuie sur les tailles et dates enregistrées.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.entries = {}  # chemin relatif → (taille, date de modification)
+        self.paths = []  # chemins relatifs triés
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'expired': 0, 'evicted': 0}
+
+    def rebuild(self):
+        """Reconstruit l'index à partir du contenu du dossier"""
+        entries = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = Path(dirpath) / name
+                if path.suffix.lower() not in MUSICXML_MIMETYPES:
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries[str(path.relative_to(self.root))] = (stat.st_size, stat.st_mtime)
+
+        with self.lock:
+            self.entries = entries
+            self.paths = sorted(entries)
+            self.total_bytes = sum(size for size, _ in entries.values())
+        logger.info(f"Output index rebuilt: {len(entries)} file(s), {self.total_bytes // (1024 * 1024)} MB")
+
+    def add(self, path):
+        """Indexe (ou met à jour) un fichier de sortie"""
+        stat = path.stat()
+        relative = str(path.relative_to(self.root))
+        with self.lock:
+            previous = self.entries.get(relative)
+            if previous is None:
+                bisect.insort(self.paths, relative)
+            else:
+                self.total_bytes -= previous[0]
+            self.entries[relative] = (stat.st_size, stat.st_mtime)
+            self.total_bytes += stat.st_size
+
+    def get(self, relative):
+        """Chemin absolu d'un fichier indexé, None s'il est inconnu"""
+        with self.lock:
+            if relative not in self.entries:
+                return None
+        return self.root / relative
+
+    def page(self, offset, limit):
+        """
+        Page de chemins relatifs, dans l'ordre alphabétique
+
+        Retourne:
+            (chemins de la page, nombre total de fichiers)
+        """
+        with self.lock:
+            return self.paths[offset:offset + limit], len(self.paths)
+
+    def get_stats(self):
+        """Statistiques de l'index"""
+        with self.lock:
+            return dict(self.stats, files=len(self.paths), bytes=self.total_bytes)
+
+    def collect(self, ttl, quota_bytes, grace=OUTPUT_EVICTION_GRACE):
+        """
+        Supprime les fichiers expirés puis, si le quota est dépassé, les plus anciens
+
+        Paramètres:
+            ttl: Durée de conservation (secondes, 0 = illimitée)
+            quota_bytes: Taille totale maximale (octets, 0 = illimitée)
+            grace: Âge minimal d'un fichier supprimé pour respecter le quota
+
+        Retourne:
+            Nombre de fichiers supprimés
+        """
+        now = time.time()
+        victims = []
+        with self.lock:
+            total = self.total_bytes
+            for relative, (size, mtime) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+                age = now - mtime
+                if ttl and age > ttl:
+                    reason = 'expired'
+                elif quota_bytes and total > quota_bytes and age > grace:
+                    reason = 'evicted'
+                else:
+                    # Les fichiers suivants sont plus récents: rien d'autre à supprimer
+                    break
+                total -= size
+                victims.append(relative)
+                self.stats[reason] += 1
+
+            for relative in victims:
+                size, _ = self.entries.pop(relative)
+                del self.paths[bisect.bisect_left(self.paths, relative)]
+                self.total_bytes -= size
+
+        for relative in victims:
+            path = self.root / relative
+            path.unlink(missing_ok=True)
+            # Supprimer le dossier du travail s'il est désormais vide
+            if path.parent != self.root:
+                try:
+                    path.parent.rmdir()
+                except OSError:
+                    pass
+
+        if victims:
+            logger.info(f"Output janitor removed {len(victims)} file(s), "
+                        f"{self.total_bytes // (1024 * 1024)} MB left")
+        return len(victims)
+
+
+class BookStore:
+    """
+    Projets Audiveris (.omr) conservés par contenu, avec éviction LRU
+
+    Un projet contient le résultat de toutes les étapes de transcription :
+    Audiveris en ré-exporte le MusicXML en quelques secondes, au lieu de
+    plusieurs minutes pour transcrire les images.
+
+    Les clés suivent modules/omr_store.py (le conteneur n'embarque pas les
+    modules de l'application) : SHA-256 de l'empreinte du fichier soumis, de
+    la version d'Audiveris et des options de rendu (aucune côté service).
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.books = OrderedDict()  # clé → taille, du moins au plus récemment utilisé
+        self.total_bytes = 0
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        for path in self.folder.iterdir():
+            if path.name.startswith('.'):
+                # Copie interrompue: fichier temporaire orphelin
+                path.unlink(missing_ok=True)
+        for book in sorted(self.folder.glob('*.omr'), key=lambda path: path.stat().st_mtime):
+            size = book.stat().st_size
+            self.books[book.stem] = size
+            self.total_bytes += size
+        logger.info(f"Book store loaded: {len(self.books)} book(s)")
+
+    def make_key(self, input_path, options=None):
+        """Clé du projet d'un fichier soumis (mêmes règles que modules/omr_store.py)"""
+        content = hashlib.sha256()
+        with open(input_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                content.update(chunk)
+        digest = hashlib.sha256()
+        digest.update(content.hexdigest().encode())
+        digest.update(AUDIVERIS_VERSION.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Chemin du projet conservé pour cette clé, None s'il n'existe pas"""
+        path = self.folder / f"{key}.omr"
+        with self.lock:
+            if key not in self.books or not path.exists():
+                self.total_bytes -= self.books.pop(key, 0)
+                return None
+            self.books.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Évincé entre-temps: le travail le copiera ou retombera sur une transcription
+            pass
+        return path
+
+    def put(self, key, book):
+        """Conserve le projet sauvegardé par Audiveris (déplacé)"""
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{key}.", suffix='.tmp', dir=self.folder)
+        os.close(fd)
+        try:
+            shutil.move(str(book), tmp_name)
+            size = os.path.getsize(tmp_name)
+            with self.lock:
+                os.replace(tmp_name, self.folder / f"{key}.omr")
+                self.total_bytes += size - self.books.pop(key, 0)
+                self.books[key] = size
+                while self.books and self.total_bytes > self.max_bytes:
+                    oldest, oldest_size = self.books.popitem(last=False)
+                    self.total_bytes -= oldest_size
+                    (self.folder / f"{oldest}.omr").unlink(missing_ok=True)
+        except OSError as e:
+            Path(tmp_name).unlink(missing_ok=True)
+            logger.warning(f"Unable to keep Audiveris book {key[:12]}: {e}")
+
+    def get_stats(self):
+        """Statistiques du stockage"""
+        with self.lock:
+            return {'books': len(self.books), 'bytes': self.total_bytes}
+
+
+def run_output_janitor():
+    """Applique périodiquement la durée de conservation et le quota de /outputs, et vide /uploads"""
+    while True:
+        time.sleep(AUDIVERIS_JANITOR_INTERVAL)
+        try:
+            output_index.collect(AUDIVERIS_OUTPUT_TTL, AUDIVERIS_OUTPUT_QUOTA_MB * 1024 * 1024)
+            purge_jobs()
+            purge_uploads(JOB_RETENTION)
+        except Exception:
+            logger.exception("Output janitor failed")
+
+
+# Services créés au démarrage (create_app)
+output_index = None
+book_store = None
+worker_pool = None
+
+# Travaux asynchrones connus (job_id → OCRJob)
+jobs = {}
+jobs_lock = threading.Lock()
+
+
+def purge_jobs():
+    """Oublie les travaux terminés depuis plus de JOB_RETENTION secondes (et leur upload)"""
+    limit = time.time() - JOB_RETENTION
+    with jobs_lock:
+        expired = [jobs.pop(job_id) for job_id, job in list(jobs.items())
+                   if job.future.done() and job.submitted_at < limit]
+    for job in expired:
+        shutil.rmtree(job.input_path.parent, ignore_errors=True)
+
+
+def purge_uploads(max_age):
+    """
+    Supprime les uploads orphelins (travail oublié, requête /ocr interrompue)
+
+    Paramètres:
+        max_age: Âge minimal (secondes) d'un upload supprimé
+
+    Retourne:
+        Nombre d'uploads supprimés
+    """
+    limit = time.time() - max_age
+    with jobs_lock:
+        active = {job_id for job_id, job in jobs.items() if not job.future.done()}
+
+    removed = 0
+    for path in UPLOAD_FOLDER.iterdir():
+        try:
+            if path.name in active or path.stat().st_mtime >= limit:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except OSError:
+            continue
+        removed += 1
+
+    if removed:
+        logger.info(f"Upload janitor removed {removed} upload(s)")
+    return removed
 
 
 def allowed_file(filename):
@@ -36,13 +879,121 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def wants_inline():
+    """Le client demande-t-il le MusicXML directement dans la réponse (?inline=1) ?"""
+    return request.args.get('inline', '').lower() in ('1', 'true', 'yes')
+
+
+def send_musicxml(musicxml_path, job_id=None):
+    """
+    Renvoie le MusicXML généré dans le corps de la réponse
+
+    Le fichier est envoyé en flux (pas de chargement complet en mémoire) et
+    son chemin relatif est indiqué dans l'en-tête X-Output-File.
+    """
+    relative_path = str(musicxml_path.relative_to(OUTPUT_FOLDER))
+    mimetype = MUSICXML_MIMETYPES.get(musicxml_path.suffix.lower(), 'application/octet-stream')
+    response = send_file(str(musicxml_path), mimetype=mimetype, download_name=musicxml_path.name)
+    response.headers['X-Output-File'] = relative_path
+    if job_id:
+        response.headers['X-Job-Id'] = job_id
+    return response
+
+
+def get_client_id():
+    """Identifiant du client pour l'ordonnancement équitable (en-tête X-Client-Id ou adresse IP)"""
+    return request.headers.get('X-Client-Id') or request.remote_addr
+
+
+def get_request_timeout():
+    """Temps (secondes) pendant lequel le client attend le résultat (en-tête X-Request-Timeout), None si absent"""
+    try:
+        timeout = float(request.headers[DEADLINE_HEADER])
+    except (KeyError, ValueError):
+        return None
+    return timeout if timeout > 0 else None
+
+
+def queue_full_response(error):
+    """Réponse 429 indiquant quand réessayer (en-tête Retry-After)"""
+    response = jsonify({
+        'error': 'OCR queue is full, retry later',
+        'retry_after': error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def get_uploaded_file():
+    """
+    Récupère et valide le fichier envoyé en multipart/form-data
+
+    Retourne:
+        (file, None) si le fichier est valide, (None, réponse d'erreur) sinon
+    """
+    if 'file' not in request.files:
+        return None, (jsonify({'error': 'No file provided'}), 400)
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return None, (jsonify({'error': 'Empty filename'}), 400)
+
+    if not allowed_file(file.filename):
+        return None, (jsonify({'error': f'File type not allowed. Allowed: {ALLOWED_EXTENSIONS}'}), 400)
+
+    return file, None
+
+
+def get_streamed_filename():
+    """
+    Récupère et valide le nom d'un fichier envoyé en flux (corps brut, ?filename=)
+
+    Retourne:
+        (filename, None) si le nom est valide, (None, réponse d'erreur) sinon
+    """
+    filename = secure_filename(request.args.get('filename', ''))
+
+    if not filename:
+        return None, (jsonify({'error': 'No filename provided'}), 400)
+
+    if not allowed_file(filename):
+        return None, (jsonify({'error': f'File type not allowed. Allowed: {ALLOWED_EXTENSIONS}'}), 400)
+
+    return filename, None
+
+
+def save_request_stream(path):
+    """
+    Écrit le corps brut de la requête dans un fichier, bloc par bloc
+
+    Le corps peut être envoyé en transfert chunked (taille inconnue à
+    l'avance) : la limite MAX_FILE_SIZE est vérifiée au fil de la lecture.
+
+    Retourne:
+        True si le fichier a été écrit, False s'il dépasse MAX_FILE_SIZE
+    """
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in iter(lambda: request.stream.read(UPLOAD_CHUNK_SIZE), b''):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                return False
+            f.write(chunk)
+    return True
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Endpoint de santé"""
     return jsonify({
         'status': 'healthy',
         'service': 'audiveris-ocr',
-        'version': '5.9.0'
+        'version': AUDIVERIS_VERSION,
+        'pool': worker_pool.get_stats(),
+        'outputs': output_index.get_stats(),
+        'books': book_store.get_stats() if book_store is not None else None
     })
 
 
@@ -53,26 +1004,26 @@ def process_ocr():
 
     Paramètres:
         - file: Le fichier PDF ou image à traiter (multipart/form-data)
+        - inline: Renvoyer directement le MusicXML au lieu de son chemin (optionnel)
 
     Retourne:
-        - JSON avec le chemin du fichier MusicXML généré
+        - JSON avec le chemin du fichier MusicXML généré, ou le fichier lui-même
     """
     try:
-        # Vérifier qu'un fichier a été envoyé
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
+        # Refuser au plus tôt si la file est pleine (avant de recevoir le fichier)
+        client_id = get_client_id()
+        worker_pool.admit(client_id)
 
-        if file.filename == '':
-            return jsonify({'error': 'Empty filename'}), 400
-
-        if not allowed_file(file.filename):
-            return jsonify({'error': f'File type not allowed. Allowed: {ALLOWED_EXTENSIONS}'}), 400
+        # Vérifier qu'un fichier a été envoyé
+        file, error = get_uploaded_file()
+        if error:
+            return error
 
-        # Sauvegarder le fichier
+        # Sauvegarder le fichier (un dossier par requête, supprimé une fois le travail fini)
         filename = secure_filename(file.filename)
-        input_path = UPLOAD_FOLDER / filename
+        input_dir = UPLOAD_FOLDER / uuid.uuid4().hex
+        input_dir.mkdir(parents=True, exist_ok=True)
+        input_path = input_dir / filename
         file.save(str(input_path))
 
         logger.info(f"Processing file: {filename}")
@@ -80,51 +1031,35 @@ def process_ocr():
         # Préparer les chemins de sortie
         output_name = input_path.stem
         output_dir = OUTPUT_FOLDER / output_name
-        output_dir.mkdir(exist_ok=True)
-
-        # Exécuter Audiveris
-        cmd = [
-            'audiveris',
-            '-batch',
-            '-export',
-            '-output', str(output_dir),
-            str(input_path)
-        ]
 
-        logger.info(f"Running command: {' '.join(cmd)}")
+        # Confier le fichier au pool de workers Audiveris
+        try:
+            job = worker_pool.submit(input_path, output_dir, client_id=client_id)
+        except QueueFullError:
+            shutil.rmtree(input_dir, ignore_errors=True)
+            raise
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutes max
-        )
-
-        if result.returncode != 0:
-            logger.error(f"Audiveris failed: {result.stderr}")
+        try:
+            musicxml_path = job.future.result(timeout=JOB_TIMEOUT * 2)
+        except RuntimeError as e:
+            logger.error(f"Audiveris failed: {e}")
             return jsonify({
                 'error': 'Audiveris processing failed',
-                'details': result.stderr
-            }), 500
-
-        # Trouver le fichier MusicXML généré
-        musicxml_files = list(output_dir.glob('*.mxl')) + list(output_dir.glob('*.xml'))
-
-        if not musicxml_files:
-            logger.error("No MusicXML file generated")
-            return jsonify({
-                'error': 'No MusicXML file generated',
-                'output': result.stdout
+                'details': str(e)
             }), 500
-
-        # Prendre le premier fichier MusicXML trouvé
-        musicxml_path = musicxml_files[0]
+        finally:
+            # Le résultat est dans /outputs: l'upload ne sert plus (travail abandonné s'il n'a pas abouti)
+            job.cancel()
+            shutil.rmtree(input_dir, ignore_errors=True)
 
         # Retourner les informations
         relative_path = str(musicxml_path.relative_to(OUTPUT_FOLDER))
 
         logger.info(f"Successfully processed {filename} -> {relative_path}")
 
+        if wants_inline():
+            return send_musicxml(musicxml_path)
+
         return jsonify({
             'success': True,
             'input_file': filename,
@@ -132,7 +1067,11 @@ def process_ocr():
             'output_path': f'/outputs/{relative_path}'
         })
 
-    except subprocess.TimeoutExpired:
+    except QueueFullError as e:
+        logger.warning(f"OCR queue full, rejecting request (retry after {e.retry_after} s)")
+        return queue_full_response(e)
+
+    except FutureTimeoutError:
         logger.error("Audiveris processing timed out")
         return jsonify({'error': 'Processing timed out (max 5 minutes)'}), 500
 
@@ -141,6 +1080,117 @@ def process_ocr():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Soumet une partition en traitement asynchrone
+
+    Paramètres:
+        - file: Le fichier PDF ou image à traiter (multipart/form-data)
+        - ou bien le fichier lui-même en corps brut (Content-Type:
+          application/octet-stream, éventuellement chunked) et son nom dans
+          ?filename= : le client peut le relayer au fil de sa propre réception
+        - X-Request-Timeout: Secondes pendant lesquelles le client attend le
+          résultat ; passé ce délai le travail est abandonné (en-tête, optionnel)
+
+    Retourne:
+        - 202 avec l'identifiant du travail, à suivre via GET /jobs/<job_id>
+        - 413 si le fichier envoyé en flux dépasse la taille maximale
+        - 429 avec Retry-After si la file d'attente est pleine
+    """
+    try:
+        client_id = get_client_id()
+        worker_pool.admit(client_id)
+
+        if request.mimetype == 'application/octet-stream':
+            file = None
+            filename, error = get_streamed_filename()
+        else:
+            file, error = get_uploaded_file()
+        if error:
+            return error
+
+        purge_jobs()
+
+        # Un dossier par travail: deux uploads homonymes ne se marchent pas dessus
+        job_id = uuid.uuid4().hex
+        if file is not None:
+            filename = secure_filename(file.filename)
+        input_dir = UPLOAD_FOLDER / job_id
+        input_dir.mkdir(parents=True, exist_ok=True)
+        input_path = input_dir / filename
+        if file is not None:
+            file.save(str(input_path))
+        elif not save_request_stream(input_path):
+            shutil.rmtree(input_dir, ignore_errors=True)
+            return jsonify({'error': f'File too large (max {MAX_FILE_SIZE // (1024 * 1024)} MB)'}), 413
+
+        try:
+            job = worker_pool.submit(input_path, OUTPUT_FOLDER / job_id, job_id=job_id, client_id=client_id,
+                                     timeout=get_request_timeout())
+        except QueueFullError:
+            shutil.rmtree(input_dir, ignore_errors=True)
+            raise
+        with jobs_lock:
+            jobs[job.id] = job
+
+        logger.info(f"Job {job.id} queued for {filename}")
+
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Location'] = f'/jobs/{job.id}'
+        return response
+
+    except QueueFullError as e:
+        logger.warning(f"OCR queue full, rejecting job (retry after {e.retry_after} s)")
+        return queue_full_response(e)
+
+    except Exception as e:
+        logger.exception("Unexpected error while creating job")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Retourne l'état d'un travail
+
+    Paramètres:
+        - wait: Secondes d'attente maximale de la fin du travail (long-poll, optionnel)
+        - inline: Renvoyer directement le MusicXML une fois le travail terminé (optionnel)
+    """
+    with jobs_lock:
+        job = jobs.get(job_id)
+
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    wait = min(request.args.get('wait', 0, type=float), MAX_POLL_WAIT)
+    if wait > 0 and not job.future.done():
+        futures_wait([job.future], timeout=wait)
+
+    if wants_inline() and job.status == 'done':
+        return send_musicxml(job.future.result(), job_id=job.id)
+
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Annule un travail en file ou en cours"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if not job.cancel():
+        return jsonify(dict(job.to_dict(), error='Job already finished')), 409
+
+    logger.info(f"Job {job_id} cancelled")
+    return jsonify(job.to_dict())
+
+
 @app.route('/download/<path:filename>', methods=['GET'])
 def download_file(filename):
     """
@@ -150,9 +1200,10 @@ def download_file(filename):
         - filename: Chemin relatif du fichier dans /outputs
     """
     try:
-        file_path = OUTPUT_FOLDER / filename
+        # Seuls les fichiers indexés sont servis (ni parcours du volume, ni chemin arbitraire)
+        file_path = output_index.get(filename)
 
-        if not file_path.exists():
+        if file_path is None or not file_path.exists():
             return jsonify({'error': 'File not found'}), 404
 
         return send_file(str(file_path), as_attachment=True)
@@ -164,18 +1215,29 @@ def download_file(filename):
 
 @app.route('/list', methods=['GET'])
 def list_outputs():
-    """Liste tous les fichiers MusicXML générés"""
+    """
+    Liste les fichiers MusicXML générés, page par page (depuis l'index)
+
+    Paramètres:
+        - offset: Position du premier fichier renvoyé (défaut: 0)
+        - limit: Nombre maximal de fichiers renvoyés (défaut: 100, max: 1000)
+
+    Retourne:
+        - JSON avec la page de fichiers (files, page_count), le nombre total de
+          fichiers (count, total) et l'offset de la page suivante
+    """
     try:
-        files = []
-        for ext in ['*.mxl', '*.xml']:
-            files.extend([
-                str(f.relative_to(OUTPUT_FOLDER))
-                for f in OUTPUT_FOLDER.rglob(ext)
-            ])
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', LIST_PAGE_SIZE, type=int)), MAX_LIST_PAGE_SIZE)
+        files, total = output_index.page(offset, limit)
 
         return jsonify({
-            'files': sorted(files),
-            'count': len(files)
+            'files': files,
+            'count': total,  # nombre total de fichiers, comme avant la pagination
+            'page_count': len(files),
+            'total': total,
+            'offset': offset,
+            'next_offset': offset + len(files) if offset + len(files) < total else None
         })
 
     except Exception as e:
@@ -183,6 +1245,45 @@ def list_outputs():
         return jsonify({'error': str(e)}), 500
 
 
+def create_app():
+    """
+    Crée les dossiers de travail et démarre les services (index et ménage de
+    /outputs, projets .omr, pool de workers)
+
+    L'import du module n'a aucun effet de bord : les classes du service
+    peuvent être importées (et testées) sans /uploads ni JVM.
+
+    Retourne:
+        L'application Flask
+    """
+    global output_index, book_store, worker_pool
+
+    UPLOAD_FOLDER.mkdir(exist_ok=True)
+    OUTPUT_FOLDER.mkdir(exist_ok=True)
+    WORK_FOLDER.mkdir(parents=True, exist_ok=True)
+
+    output_index = OutputIndex(OUTPUT_FOLDER)
+    output_index.rebuild()
+    book_store = BookStore(AUDIVERIS_BOOK_FOLDER, AUDIVERIS_BOOK_STORE_MB * 1024 * 1024) \
+        if AUDIVERIS_BOOK_STORE_MB > 0 else None
+    if AUDIVERIS_JANITOR_INTERVAL > 0:
+        threading.Thread(target=run_output_janitor, name='output-janitor', daemon=True).start()
+
+    worker_pool = AudiverisWorkerPool(
+        workers=AUDIVERIS_WORKERS,
+        jobs_per_jvm=AUDIVERIS_JOBS_PER_JVM,
+        max_rss_mb=AUDIVERIS_MAX_RSS_MB,
+        max_queue=AUDIVERIS_MAX_QUEUE,
+        max_queue_per_client=AUDIVERIS_MAX_QUEUE_PER_CLIENT,
+        job_estimate=AUDIVERIS_JOB_ESTIMATE,
+        output_index=output_index,
+        book_store=book_store
+    )
+    worker_pool.start()
+    return app
+
+
 if __name__ == '__main__':
-    logger.info("Starting Audiveris OCR Service on port 8080...")
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    port = int(os.environ.get('PORT', '8080'))
+    logger.info(f"Starting Audiveris OCR Service on port {port}...")
+    create_app().run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,95 @@
+"""
+Module de gestion du délai d'une conversion
+
+Chaque conversion reçoit un délai unique à sa création (Config.CONVERSION_TIMEOUT).
+Il est transmis à toutes les étapes du pipeline : les timeouts des sous-processus
+(Audiveris, Lilypond) et des requêtes HTTP sont pris sur le temps restant plutôt
+que fixés étape par étape, et une conversion qui ne peut plus aboutir à temps
+s'arrête au lieu d'occuper un worker pour un client parti depuis longtemps.
+"""
+import time
+from typing import Optional
+
+
+class DeadlineExceededError(Exception):
+    """Levée lorsque le délai de la conversion est dépassé"""
+
+
+class Deadline:
+    """Instant limite d'une conversion (horloge monotone)"""
+
+    def __init__(self, seconds: float):
+        """
+        Args:
+            seconds: Durée accordée à partir de maintenant (secondes)
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def after(cls, seconds: float, parent: Optional['Deadline'] = None) -> 'Deadline':
+        """
+        Délai de `seconds` secondes, sans dépasser celui du parent
+
+        Args:
+            seconds: Durée maximale propre à l'opération (secondes)
+            parent: Délai de la conversion (optionnel)
+
+        Returns:
+            Le plus proche des deux délais
+        """
+        deadline = cls(seconds)
+        if parent is not None:
+            deadline.expires_at = min(deadline.expires_at, parent.expires_at)
+        return deadline
+
+    def reserve(self, seconds: float) -> 'Deadline':
+        """
+        Délai anticipé de `seconds` secondes, gardées pour les étapes suivantes
+
+        Args:
+            seconds: Temps réservé après l'opération (secondes)
+
+        Returns:
+            Nouveau délai
+        """
+        deadline = Deadline(0)
+        deadline.expires_at = self.expires_at - seconds
+        return deadline
+
+    def remaining(self) -> float:
+        """Temps restant en secondes (0 si le délai est dépassé)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Indique si le délai est dépassé"""
+        return time.monotonic() >= self.expires_at
+
+    def check(self, what: str = "Conversion"):
+        """
+        Vérifie qu'il reste du temps
+
+        Args:
+            what: Opération interrompue (message de l'erreur)
+
+        Raises:
+            DeadlineExceededError: Si le délai est dépassé
+        """
+        if self.expired:
+            raise DeadlineExceededError(f"{what}: délai dépassé")
+
+
+def budget(deadline: Optional[Deadline], limit: float) -> float:
+    """
+    Timeout d'une opération: sa limite propre, réduite au temps restant
+
+    Args:
+        deadline: Délai de la conversion (None = pas de délai global)
+        limit: Timeout propre de l'opération (secondes)
+
+    Returns:
+        Timeout à appliquer (secondes)
+    """
+    if deadline is None:
+        return limit
+    return min(limit, deadline.remaining())
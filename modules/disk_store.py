@@ -0,0 +1,254 @@
+"""
+Stockage disque adressé par contenu, borné en taille (éviction LRU)
+
+Base commune du cache OCR (OCRCache), des projets Audiveris (BookStore) et du
+cache de parsing (ParseCache) : chaque entrée est un fichier ou un dossier du
+stockage, nommé d'après sa clé. L'index en mémoire garde les entrées de la
+moins à la plus récemment utilisée ; il est reconstruit au démarrage d'après
+les dates de modification, mises à jour à chaque accès.
+
+Une entrée est écrite sous un nom temporaire propre à chaque écriture (préfixe
+'.'), puis renommée : une lecture ne voit jamais d'entrée partielle et deux
+écritures simultanées de la même clé ne se marchent pas dessus.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus pour le hachage (1 MB)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: Path) -> str:
+    """
+    Calcule le SHA-256 d'un fichier par blocs
+
+    Args:
+        file_path: Fichier à hacher
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(content_digest: str, version: str = '', options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Clé d'une entrée: empreinte du contenu, version de l'outil et options
+
+    Args:
+        content_digest: SHA-256 hexadécimal du fichier d'entrée
+        version: Version de l'outil produisant l'entrée (Audiveris...)
+        options: Options influençant le résultat
+
+    Returns:
+        Clé hexadécimale (SHA-256)
+    """
+    digest = hashlib.sha256()
+    digest.update(content_digest.encode())
+    digest.update(version.encode())
+    digest.update(json.dumps(options or {}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class LRUDiskStore:
+    """
+    Stockage disque LRU: une entrée (fichier ou dossier) par clé
+
+    Les sous-classes indiquent où se trouve une entrée (_entry_path) et
+    comment reconnaître les entrées sur disque (_entry_key).
+    """
+
+    # Nom du stockage dans les logs
+    label = "Stockage"
+
+    def __init__(self, store_dir: Path, max_size: int):
+        """
+        Args:
+            store_dir: Dossier des entrées
+            max_size: Taille maximale du stockage en octets
+        """
+        self.store_dir = Path(store_dir)
+        self.max_size = max_size
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # clé → taille en octets, ordonné du moins au plus récemment utilisé
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        # clé → numéro d'écriture de l'entrée indexée (distingue une entrée réécrite entre-temps)
+        self._serials: Dict[str, int] = {}
+        self._next_serial = itertools.count()
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _entry_path(self, key: str) -> Path:
+        """Chemin de l'entrée d'une clé"""
+        raise NotImplementedError
+
+    def _entry_key(self, path: Path) -> Optional[str]:
+        """Clé d'une entrée trouvée sur disque (None si le chemin n'est pas une entrée)"""
+        raise NotImplementedError
+
+    def _stamp_path(self, key: str) -> Path:
+        """Fichier dont la date de modification marque le dernier accès (et la complétude) de l'entrée"""
+        return self._entry_path(key)
+
+    def _load_index(self):
+        """Reconstruit l'index LRU depuis le disque (ordre = date d'accès)"""
+        entries = []
+        for path in self.store_dir.iterdir():
+            if path.name.startswith('.'):
+                # Écriture interrompue: entrée temporaire orpheline
+                _remove_path(path)
+                continue
+            key = self._entry_key(path)
+            if key is None:
+                continue
+            stamp = self._stamp_path(key)
+            if stamp.exists():
+                entries.append((stamp.stat().st_mtime, key, _disk_size(path)))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._serials[key] = next(self._next_serial)
+            self.total_size += size
+
+        logger.info(f"{self.label} chargé: {len(self._index)} entrée(s), {self.total_size} octets")
+
+    def _lookup(self, key: str) -> Optional[Tuple[Path, int]]:
+        """
+        Cherche une entrée et la marque comme récemment utilisée (compté comme succès)
+
+        L'entrée est lue par l'appelant hors du lock : elle peut être évincée
+        ou réécrite pendant sa lecture.
+
+        Returns:
+            Chemin de l'entrée et numéro d'écriture (à passer à _discard),
+            None si elle est absente (compté comme échec)
+        """
+        stamp = self._stamp_path(key)
+        with self._lock:
+            if key not in self._index or not stamp.exists():
+                self._remove_entry(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            serial = self._serials[key]
+
+        try:
+            os.utime(stamp)
+        except OSError:
+            pass
+        return self._entry_path(key), serial
+
+    def _discard(self, key: str, serial: int, reason: Exception):
+        """
+        Écarte une entrée illisible renvoyée par _lookup (le succès devient un échec)
+
+        L'entrée n'est supprimée que si elle n'a pas été réécrite depuis _lookup.
+        """
+        logger.warning(f"{self.label}: entrée illisible {key[:12]}: {reason}")
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            if self._serials.get(key) == serial:
+                self._remove_entry(key)
+
+    def _temp_path(self, key: str, directory: bool = False) -> Path:
+        """Fichier (ou dossier) temporaire unique où préparer une entrée"""
+        if directory:
+            return Path(tempfile.mkdtemp(prefix=f".{key}.", dir=self.store_dir))
+        fd, name = tempfile.mkstemp(prefix=f".{key}.", suffix='.tmp', dir=self.store_dir)
+        os.close(fd)
+        return Path(name)
+
+    def _commit(self, key: str, tmp_path: Path) -> Optional[Path]:
+        """
+        Installe une entrée préparée sous un nom temporaire puis applique la limite de taille
+
+        Returns:
+            Chemin de l'entrée, None si elle n'a pas pu être installée
+        """
+        size = _disk_size(tmp_path)
+        entry = self._entry_path(key)
+        with self._lock:
+            # L'entrée peut exister sur disque sans être indexée (écriture d'un autre
+            # processus, index non rechargé): elle est remplacée
+            self._remove_entry(key)
+            try:
+                os.replace(tmp_path, entry)
+            except OSError as e:
+                logger.warning(f"{self.label}: entrée {key[:12]} non stockée: {e}")
+                _remove_path(tmp_path)
+                return None
+            self._index[key] = size
+            self._serials[key] = next(self._next_serial)
+            self.total_size += size
+            self._evict()
+
+        logger.info(f"{self.label}: entrée {key[:12]} stockée ({size} octets)")
+        return entry
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées (lock déjà acquis)"""
+        while self._index and self.total_size > self.max_size:
+            oldest = next(iter(self._index))
+            logger.info(f"{self.label}: éviction de {oldest[:12]}")
+            self._remove_entry(oldest)
+
+    def _remove_entry(self, key: str):
+        """Supprime une entrée du disque et de l'index (lock déjà acquis)"""
+        self.total_size -= self._index.pop(key, 0)
+        self._serials.pop(key, None)
+        _remove_path(self._entry_path(key))
+
+    def clear(self):
+        """Vide complètement le stockage"""
+        with self._lock:
+            for key in list(self._index):
+                self._remove_entry(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du stockage"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._index),
+                'size': self.total_size,
+                'max_size': self.max_size
+            }
+
+
+def _disk_size(path: Path) -> int:
+    """Taille d'un fichier, ou des fichiers d'un dossier (octets)"""
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return path.stat().st_size
+
+
+def _remove_path(path: Path):
+    """Supprime un fichier ou un dossier s'il existe"""
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
@@ -26,6 +26,8 @@ class HarmonicaMapper:
         self.maps_dir = maps_dir
 
         self.mapping = self._load_mapping()
+        # Position retenue pour chaque note (pitch, octave) déjà rencontrée
+        self._positions: Dict[tuple, Optional[Dict[str, Any]]] = {}
 
     def _load_mapping(self) -> Dict[str, Any]:
         """Charge le fichier de mapping approprié"""
@@ -85,6 +87,26 @@ class HarmonicaMapper:
             logger.warning(f"Note incomplète (pas de pitch/octave): {note}")
             return None
 
+        # La position ne dépend que de la note: cherchée une fois par note distincte
+        key = (pitch, octave)
+        if key not in self._positions:
+            self._positions[key] = self._find_position(pitch, octave)
+        position = self._positions[key]
+        if position is None:
+            return None
+        return dict(position, duration=note.get('duration', 4))
+
+    def _find_position(self, pitch: str, octave: int) -> Optional[Dict[str, Any]]:
+        """
+        Cherche la meilleure position d'une note sur l'harmonica
+
+        Args:
+            pitch: Nom de la note (ex: 'C', 'F#')
+            octave: Octave
+
+        Returns:
+            Position {hole, direction, technique, pitch, octave} ou None si la note n'est pas jouable
+        """
         # Chercher toutes les positions possibles pour cette note
         candidates = []
 
@@ -117,7 +139,6 @@ class HarmonicaMapper:
                         'hole': int(hole_num),
                         'direction': direction,
                         'technique': bend,
-                        'duration': note.get('duration', 4),
                         'pitch': pitch,
                         'octave': octave
                     })
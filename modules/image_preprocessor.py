@@ -0,0 +1,178 @@
+"""
+Module de normalisation des images avant OCR
+
+Les photos de téléphone et les scans haute résolution ralentissent Audiveris,
+dont le temps de traitement croît avec le nombre de pixels. Ce module prépare
+chaque page avant l'OCR :
+- réduction à la résolution cible (Config.OCR_DPI)
+- redressement (deskew) d'après l'angle des lignes de portée
+- binarisation adaptative (éclairage inégal des photos)
+- suppression des marges blanches
+"""
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Largeur utile d'une page A4 en pouces (sert à estimer la résolution d'une photo)
+PAGE_WIDTH_INCHES = 8.27
+
+# Écart de résolution en deçà duquel l'image n'est pas rééchantillonnée
+RESAMPLE_TOLERANCE = 0.1
+
+# Angle maximal corrigé par le redressement (degrés)
+MAX_SKEW_ANGLE = 15
+
+# Marge conservée autour du contenu après rognage (pixels)
+TRIM_PADDING = 20
+
+
+def preprocess_image(input_path: Path, output_path: Path, target_dpi: int = 300) -> Path:
+    """
+    Normalise une image de partition pour l'OCR
+
+    Args:
+        input_path: Image source (PNG, JPEG...)
+        output_path: Image PNG normalisée à écrire
+        target_dpi: Résolution cible
+
+    Returns:
+        Chemin de l'image normalisée
+    """
+    image = cv2.imread(str(input_path), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"Image illisible: {input_path}")
+
+    original_shape = image.shape
+    image = resample(image, target_dpi, _read_dpi(input_path))
+    image = deskew(image)
+    image = binarize(image)
+    image = trim_margins(image)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(image).save(output_path, dpi=(target_dpi, target_dpi))
+
+    logger.info(f"Image normalisée: {input_path.name} {original_shape[1]}x{original_shape[0]} "
+                f"→ {image.shape[1]}x{image.shape[0]}")
+    return output_path
+
+
+def preprocess_pages(page_files: List[Path], output_dir: Path, target_dpi: int = 300,
+                     max_workers: Optional[int] = None) -> List[Path]:
+    """
+    Normalise plusieurs pages en parallèle (un processus par page)
+
+    Args:
+        page_files: Images des pages, dans l'ordre
+        output_dir: Dossier des images normalisées
+        target_dpi: Résolution cible
+        max_workers: Nombre de processus (défaut: nombre de CPU)
+
+    Returns:
+        Chemins des images normalisées, dans le même ordre
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = [output_dir / f"{Path(page).stem}.png" for page in page_files]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            preprocess_image,
+            [Path(page) for page in page_files],
+            outputs,
+            [target_dpi] * len(outputs)
+        ))
+
+
+def resample(image: np.ndarray, target_dpi: int, source_dpi: Optional[float] = None) -> np.ndarray:
+    """
+    Ramène l'image à la résolution cible
+
+    Sans résolution connue (photo), elle est estimée en supposant que l'image
+    couvre la largeur d'une page A4. Seules les images trop résolues sont
+    réduites : agrandir une image ne ferait qu'allonger l'OCR.
+    """
+    height, width = image.shape
+    if not source_dpi:
+        source_dpi = width / PAGE_WIDTH_INCHES
+
+    scale = target_dpi / source_dpi
+    if scale >= 1 - RESAMPLE_TOLERANCE:
+        return image
+
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def deskew(image: np.ndarray) -> np.ndarray:
+    """Redresse l'image d'après l'angle médian des lignes de portée"""
+    angle = estimate_skew(image)
+    if abs(angle) < 0.1:
+        return image
+
+    height, width = image.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def estimate_skew(image: np.ndarray) -> float:
+    """
+    Estime l'inclinaison (degrés) à partir des longues lignes quasi horizontales
+
+    Les lignes de portée sont les plus longues structures d'une partition : la
+    médiane de leurs angles est une mesure robuste de l'inclinaison.
+    """
+    edges = cv2.Canny(image, 50, 150)
+    min_length = image.shape[1] // 4
+    lines = cv2.HoughLinesP(edges, 1, math.pi / 720, threshold=100,
+                            minLineLength=min_length, maxLineGap=10)
+    if lines is None:
+        return 0.0
+
+    angles = []
+    for x1, y1, x2, y2 in lines.reshape(-1, 4):
+        angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
+        if abs(angle) <= MAX_SKEW_ANGLE:
+            angles.append(angle)
+
+    return float(np.median(angles)) if angles else 0.0
+
+
+def binarize(image: np.ndarray) -> np.ndarray:
+    """Binarisation adaptative (robuste aux ombres et à l'éclairage inégal)"""
+    block_size = max(15, (min(image.shape) // 50) | 1)
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, block_size, 15)
+
+
+def trim_margins(image: np.ndarray) -> np.ndarray:
+    """Supprime les marges blanches (et le bruit isolé qui s'y trouve)"""
+    ink = cv2.morphologyEx(255 - image, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+    points = cv2.findNonZero(ink)
+    if points is None:
+        return image
+
+    x, y, width, height = cv2.boundingRect(points)
+    top = max(0, y - TRIM_PADDING)
+    left = max(0, x - TRIM_PADDING)
+    return image[top:y + height + TRIM_PADDING, left:x + width + TRIM_PADDING]
+
+
+def _read_dpi(image_path: Path) -> Optional[float]:
+    """Résolution déclarée dans les métadonnées de l'image (None si absente)"""
+    try:
+        with Image.open(image_path) as image:
+            dpi = image.info.get('dpi')
+    except OSError:
+        return None
+
+    # Beaucoup d'appareils écrivent 72 dpi par défaut: valeur non significative
+    if dpi and dpi[0] and float(dpi[0]) > 72:
+        return float(dpi[0])
+    return None
@@ -6,12 +6,17 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from .deadline import Deadline, DeadlineExceededError, budget
+
 logger = logging.getLogger(__name__)
 
 
 class LilypondGenerator:
     """Génère des partitions PDF avec Lilypond"""
 
+    # Durée maximale d'une compilation (secondes), réduite au délai de la conversion
+    COMPILE_TIMEOUT = 30
+
     def __init__(self, lilypond_path: str = 'lilypond'):
         """
         Initialise le générateur
@@ -42,7 +47,8 @@ class LilypondGenerator:
         melody: List[Dict[str, Any]],
         tabs: List[Dict[str, Any]],
         metadata: Dict[str, Any],
-        output_path: Path
+        output_path: Path,
+        deadline: Optional[Deadline] = None
     ) -> bool:
         """
         Génère une partition complète (mélodie + tablature)
@@ -52,9 +58,13 @@ class LilypondGenerator:
             tabs: Tablature harmonica
             metadata: Métadonnées (titre, tonalité, etc.)
             output_path: Chemin du PDF de sortie
+            deadline: Délai de la conversion, qui borne la compilation (optionnel)
 
         Returns:
             True si succès, False sinon
+
+        Raises:
+            DeadlineExceededError: Si le délai de la conversion est dépassé
         """
         logger.info(f"Génération de la partition: {output_path}")
 
@@ -66,7 +76,7 @@ class LilypondGenerator:
             f.write(ly_content)
 
         # Compiler avec Lilypond
-        success = self._compile_lilypond(ly_file, output_path.parent)
+        success = self._compile_lilypond(ly_file, output_path.parent, deadline)
 
         return success
 
@@ -193,17 +203,24 @@ harmonicaTabs = \\lyricmode {
 }
 '''
 
-    def _compile_lilypond(self, ly_file: Path, output_dir: Path) -> bool:
+    def _compile_lilypond(self, ly_file: Path, output_dir: Path, deadline: Optional[Deadline] = None) -> bool:
         """
         Compile un fichier .ly en PDF
 
         Args:
             ly_file: Fichier source .ly
             output_dir: Dossier de sortie
+            deadline: Délai de la conversion (optionnel)
 
         Returns:
             True si succès
+
+        Raises:
+            DeadlineExceededError: Si le délai de la conversion est dépassé
         """
+        if deadline is not None:
+            deadline.check("Compilation Lilypond")
+
         try:
             result = subprocess.run(
                 [
@@ -213,7 +230,7 @@ harmonicaTabs = \\lyricmode {
                 ],
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=budget(deadline, self.COMPILE_TIMEOUT)
             )
 
             if result.returncode == 0:
@@ -223,6 +240,11 @@ harmonicaTabs = \\lyricmode {
                 logger.error(f"Erreur Lilypond: {result.stderr}")
                 return False
 
+        except subprocess.TimeoutExpired:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceededError("Compilation Lilypond: délai dépassé")
+            logger.error(f"Timeout Lilypond (> {self.COMPILE_TIMEOUT} s)")
+            return False
         except Exception as e:
             logger.error(f"Échec compilation Lilypond: {e}")
             return False
@@ -383,7 +405,8 @@ def generate_pdf(
     melody: List[Dict[str, Any]],
     tabs: List[Dict[str, Any]],
     metadata: Dict[str, Any],
-    output_path: Path
+    output_path: Path,
+    deadline: Optional[Deadline] = None
 ) -> bool:
     """
     Fonction helper pour générer un PDF
@@ -393,9 +416,10 @@ def generate_pdf(
         tabs: Tablature
         metadata: Métadonnées
         output_path: Chemin de sortie
+        deadline: Délai de la conversion (optionnel)
 
     Returns:
         True si succès
     """
     generator = LilypondGenerator()
-    return generator.generate_score(melody, tabs, metadata, output_path)
+    return generator.generate_score(melody, tabs, metadata, output_path, deadline)
@@ -2,10 +2,17 @@
 Module d'extraction de mélodie depuis des données MusicXML
 
 Ce module prend les données structurées retournées par ocr_reader et extrait
-la mélodie principale jouable à l'harmonica.
+la mélodie principale jouable à l'harmonica. Un fichier MusicXML peut aussi
+être lu directement avec read_main_part, qui ne construit que la partie
+principale.
 """
 import logging
-from typing import Dict, Any, List, Optional
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .musicxml_parser import count_parts, parse_musicxml, parse_musicxml_part, scan_musicxml
+from .note_columns import NoteColumns
+from .parse_cache import ParseCache, parse_with_cache
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +54,9 @@ class MelodyExtractor:
         main_part = self._select_main_part(parts)
         logger.info(f"Partie principale sélectionnée: {main_part['id']}")
 
-        # Extraire toutes les notes de la partie
-        melody_notes = self._extract_notes_from_part(main_part)
+        # Extraire toutes les notes de la partie (table en colonnes)
+        melody_notes = self._extract_notes_from_part(main_part, [part['id'] for part in parts],
+                                                     parts.index(main_part))
 
         # Récupérer les métadonnées complètes
         metadata = musicxml_data.get('metadata', {})
@@ -59,6 +67,7 @@ class MelodyExtractor:
             'source_file': musicxml_data.get('source_file'),
             'part_id': main_part['id'],
             'total_measures': len(main_part['measures']),
+            'divisions': main_part.get('divisions'),
             # Ajouter time_signature et tempo au niveau racine pour faciliter l'accès
             'time_signature': metadata.get('time_signature', '4/4'),
             'tempo': metadata.get('tempo', 120),
@@ -88,44 +97,24 @@ class MelodyExtractor:
         if len(parts) == 1:
             return parts[0]
 
-        # Analyser chaque partie
-        part_scores = []
-        for part in parts:
-            total_notes = sum(len(m['notes']) for m in part['measures'])
-            avg_pitch = self._calculate_average_pitch(part)
-
-            score = {
-                'part': part,
-                'total_notes': total_notes,
-                'avg_pitch': avg_pitch,
-                # Score combiné: priorité aux notes nombreuses et tessiture haute
-                'combined_score': total_notes + (avg_pitch * 10)
-            }
-            part_scores.append(score)
-
-        # Trier par score combiné et prendre la meilleure
-        part_scores.sort(key=lambda x: x['combined_score'], reverse=True)
-        selected = part_scores[0]['part']
-
-        logger.info(f"Partie {selected['id']} sélectionnée "
-                   f"({part_scores[0]['total_notes']} notes, "
-                   f"hauteur moyenne: {part_scores[0]['avg_pitch']:.1f})")
+        statistics = [self._part_statistics(part) for part in parts]
+        return parts[statistics.index(select_main_part(statistics))]
 
-        return selected
-
-    def _calculate_average_pitch(self, part: Dict[str, Any]) -> float:
+    def _part_statistics(self, part: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Calcule la hauteur moyenne des notes d'une partie
+        Statistiques d'une partie, au format de musicxml_parser.scan_musicxml
 
         Args:
             part: Partie musicale
 
         Returns:
-            Hauteur moyenne en notation MIDI (C4 = 60)
+            id, notes, pitched, pitch_sum, min_midi, max_midi, measures, density
         """
+        total_notes = 0
         pitches = []
 
         for measure in part['measures']:
+            total_notes += len(measure['notes'])
             for note in measure['notes']:
                 if note['type'] == 'note' and 'pitch' in note:
                     pitch_data = note['pitch']
@@ -137,7 +126,29 @@ class MelodyExtractor:
                         )
                         pitches.append(midi_pitch)
 
-        return sum(pitches) / len(pitches) if pitches else 60.0
+        measures = len(part['measures'])
+        return {
+            'id': part['id'],
+            'notes': total_notes,
+            'pitched': len(pitches),
+            'pitch_sum': sum(pitches),
+            'min_midi': min(pitches, default=None),
+            'max_midi': max(pitches, default=None),
+            'measures': measures,
+            'density': total_notes / measures if measures else 0.0
+        }
+
+    def _calculate_average_pitch(self, part: Dict[str, Any]) -> float:
+        """
+        Calcule la hauteur moyenne des notes d'une partie
+
+        Args:
+            part: Partie musicale
+
+        Returns:
+            Hauteur moyenne en notation MIDI (C4 = 60)
+        """
+        return average_pitch(self._part_statistics(part))
 
     def _note_to_midi(self, step: str, octave: int, alter: int = 0) -> int:
         """
@@ -156,61 +167,117 @@ class MelodyExtractor:
         midi = (octave + 1) * 12 + base_pitch + alter
         return midi
 
-    def _extract_notes_from_part(self, part: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _extract_notes_from_part(self, part: Dict[str, Any], part_ids: Optional[List[str]] = None,
+                                 part_index: int = 0) -> NoteColumns:
         """
         Extrait toutes les notes d'une partie musicale
 
         Args:
             part: Partie musicale
+            part_ids: Identifiants de toutes les parties (optionnel)
+            part_index: Index de la partie dans part_ids
 
         Returns:
-            Liste de notes simplifiées
+            Notes simplifiées, en colonnes (itérées comme une liste de dictionnaires)
         """
-        melody_notes = []
-        current_time = 0
+        melody_notes = NoteColumns(part_ids or [part['id']])
 
+        # Événements datés: le parser fournit le début absolu (onset) de chaque
+        # note, accords et voix résolus; à défaut les durées se succèdent
+        events = []
+        current_time = 0
         for measure in part['measures']:
-            measure_num = measure['number']
-            measure_notes = measure['notes']
-
-            # Traiter chaque note de la mesure
-            for note in measure_notes:
-                # Traiter l'événement (note ou silence)
-                if note['type'] == 'rest':
-                    if self.keep_rests:
-                        melody_notes.append({
-                            'type': 'rest',
-                            'duration': note.get('duration'),
-                            'note_type': note.get('note_type'),
-                            'measure': measure_num,
-                            'time': current_time
-                        })
-                else:
-                    # Note
-                    if 'pitch' in note:
-                        pitch_data = note['pitch']
-                        melody_notes.append({
-                            'type': 'note',
-                            'pitch': pitch_data.get('step'),
-                            'octave': pitch_data.get('octave'),
-                            'alter': pitch_data.get('alter', 0),
-                            'duration': note.get('duration'),
-                            'note_type': note.get('note_type'),
-                            'measure': measure_num,
-                            'time': current_time,
-                            'midi': self._note_to_midi(
-                                pitch_data.get('step', 'C'),
-                                pitch_data.get('octave', 4),
-                                pitch_data.get('alter', 0)
-                            )
-                        })
-
-                # Avancer le temps
+            for note in measure['notes']:
+                if 'onset' in note:
+                    events.append((note['onset'], measure['number'], note))
+                    continue
+                events.append((current_time, measure['number'], note))
                 if note.get('duration'):
                     current_time += note['duration']
+        events.sort(key=lambda event: event[0])
+
+        if self.simplify_chords:
+            events = self._melody_line(events)
+
+        for index, (onset, measure_num, note) in enumerate(events):
+            duration = note.get('duration')
+            if note['type'] == 'rest':
+                if self.keep_rests:
+                    melody_notes.add_rest(onset, duration, note.get('note_type'),
+                                          measure_num, note.get('voice', 1), part_index)
+            elif 'pitch' in note:
+                if self.simplify_chords and duration and index + 1 < len(events):
+                    # Une note tenue s'arrête au début de la suivante (ligne monophonique)
+                    duration = min(duration, max(events[index + 1][0] - onset, 1))
+                pitch_data = note['pitch']
+                melody_notes.add_note(
+                    self._note_to_midi(
+                        pitch_data.get('step', 'C'),
+                        pitch_data.get('octave', 4),
+                        pitch_data.get('alter', 0)
+                    ),
+                    onset,
+                    duration,
+                    note.get('note_type'),
+                    measure_num,
+                    pitch_data.get('step'),
+                    pitch_data.get('octave'),
+                    pitch_data.get('alter', 0),
+                    note.get('voice', 1),
+                    part_index
+                )
 
         return melody_notes
 
+    def _melody_line(self, events: List[Tuple[int, int, Dict[str, Any]]]) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """
+        Réduit des événements triés par début à une ligne mélodique
+
+        Parmi les notes qui commencent ensemble (accord, voix simultanées),
+        seule la plus haute est gardée, et seulement si elle est plus haute
+        que la note de la mélodie qui sonne encore; un silence n'est gardé
+        que si aucune note ne commence ni ne sonne encore à ce moment.
+
+        Args:
+            events: (début, mesure, note) triés par début
+
+        Returns:
+            Événements de la ligne mélodique, dans l'ordre
+        """
+        line = []
+        sounding_until = 0
+        sounding_midi = -1
+        index = 0
+        while index < len(events):
+            onset = events[index][0]
+            group = []
+            while index < len(events) and events[index][0] == onset:
+                group.append(events[index])
+                index += 1
+
+            pitched = [event for event in group if event[2]['type'] == 'note' and 'pitch' in event[2]]
+            # Une note d'ornement (sans durée) cède la place à la note qu'elle précède
+            pitched = [event for event in pitched if event[2].get('duration')] or pitched
+            if pitched:
+                highest = self._select_highest_note([event[2] for event in pitched])
+                event = next(event for event in pitched if event[2] is highest)
+                pitch = highest['pitch']
+                midi = self._note_to_midi(pitch.get('step', 'C'), pitch.get('octave', 4), pitch.get('alter', 0))
+                # Une voix plus grave n'interrompt pas la note de la mélodie qui sonne encore
+                if onset < sounding_until and midi <= sounding_midi:
+                    continue
+            elif onset >= sounding_until:
+                event = group[0]
+                midi = -1
+            else:
+                continue
+
+            line.append(event)
+            sounding_until = onset + (event[2].get('duration') or 0)
+            sounding_midi = midi
+
+        return line
+
     def _select_highest_note(self, chord_notes: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Sélectionne la note la plus haute d'un accord
@@ -282,3 +349,75 @@ def extract_melody_from_musicxml(musicxml_data: Dict[str, Any],
     """
     extractor = MelodyExtractor(keep_rests=keep_rests, simplify_chords=simplify_chords)
     return extractor.extract_melody(musicxml_data)
+
+
+def average_pitch(statistics: Dict[str, Any]) -> float:
+    """Hauteur MIDI moyenne d'une partie d'après ses statistiques (60 sans note)"""
+    return statistics['pitch_sum'] / statistics['pitched'] if statistics['pitched'] else 60.0
+
+
+def select_main_part(part_statistics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Choisit la partie portant la mélodie principale d'après les statistiques des parties
+
+    Critères: la partie avec le plus de notes et la tessiture la plus haute
+    (moyenne des hauteurs).
+
+    Args:
+        part_statistics: Statistiques de chaque partie (MelodyExtractor ou scan_musicxml)
+
+    Returns:
+        Statistiques de la partie sélectionnée
+    """
+    if len(part_statistics) == 1:
+        return part_statistics[0]
+
+    # Score combiné: priorité aux notes nombreuses et tessiture haute
+    ranked = sorted(part_statistics, key=lambda stats: stats['notes'] + average_pitch(stats) * 10, reverse=True)
+    selected = ranked[0]
+
+    logger.info(f"Partie {selected['id']} sélectionnée "
+                f"({selected['notes']} notes, "
+                f"hauteur moyenne: {average_pitch(selected):.1f})")
+
+    return selected
+
+
+def read_main_part(musicxml_file: Path, cache: Optional[ParseCache] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lit un fichier MusicXML en ne construisant que la partie principale
+
+    Une pré-lecture (scan_musicxml) relève les statistiques de chaque partie
+    sans construire leurs notes ; seule la partie choisie est ensuite lue
+    complètement (ses seuls octets pour un fichier non compressé). Pour une
+    partition d'orchestre, les notes construites et la mémoire dépendent de
+    la mélodie, pas du nombre de parties.
+
+    Args:
+        musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl compressé)
+        cache: Cache des partitions parsées (None = pas de cache)
+
+    Returns:
+        Données MusicXML réduites à la partie principale (part_count: nombre
+        de parties de la partition) ou None en cas d'erreur
+    """
+    return parse_with_cache(cache, musicxml_file, lambda: _read_main_part(musicxml_file), variant='main_part')
+
+
+def _read_main_part(musicxml_file: Path) -> Optional[Dict[str, Any]]:
+    if count_parts(musicxml_file) == 1:
+        # Une seule partie: rien à choisir, la pré-lecture serait une lecture de trop
+        musicxml_data = parse_musicxml(musicxml_file)
+        if musicxml_data:
+            musicxml_data['part_count'] = len(musicxml_data['parts'])
+        return musicxml_data
+
+    scan = scan_musicxml(musicxml_file)
+    if not scan or not scan['parts']:
+        return None
+
+    main_part = select_main_part(scan['parts'])
+    musicxml_data = parse_musicxml_part(scan, main_part['id'])
+    if musicxml_data:
+        musicxml_data['part_count'] = len(scan['parts'])
+    return musicxml_data
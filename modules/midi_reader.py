@@ -0,0 +1,330 @@
+"""
+Module de lecture des fichiers MIDI (Standard MIDI File)
+
+Un fichier MIDI contient déjà les hauteurs et les durées : il est lu
+directement, sans OCR, et converti en mélodie au même format que celle de
+MelodyExtractor (notes et silences avec midi, time, duration, measure...).
+
+Le fichier est lu en flux, événement par événement : seules les notes
+(début, durée, hauteur) sont conservées, regroupées par piste et canal.
+Les mesures sont calculées d'après les changements de métrique, le tempo et
+la tonalité d'après les premiers événements correspondants.
+"""
+import logging
+import struct
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Tuple, BinaryIO
+
+from .note_columns import NoteColumns
+
+logger = logging.getLogger(__name__)
+
+# Types de notes (durée en noires), du plus long au plus court
+NOTE_TYPES = [
+    ('whole', 4.0),
+    ('half', 2.0),
+    ('quarter', 1.0),
+    ('eighth', 0.5),
+    ('16th', 0.25),
+    ('32nd', 0.125)
+]
+
+# Canal General MIDI réservé aux percussions (0-based)
+DRUM_CHANNEL = 9
+
+# Nombre d'octets de données des messages de canal, selon leur type
+_CHANNEL_DATA_LENGTH = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+# Événements méta utilisés
+META_TRACK_NAME = 0x03
+META_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_KEY_SIGNATURE = 0x59
+
+
+class MidiFormatError(ValueError):
+    """Levée lorsqu'un fichier n'est pas un Standard MIDI File valide"""
+
+
+def read_midi(midi_file: Path, keep_rests: bool = True,
+              simplify_chords: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Lit un fichier MIDI et extrait sa mélodie principale
+
+    Args:
+        midi_file: Fichier .mid/.midi
+        keep_rests: Garder les silences dans la mélodie extraite
+        simplify_chords: Ne garder que la note la plus haute des notes simultanées
+
+    Returns:
+        Mélodie au format de MelodyExtractor.extract_melody, ou None en cas d'erreur
+    """
+    midi_file = Path(midi_file)
+    logger.info(f"Lecture MIDI: {midi_file}")
+
+    try:
+        with open(midi_file, 'rb') as f:
+            melody = _read_melody(f, keep_rests, simplify_chords)
+    except (OSError, MidiFormatError, struct.error) as e:
+        logger.error(f"Erreur de lecture MIDI: {e}")
+        return None
+
+    if melody is None:
+        logger.error("Aucune note trouvée dans le fichier MIDI")
+        return None
+
+    melody['source_file'] = str(midi_file)
+    logger.info(f"MIDI lu avec succès: {len(melody['notes'])} notes/événements")
+    return melody
+
+
+def iter_midi_events(source: BinaryIO) -> Iterator[Tuple[int, int, int, bytes]]:
+    """
+    Parcourt les événements d'un fichier MIDI au fil de la lecture
+
+    Le premier élément émis est l'en-tête : (-1, format, nombre de pistes,
+    division encodée sur 2 octets). Suivent les événements de chaque piste.
+
+    Args:
+        source: Objet fichier binaire
+
+    Yields:
+        (piste, tick absolu, statut, données) ; statut 0xFF pour un événement
+        méta, dont les données commencent par son type
+
+    Raises:
+        MidiFormatError: Si le fichier n'est pas un Standard MIDI File
+    """
+    chunk_type, length = _read_chunk_header(source)
+    if chunk_type != b'MThd' or length < 6:
+        raise MidiFormatError("en-tête MThd absent")
+    midi_format, track_count, division = struct.unpack('>HHH', source.read(6))
+    source.read(length - 6)
+    yield -1, midi_format, track_count, struct.pack('>H', division)
+
+    track = 0
+    while track < track_count:
+        header = source.read(8)
+        if len(header) < 8:
+            break
+        chunk_type, length = struct.unpack('>4sI', header)
+        data = source.read(length)
+        if chunk_type != b'MTrk':
+            # Bloc inconnu: ignoré, comme le prévoit la norme
+            continue
+        for tick, status, event in _iter_track(data):
+            yield track, tick, status, event
+        track += 1
+
+
+def _read_chunk_header(source: BinaryIO) -> Tuple[bytes, int]:
+    header = source.read(8)
+    if len(header) < 8:
+        raise MidiFormatError("fichier tronqué")
+    return struct.unpack('>4sI', header)
+
+
+def _read_varlen(data: bytes, pos: int) -> Tuple[int, int]:
+    """Lit une quantité de longueur variable; retourne (valeur, nouvelle position)"""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def _iter_track(data: bytes) -> Iterator[Tuple[int, int, bytes]]:
+    """Événements d'une piste: (tick absolu, statut, données)"""
+    pos = 0
+    tick = 0
+    running_status = None
+
+    try:
+        while pos < len(data):
+            delta, pos = _read_varlen(data, pos)
+            tick += delta
+            status = data[pos]
+
+            if status == 0xFF:
+                meta_type = data[pos + 1]
+                length, pos = _read_varlen(data, pos + 2)
+                yield tick, status, bytes([meta_type]) + _slice(data, pos, length)
+                pos += length
+            elif status in (0xF0, 0xF7):
+                # SysEx: ignoré
+                length, pos = _read_varlen(data, pos + 1)
+                pos += length
+            else:
+                if status & 0x80:
+                    if status >= 0xF0:
+                        # Messages système (F1-F6, F8-FE): interdits dans un fichier MIDI
+                        raise MidiFormatError(f"statut inattendu: 0x{status:02X}")
+                    running_status = status
+                    pos += 1
+                elif running_status is None:
+                    raise MidiFormatError("statut courant absent")
+                length = _CHANNEL_DATA_LENGTH[running_status & 0xF0]
+                yield tick, running_status, _slice(data, pos, length)
+                pos += length
+    except IndexError:
+        raise MidiFormatError("piste tronquée")
+
+
+def _slice(data: bytes, pos: int, length: int) -> bytes:
+    """Données d'un événement, qui doivent tenir dans la piste"""
+    if pos + length > len(data):
+        raise MidiFormatError("piste tronquée")
+    return data[pos:pos + length]
+
+
+def _read_melody(source: BinaryIO, keep_rests: bool, simplify_chords: bool) -> Optional[Dict[str, Any]]:
+    """Lit les événements et construit la mélodie de la voix principale"""
+    ticks_per_quarter = 480
+    voices: Dict[Tuple[int, int], List[List[int]]] = {}  # (piste, canal) → [début, fin, note]
+    # Notes en cours par touche, de la plus ancienne à la plus récente: une touche
+    # rejouée avant d'être relâchée (note-on puis note-off au même tick) est
+    # relâchée dans l'ordre où elle a été jouée
+    sounding: Dict[Tuple[int, int, int], List[List[int]]] = {}
+    time_signatures = []  # (tick, temps, unité)
+    metadata = {
+        'title': None,
+        'composer': None,
+        'key': None,
+        'time_signature': None,
+        'tempo': None
+    }
+
+    for track, tick, status, data in iter_midi_events(source):
+        if track < 0:
+            division = struct.unpack('>H', data)[0]
+            if division & 0x8000:
+                raise MidiFormatError("division SMPTE non supportée")
+            ticks_per_quarter = division or ticks_per_quarter
+            continue
+
+        if status == 0xFF:
+            meta_type, payload = data[0], data[1:]
+            if meta_type == META_TEMPO and metadata['tempo'] is None and len(payload) == 3:
+                metadata['tempo'] = round(60_000_000 / int.from_bytes(payload, 'big'))
+            elif meta_type == META_TIME_SIGNATURE and len(payload) >= 2:
+                time_signatures.append((tick, payload[0], 2 ** payload[1]))
+            elif meta_type == META_KEY_SIGNATURE and metadata['key'] is None and len(payload) == 2:
+                metadata['key'] = {
+                    'fifths': struct.unpack('b', payload[:1])[0],
+                    'mode': 'minor' if payload[1] else 'major'
+                }
+            elif meta_type == META_TRACK_NAME and metadata['title'] is None and track == 0:
+                metadata['title'] = payload.decode('latin-1').strip() or None
+            continue
+
+        kind, channel = status & 0xF0, status & 0x0F
+        if kind not in (0x80, 0x90) or channel == DRUM_CHANNEL:
+            continue
+
+        pitch, velocity = data[0], data[1]
+        key = (track, channel, pitch)
+        if kind == 0x90 and velocity > 0:
+            note = [tick, tick, pitch]
+            voices.setdefault((track, channel), []).append(note)
+            sounding.setdefault(key, []).append(note)
+        elif sounding.get(key):
+            sounding[key].pop(0)[1] = tick
+
+    if not voices:
+        return None
+
+    time_signatures.sort()
+    if time_signatures:
+        metadata['time_signature'] = f"{time_signatures[0][1]}/{time_signatures[0][2]}"
+
+    voice_id, notes = max(voices.items(), key=lambda item: _voice_score(item[1]))
+    melody_notes = _build_notes(notes, ticks_per_quarter, time_signatures, keep_rests, simplify_chords)
+    total_measures = max(melody_notes.measure, default=0)
+
+    return {
+        'notes': melody_notes,
+        'metadata': metadata,
+        'source_file': None,
+        'part_id': f"T{voice_id[0] + 1}C{voice_id[1] + 1}",
+        'total_measures': total_measures,
+        'divisions': ticks_per_quarter,
+        'time_signature': metadata['time_signature'] or '4/4',
+        'tempo': metadata['tempo'] or 120,
+        'key': metadata['key'],
+        'composer': metadata['composer'],
+        'title': metadata['title']
+    }
+
+
+def _voice_score(notes: List[List[int]]) -> float:
+    """Score de la voix principale (même critère que MelodyExtractor: notes nombreuses et aiguës)"""
+    avg_pitch = sum(note[2] for note in notes) / len(notes)
+    return len(notes) + avg_pitch * 10
+
+
+def _build_notes(notes: List[List[int]], ticks_per_quarter: int, time_signatures: List[Tuple[int, int, int]],
+                 keep_rests: bool, simplify_chords: bool) -> NoteColumns:
+    """Convertit les notes (début, fin, hauteur) en événements monophoniques (table en colonnes)"""
+    notes = sorted(notes, key=lambda note: (note[0], -note[2]))
+    if simplify_chords:
+        # Notes simultanées: la plus haute (la première après le tri) porte la mélodie
+        notes = [note for i, note in enumerate(notes) if i == 0 or note[0] != notes[i - 1][0]]
+
+    measure_of = _measure_locator(ticks_per_quarter, time_signatures)
+    events = NoteColumns()
+    position = 0
+
+    for i, (start, end, pitch) in enumerate(notes):
+        if start > position and keep_rests:
+            rest = start - position
+            events.add_rest(position, rest, _note_type(rest, ticks_per_quarter), measure_of(position))
+
+        # Une note tenue s'arrête au début de la suivante (ligne monophonique)
+        if i + 1 < len(notes):
+            end = min(end, notes[i + 1][0])
+        duration = max(end - start, 1)
+        step, alter, octave = _spell(pitch)
+        events.add_note(pitch, start, duration, _note_type(duration, ticks_per_quarter), measure_of(start),
+                        step, octave, alter)
+        position = max(position, start + duration)
+
+    return events
+
+
+def _measure_locator(ticks_per_quarter: int, time_signatures: List[Tuple[int, int, int]]):
+    """Retourne une fonction tick → numéro de mesure (1-based) tenant compte des changements de métrique"""
+    segments = [(0, 1, ticks_per_quarter * 4)]  # (tick de début, première mesure, ticks par mesure), 4/4 par défaut
+    for tick, beats, beat_type in time_signatures:
+        start, first_measure, length = segments[-1]
+        # Un changement en cours de mesure ouvre une nouvelle mesure
+        measure = first_measure + -(-(tick - start) // length)
+        if tick == start:
+            segments.pop()
+            measure = first_measure
+        segments.append((tick, measure, max(1, beats * ticks_per_quarter * 4 // beat_type)))
+
+    def measure_of(tick: int) -> int:
+        for start, first_measure, length in reversed(segments):
+            if tick >= start:
+                return first_measure + (tick - start) // length
+        return 1
+
+    return measure_of
+
+
+def _note_type(duration: int, ticks_per_quarter: int) -> str:
+    """Type de note le plus long contenu dans la durée (une noire pointée reste une noire)"""
+    quarters = duration / ticks_per_quarter
+    for note_type, length in NOTE_TYPES:
+        if quarters >= length * 0.99:
+            return note_type
+    return NOTE_TYPES[-1][0]
+
+
+def _spell(pitch: int) -> Tuple[str, int, int]:
+    """Nom, altération et octave d'un numéro MIDI (dièses; C4 = 60)"""
+    step, alter = [('C', 0), ('C', 1), ('D', 0), ('D', 1), ('E', 0), ('F', 0),
+                   ('F', 1), ('G', 0), ('G', 1), ('A', 0), ('A', 1), ('B', 0)][pitch % 12]
+    return step, alter, pitch // 12 - 1
@@ -4,6 +4,8 @@ Module d'analyse musicale (accords, tessiture, tonalité)
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 
+from .note_columns import NoteColumns
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,14 +54,12 @@ class MusicAnalyzer:
         if not melody:
             return 'C'  # Par défaut
 
-        # Filtrer les silences
-        notes_only = [n for n in melody if n.get('type') == 'note']
+        # Prendre la première note (hors silences) comme tonique (très basique)
+        first_note = next((n for n in melody if n.get('type') == 'note'), None)
 
-        if not notes_only:
+        if first_note is None:
             return 'C'
 
-        # Prendre la première note comme tonique (très basique)
-        first_note = notes_only[0]
         pitch = first_note.get('pitch', 'C')
 
         # Retourner la note sans l'octave
@@ -76,8 +76,12 @@ class MusicAnalyzer:
         Returns:
             Dict {'lowest': note_min, 'highest': note_max} ex: {'lowest': 'C4', 'highest': 'G5'}
         """
-        # Filtrer les silences
-        notes_only = [n for n in melody if n.get('type') == 'note']
+        if isinstance(melody, NoteColumns):
+            # Un nom de note par hauteur distincte (dans l'ordre d'apparition)
+            notes_only = [{'pitch': pitch, 'octave': octave} for pitch, octave in melody.spellings()]
+        else:
+            # Filtrer les silences
+            notes_only = [n for n in melody if n.get('type') == 'note']
 
         if not notes_only:
             return {'lowest': 'C4', 'highest': 'C4'}
@@ -0,0 +1,791 @@
+"""
+Module de parsing des fichiers MusicXML générés par Audiveris
+
+Parser commun à tous les backends OCR (CLI, HTTP, fixtures) : il transforme
+un fichier MusicXML (.xml) ou MXL (.mxl compressé), sur disque ou en mémoire,
+en dictionnaire structuré (métadonnées, parties, mesures, notes).
+
+Le fichier est lu en flux (iterparse) : chaque mesure est convertie dès sa
+fermeture puis libérée, si bien que l'arbre XML complet n'est jamais construit
+et que les archives MXL sont décompressées directement dans le parser. La
+partition d'une archive est le rootfile désigné par META-INF/container.xml.
+
+Ce même parcours place les notes dans le temps : chaque note porte son début
+absolu (onset) et sa durée en ticks de la partie (divisions), accords, voix
+(<backup>/<forward>) et notes liées étant résolus à la lecture.
+
+Si lxml est installé, son iterparse (libxml2) remplace celui de la
+bibliothèque standard ; le résultat est identique.
+"""
+import io
+import logging
+import mmap
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Set, Tuple
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+# Version du résultat du parsing, à incrémenter quand sa structure ou son contenu
+# change (invalide les partitions conservées par parse_cache)
+PARSER_VERSION = 2
+
+# Implémentation XML utilisée: 'lxml' si disponible, sinon 'etree' (bibliothèque standard)
+XML_BACKEND = 'lxml' if lxml_etree is not None else 'etree'
+
+# Éléments traités par _iter_score: lxml ne remonte qu'eux à Python
+# (les autres restent dans l'arbre, accessibles depuis leur mesure)
+SCORE_TAGS = ('part', 'measure', 'work-title', 'creator', 'key', 'time', 'sound')
+
+# Conteneur des archives MXL: désigne la partition (rootfile) parmi les fichiers
+MXL_CONTAINER = 'META-INF/container.xml'
+MXL_CONTAINER_MAX_SIZE = 1024 * 1024
+# Types des rootfiles MusicXML (le premier est la valeur par défaut de media-type)
+MUSICXML_MEDIA_TYPES = ('application/vnd.recordare.musicxml+xml', 'application/vnd.recordare.musicxml')
+
+# Recherche textuelle des parties (scan_musicxml, fichiers non compressés)
+PART_START = re.compile(rb'<part(?=[\s>/])')
+PART_ID = re.compile(rb'\sid\s*=\s*(["\'])(.*?)\1')
+PART_END = re.compile(rb'</part\s*>')
+XML_DECLARATION = re.compile(rb'(?:\xef\xbb\xbf)?<\?xml[^>]*\?>')
+
+# Demi-tons depuis C de chaque nom de note
+STEP_SEMITONES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+# Erreurs de syntaxe XML des deux implémentations
+XML_PARSE_ERRORS = (ET.ParseError,) + ((lxml_etree.XMLSyntaxError,) if lxml_etree is not None else ())
+
+
+def parse_musicxml(musicxml_file: Path, part_ids: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse un fichier MusicXML et extrait les informations
+
+    Args:
+        musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl compressé) généré par Audiveris
+        part_ids: Parties à lire (toutes si None) ; les autres sont sautées sans extraire leurs notes
+
+    Returns:
+        Dictionnaire structuré avec les données musicales ou None en cas d'erreur
+    """
+    musicxml_file = Path(musicxml_file)
+    logger.info(f"Parsing MusicXML: {musicxml_file}")
+    is_mxl = _is_mxl_file(musicxml_file)
+    if is_mxl is None:
+        return None
+    return parse_musicxml_source(musicxml_file, is_mxl, str(musicxml_file), part_ids)
+
+
+def parse_musicxml_bytes(data: bytes, source_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse un MusicXML reçu en mémoire, sans passer par le disque
+
+    Args:
+        data: Contenu du fichier MusicXML (.xml) ou MXL (.mxl compressé)
+        source_name: Nom du fichier d'origine (conservé dans source_file)
+
+    Returns:
+        Dictionnaire structuré avec les données musicales ou None en cas d'erreur
+    """
+    logger.info(f"Parsing MusicXML en mémoire: {source_name}")
+    # Une archive MXL est un zip: on se fie à la signature plutôt qu'au nom
+    return parse_musicxml_source(io.BytesIO(data), data[:4] == b'PK\x03\x04', source_name)
+
+
+def parse_musicxml_source(source, is_mxl: bool, source_name: str,
+                          part_ids: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse un MusicXML depuis un chemin ou un objet fichier
+
+    Args:
+        source: Chemin ou objet fichier binaire
+        is_mxl: La source est une archive MXL compressée
+        source_name: Valeur de source_file dans le résultat
+        part_ids: Parties à lire (toutes si None)
+
+    Returns:
+        Dictionnaire structuré avec les données musicales ou None en cas d'erreur
+    """
+    wanted = set(part_ids) if part_ids is not None else None
+    score = _read_score(source, is_mxl, lambda xml_file: _collect_score(xml_file, wanted))
+    if score is None:
+        return None
+    metadata, parts = score
+
+    result = {
+        'metadata': metadata,
+        'parts': parts,
+        'source_file': source_name
+    }
+
+    logger.info(f"MusicXML parsé avec succès: {len(parts)} partie(s)")
+    return result
+
+
+def scan_musicxml(musicxml_file: Path) -> Optional[Dict[str, Any]]:
+    """
+    Pré-lecture d'un fichier MusicXML: métadonnées et statistiques de chaque partie
+
+    Les notes ne sont ni construites ni conservées : seuls sont relevés, par
+    partie, le nombre de notes et de silences (notes liées fusionnées, comme
+    au parsing complet), la somme et l'étendue des hauteurs MIDI et le nombre
+    de mesures. De quoi choisir la partie à lire ensuite avec
+    parse_musicxml_part. Pour un fichier non compressé, la position de chaque
+    partie dans le fichier est aussi relevée (spans) : la lecture d'une
+    partie ne parcourt alors que ses propres octets.
+
+    Args:
+        musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl compressé)
+
+    Returns:
+        {'metadata', 'parts': [statistiques], 'source_file', 'spans'} ou None en cas d'erreur ;
+        statistiques: id, notes, pitched, pitch_sum, min_midi, max_midi, measures, density ;
+        spans: (début, fin) en octets de chaque partie, None si inconnus
+    """
+    musicxml_file = Path(musicxml_file)
+    logger.info(f"Pré-lecture MusicXML: {musicxml_file}")
+    is_mxl = _is_mxl_file(musicxml_file)
+    if is_mxl is None:
+        return None
+    score = _read_score(musicxml_file, is_mxl, _scan_score)
+    if score is None:
+        return None
+    metadata, parts = score
+
+    logger.info(f"MusicXML pré-lu: {len(parts)} partie(s)")
+    return {
+        'metadata': metadata,
+        'parts': parts,
+        'source_file': str(musicxml_file),
+        'spans': None if is_mxl or not parts else _part_spans(musicxml_file, [part['id'] for part in parts])
+    }
+
+
+def parse_musicxml_part(scan: Dict[str, Any], part_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Lit complètement une seule partie d'un fichier pré-lu par scan_musicxml
+
+    Si la position de la partie est connue, seuls ses octets sont parsés ;
+    le résultat est vérifié contre les statistiques de la pré-lecture et,
+    au moindre écart, la partie est relue en parcourant tout le fichier.
+
+    Args:
+        scan: Résultat de scan_musicxml
+        part_id: Partie à lire
+
+    Returns:
+        Données MusicXML (métadonnées de toute la partition, cette seule partie) ou None en cas d'erreur
+    """
+    musicxml_file = Path(scan['source_file'])
+    index = next((i for i, part in enumerate(scan['parts']) if part['id'] == part_id), None)
+
+    if scan.get('spans') and index is not None:
+        logger.info(f"Lecture de la partie {part_id} seule: {musicxml_file}")
+        with _PartSource(musicxml_file, scan['spans'][index]) as source:
+            score = _read_score(source, False, _collect_score)
+        if score is not None and _matches_scan(score[1], scan['parts'][index]):
+            return {
+                'metadata': dict(scan['metadata']),
+                'parts': score[1],
+                'source_file': scan['source_file']
+            }
+        logger.warning(f"Partie {part_id} mal délimitée dans le fichier, lecture complète")
+
+    return parse_musicxml(musicxml_file, part_ids=[part_id])
+
+
+def count_parts(musicxml_file: Path) -> Optional[int]:
+    """
+    Nombre de balises <part> d'un MusicXML non compressé (recherche textuelle, sans parsing)
+
+    Estimation rapide (un commentaire peut la fausser), pour décider s'il y
+    a lieu de pré-lire la partition.
+
+    Args:
+        musicxml_file: Fichier MusicXML
+
+    Returns:
+        Nombre de parties ou None (archive MXL, fichier illisible ou vide)
+    """
+    if _is_mxl_file(musicxml_file) is not False:
+        return None
+    try:
+        with open(musicxml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return sum(1 for _ in PART_START.finditer(data))
+    except (OSError, ValueError):
+        return None
+
+
+def _is_mxl_file(musicxml_file: Path) -> Optional[bool]:
+    """Le fichier est-il une archive MXL (None s'il est illisible)"""
+    # Une archive MXL est un zip: on se fie à la signature plutôt qu'au nom
+    try:
+        with open(musicxml_file, 'rb') as f:
+            return f.read(4) == b'PK\x03\x04'
+    except OSError as e:
+        logger.error(f"Impossible de lire {musicxml_file}: {e}")
+        return None
+
+
+def _read_score(source, is_mxl: bool, read: Callable[[Any], Any]) -> Optional[Any]:
+    """Applique read au XML de la source (décompressé en flux si MXL), None en cas d'erreur"""
+    try:
+        # Gérer les fichiers .mxl (compressés)
+        if is_mxl:
+            logger.info("Fichier MXL détecté - décompression en cours")
+            with zipfile.ZipFile(source, 'r') as zip_ref:
+                main_xml = _find_main_xml(zip_ref)
+                if main_xml is None:
+                    logger.error("Aucun fichier XML trouvé dans l'archive MXL")
+                    return None
+
+                logger.info(f"Extraction de {main_xml} depuis l'archive MXL")
+
+                # Décompression au fil de l'eau, directement dans le parser
+                with zip_ref.open(main_xml) as xml_file:
+                    return read(xml_file)
+
+        # Fichier XML non compressé
+        return read(source)
+
+    except XML_PARSE_ERRORS as e:
+        logger.error(f"Erreur de parsing XML: {e}")
+        return None
+    except zipfile.BadZipFile as e:
+        logger.error(f"Erreur: fichier MXL corrompu: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Erreur lors du parsing MusicXML: {e}")
+        return None
+
+
+def iter_measures(source, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Parcourt les mesures d'un MusicXML au fil de la lecture
+
+    Les éléments sont libérés dès qu'une mesure est traitée : la mémoire
+    utilisée ne dépend pas de la taille du fichier.
+
+    Args:
+        source: Chemin ou objet fichier binaire (MusicXML non compressé)
+        metadata: Dictionnaire complété avec les métadonnées rencontrées (optionnel)
+
+    Yields:
+        (identifiant de la partie, mesure)
+    """
+    for event, part_id, measure in _iter_score(source, metadata if metadata is not None else _empty_metadata()):
+        if event == 'measure':
+            yield part_id, measure
+
+
+def _find_main_xml(zip_ref: zipfile.ZipFile) -> Optional[str]:
+    """
+    Trouve le fichier XML principal d'une archive MXL
+
+    Le fichier désigné par META-INF/container.xml (premier rootfile MusicXML)
+    fait foi ; à défaut (conteneur absent, illisible ou pointant hors de
+    l'archive), le premier fichier .xml ou .musicxml hors de META-INF.
+    """
+    names = zip_ref.namelist()
+
+    rootfile = _read_container(zip_ref, names)
+    if rootfile is not None:
+        return rootfile
+
+    xml_files = [f for f in names
+                 if f.lower().endswith(('.xml', '.musicxml')) and not f.startswith('META-INF/')]
+    return xml_files[0] if xml_files else None
+
+
+def _read_container(zip_ref: zipfile.ZipFile, names: List[str]) -> Optional[str]:
+    """Premier rootfile MusicXML de META-INF/container.xml présent dans l'archive (None sinon)"""
+    if MXL_CONTAINER not in names:
+        return None
+    if zip_ref.getinfo(MXL_CONTAINER).file_size > MXL_CONTAINER_MAX_SIZE:
+        logger.warning(f"{MXL_CONTAINER} trop volumineux, ignoré")
+        return None
+
+    try:
+        with zip_ref.open(MXL_CONTAINER) as container:
+            for _, elem in ET.iterparse(container):
+                # Nom local: le conteneur peut déclarer un espace de noms
+                if elem.tag.rsplit('}', 1)[-1] != 'rootfile':
+                    continue
+                media_type = elem.get('media-type') or MUSICXML_MEDIA_TYPES[0]
+                if media_type not in MUSICXML_MEDIA_TYPES:
+                    continue
+                full_path = (elem.get('full-path') or '').lstrip('/')
+                if full_path in names:
+                    return full_path
+                logger.warning(f"Rootfile {full_path!r} absent de l'archive MXL")
+                return None
+    except ET.ParseError as e:
+        logger.warning(f"{MXL_CONTAINER} illisible: {e}")
+    return None
+
+
+def _empty_metadata() -> Dict[str, Any]:
+    return {
+        'title': None,
+        'composer': None,
+        'key': None,
+        'time_signature': None,
+        'tempo': None
+    }
+
+
+def _collect_score(source, part_ids: Optional[Set[str]] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Lit la partition: métadonnées et parties (avec leurs mesures), limitées à part_ids si précisé"""
+    metadata = _empty_metadata()
+    parts = []
+
+    for event, part_id, item in _iter_score(source, metadata, _Timeline, part_ids):
+        if event == 'part':
+            timeline = item
+            parts.append({
+                'id': part_id,
+                'measures': [],
+                'divisions': None
+            })
+        else:
+            parts[-1]['measures'].append(item)
+            parts[-1]['divisions'] = timeline.divisions
+
+    return metadata, parts
+
+
+def _scan_score(source) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Pré-lecture: métadonnées et statistiques de chaque partie"""
+    metadata = _empty_metadata()
+    scans = []
+
+    for event, part_id, item in _iter_score(source, metadata, _PartScan):
+        if event == 'part':
+            scans.append((part_id, item))
+
+    return metadata, [scan.statistics(part_id) for part_id, scan in scans]
+
+
+def _iterparse(source) -> Iterator[Tuple[str, Any]]:
+    """iterparse (événements start/end) de l'implémentation XML_BACKEND"""
+    if XML_BACKEND == 'lxml':
+        if isinstance(source, Path):
+            source = str(source)
+        # Ni DTD externe ni entités: le MusicXML vient d'un upload
+        return lxml_etree.iterparse(source, events=('start', 'end'), tag=SCORE_TAGS,
+                                    resolve_entities=False, no_network=True, huge_tree=True)
+    return ET.iterparse(source, events=('start', 'end'))
+
+
+def _part_spans(musicxml_file: Path, part_ids: List[str]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Positions (début, fin) en octets des éléments <part>, dans l'ordre du document
+
+    Simple recherche textuelle (mmap), validée par les identifiants relevés à
+    la pré-lecture : None si elle ne les retrouve pas tous, dans l'ordre
+    (encodage multi-octets, balise dans un commentaire...).
+    """
+    spans = []
+    try:
+        with open(musicxml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            for part_id in part_ids:
+                start = PART_START.search(data, position)
+                if start is None:
+                    return None
+                tag_end = data.find(b'>', start.end())
+                id_match = PART_ID.search(data, start.end(), tag_end)
+                if tag_end < 0 or id_match is None or id_match.group(2).decode('utf-8', 'replace') != part_id:
+                    return None
+                if data[tag_end - 1:tag_end] == b'/':
+                    end = tag_end + 1
+                else:
+                    end_match = PART_END.search(data, tag_end)
+                    if end_match is None:
+                        return None
+                    end = end_match.end()
+                spans.append((start.start(), end))
+                position = end
+    except (OSError, ValueError) as e:
+        logger.warning(f"Positions des parties introuvables: {e}")
+        return None
+    return spans
+
+
+class _PartSource:
+    """
+    Objet fichier binaire exposant un seul élément <part> d'un MusicXML
+
+    Le document lu est le prologue XML du fichier (déclaration d'encodage),
+    puis <score-partwise>, les octets de la partie et </score-partwise> ;
+    la partie est lue par blocs, sans être chargée entière en mémoire.
+    """
+
+    def __init__(self, musicxml_file: Path, span: Tuple[int, int]):
+        self._file = open(musicxml_file, 'rb')
+        prolog = XML_DECLARATION.match(self._file.read(1024))
+        self._buffer = (prolog.group(0) if prolog else b'') + b'<score-partwise>'
+        self._file.seek(span[0])
+        self._remaining = span[1] - span[0]
+        self._closed = False
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._buffer) + self._remaining + 32
+        while len(self._buffer) < size and not self._closed:
+            chunk = self._file.read(min(self._remaining, 64 * 1024)) if self._remaining else b''
+            self._remaining -= len(chunk)
+            self._buffer += chunk
+            if not chunk:
+                self._buffer += b'</score-partwise>'
+                self._closed = True
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _matches_scan(parts: List[Dict[str, Any]], statistics: Dict[str, Any]) -> bool:
+    """La partie lue correspond-elle à celle de la pré-lecture (mêmes mesures, même nombre de notes)"""
+    return (len(parts) == 1 and parts[0]['id'] == statistics['id']
+            and len(parts[0]['measures']) == statistics['measures']
+            and sum(len(measure['notes']) for measure in parts[0]['measures']) == statistics['notes'])
+
+
+def _iter_score(source, metadata: Dict[str, Any], reader: Optional[Callable[[], Any]] = None,
+                part_ids: Optional[Set[str]] = None) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """
+    Parcourt un MusicXML avec iterparse
+
+    Émet ('part', id, lecteur) à l'ouverture de chaque partie puis
+    ('measure', id, mesure) à la fermeture de chacune de ses mesures.
+    Le lecteur de la partie (reader(), _Timeline par défaut) convertit
+    chaque mesure : la timeline place les notes dans le temps au fil des
+    mesures. Les parties absentes de part_ids ne sont pas émises et leurs
+    mesures sont libérées sans être lues.
+    Les métadonnées (première occurrence de chaque information) sont
+    relevées au passage dans le dictionnaire metadata.
+    """
+    pending = {'work-title', 'creator', 'key', 'time', 'sound'}
+    reader = reader or _Timeline
+    part = None
+    part_id = None
+    part_reader = None
+
+    for event, elem in _iterparse(source):
+        tag = elem.tag
+
+        if event == 'start':
+            if tag == 'part' and part is None:
+                part = elem
+                part_id = elem.get('id')
+                part_reader = None
+                if part_ids is None or part_id in part_ids:
+                    part_reader = reader()
+                    yield 'part', part_id, part_reader
+            continue
+
+        if tag == 'measure' and part is not None:
+            if part_reader is not None:
+                measure_number = elem.get('number')
+                measure = {'number': int(measure_number) if measure_number else 0}
+                measure.update(part_reader.read_measure(elem))
+                yield 'measure', part_id, measure
+            # Libérer la mesure traitée (la partie ne garde que la mesure en cours)
+            elem.clear()
+            part.remove(elem)
+
+        elif elem is part:
+            elem.clear()
+            part = None
+
+        # Métadonnées: seule la première occurrence compte
+        elif tag in pending:
+            if tag == 'work-title':
+                metadata['title'] = elem.text
+
+            elif tag == 'creator':
+                if elem.get('type') != 'composer':
+                    continue
+                metadata['composer'] = elem.text
+
+            elif tag == 'key':
+                fifths = elem.find('fifths')
+                mode = elem.find('mode')
+                if fifths is not None:
+                    metadata['key'] = {
+                        'fifths': int(fifths.text),
+                        'mode': mode.text if mode is not None else 'major'
+                    }
+
+            elif tag == 'time':
+                beats = elem.find('beats')
+                beat_type = elem.find('beat-type')
+                if beats is not None and beat_type is not None:
+                    metadata['time_signature'] = f"{beats.text}/{beat_type.text}"
+
+            elif tag == 'sound':
+                if elem.get('tempo') is None:
+                    continue
+                metadata['tempo'] = int(float(elem.get('tempo')))
+
+            pending.discard(tag)
+
+
+class _Timeline:
+    """
+    Position dans une partie, mesure après mesure
+
+    Chaque note reçoit son début absolu (onset) et sa durée en ticks de la
+    partie : l'unité est la première valeur de <divisions> (divisions par
+    noire), un changement ultérieur étant converti dans cette unité. Un
+    accord (<chord/>) démarre avec la note précédente, <backup> et <forward>
+    déplacent la position (une voix après l'autre), et une note liée
+    (<tie type="stop"/>) est fusionnée dans la note qu'elle prolonge, y
+    compris d'une mesure à l'autre.
+    """
+
+    def __init__(self):
+        self.divisions: Optional[int] = None
+        self._current: Optional[int] = None  # divisions en vigueur
+        self.position = 0  # début de la prochaine mesure (ticks)
+        self._ties: Dict[Tuple, Dict[str, Any]] = {}  # (voix, hauteur) → note en attente de sa suite
+
+    def read_measure(self, measure: ET.Element) -> Dict[str, Any]:
+        """
+        Lit une mesure en un seul parcours de ses éléments
+
+        Args:
+            measure: Élément <measure>
+
+        Returns:
+            {'notes', 'start', 'length'} (début et longueur de la mesure en ticks)
+        """
+        start = self.position
+        cursor = last_onset = length = 0  # relatifs au début de la mesure
+        notes = []
+
+        for child in measure:
+            tag = child.tag
+            if tag == 'note':
+                note, chord, ties = _extract_note(child)
+                duration = note.get('duration')
+                if duration is not None:
+                    duration = note['duration'] = self._ticks(duration)
+                if not chord:
+                    last_onset = cursor
+                    cursor += duration or 0
+                note['onset'] = start + last_onset
+                length = max(length, last_onset + (duration or 0))
+
+                if ties and note['type'] == 'note' and 'pitch' in note:
+                    key = (note['voice'], tuple(note['pitch'].values()))
+                    tied = self._ties.pop(key, None) if 'stop' in ties else None
+                    if tied is not None:
+                        # Suite d'une note liée: elle ne fait qu'allonger la note de départ
+                        tied['duration'] = (tied.get('duration') or 0) + (duration or 0)
+                        if 'start' in ties:
+                            self._ties[key] = tied
+                        continue
+                    if 'start' in ties:
+                        self._ties[key] = note
+                notes.append(note)
+
+            elif tag == 'backup':
+                cursor = max(0, cursor - self._ticks(_duration_of(child)))
+            elif tag == 'forward':
+                cursor += self._ticks(_duration_of(child))
+                length = max(length, cursor)
+            elif tag == 'attributes':
+                divisions = child.find('divisions')
+                if divisions is not None and divisions.text and divisions.text.strip().isdigit():
+                    self._current = int(divisions.text) or self._current
+                    if self.divisions is None:
+                        self.divisions = self._current
+
+        self.position = start + length
+        return {'notes': notes, 'start': start, 'length': length}
+
+    def _ticks(self, duration: int) -> int:
+        """Convertit une durée (divisions en vigueur) en ticks de la partie"""
+        if self._current == self.divisions:
+            return duration
+        return round(duration * self.divisions / self._current)
+
+
+class _PartScan:
+    """
+    Statistiques d'une partie, relevées mesure par mesure sans construire les notes
+
+    Les notes comptées sont celles que produirait _Timeline (une note liée
+    à la précédente n'est pas comptée).
+    """
+
+    def __init__(self):
+        self.notes = 0
+        self.pitched = 0
+        self.pitch_sum = 0
+        self.min_midi: Optional[int] = None
+        self.max_midi: Optional[int] = None
+        self.measures = 0
+        self._ties: Set[Tuple] = set()  # (voix, hauteur) des notes en attente de leur suite
+
+    def read_measure(self, measure: ET.Element) -> Dict[str, Any]:
+        """Compte les notes d'une mesure (rien n'est conservé)"""
+        self.measures += 1
+
+        for note in measure:
+            if note.tag != 'note':
+                continue
+
+            is_rest = False
+            pitch = voice = None
+            ties = set()
+            for child in note:
+                tag = child.tag
+                if tag == 'pitch':
+                    if pitch is None:
+                        pitch = child
+                elif tag == 'rest':
+                    is_rest = True
+                elif tag == 'tie':
+                    ties.add(child.get('type'))
+                elif tag == 'voice':
+                    if voice is None:
+                        voice = child
+
+            if is_rest or pitch is None:
+                self.notes += 1
+                continue
+            step, octave, alter = _extract_pitch(pitch).values()
+
+            if ties:
+                voice = int(voice.text) if voice is not None and voice.text and voice.text.strip().isdigit() else 1
+                key = (voice, (step, octave, alter))
+                if 'stop' in ties and key in self._ties:
+                    if 'start' not in ties:
+                        self._ties.discard(key)
+                    continue
+                if 'start' in ties:
+                    self._ties.add(key)
+
+            self.notes += 1
+            if step and octave is not None:
+                midi = (octave + 1) * 12 + STEP_SEMITONES.get(step.upper(), 0) + alter
+                self.pitched += 1
+                self.pitch_sum += midi
+                self.min_midi = midi if self.min_midi is None else min(self.min_midi, midi)
+                self.max_midi = midi if self.max_midi is None else max(self.max_midi, midi)
+
+        return {}
+
+    def statistics(self, part_id: str) -> Dict[str, Any]:
+        """Statistiques de la partie (density: notes par mesure)"""
+        return {
+            'id': part_id,
+            'notes': self.notes,
+            'pitched': self.pitched,
+            'pitch_sum': self.pitch_sum,
+            'min_midi': self.min_midi,
+            'max_midi': self.max_midi,
+            'measures': self.measures,
+            'density': self.notes / self.measures if self.measures else 0.0
+        }
+
+
+def _duration_of(element: ET.Element) -> int:
+    """Valeur de <duration> d'un élément <backup> ou <forward> (0 si absente)"""
+    duration = element.find('duration')
+    return int(duration.text) if duration is not None else 0
+
+
+def _extract_note(note: ET.Element) -> Tuple[Dict[str, Any], bool, set]:
+    """
+    Extrait une note (ou un silence)
+
+    Chaque note est parcourue une seule fois (pas de find() par champ) ;
+    comme avec find(), seule la première occurrence d'un élément compte.
+
+    Returns:
+        (note, fait partie d'un accord, types de <tie> : start et/ou stop)
+    """
+    is_rest = chord = False
+    pitch = duration = note_type = voice = None
+    ties = set()
+    for child in note:
+        tag = child.tag
+        if tag == 'pitch':
+            if pitch is None:
+                pitch = child
+        elif tag == 'rest':
+            is_rest = True
+        elif tag == 'chord':
+            chord = True
+        elif tag == 'duration':
+            if duration is None:
+                duration = child
+        elif tag == 'tie':
+            ties.add(child.get('type'))
+        elif tag == 'type':
+            if note_type is None:
+                note_type = child
+        elif tag == 'voice':
+            if voice is None:
+                voice = child
+
+    # Note ou silence
+    note_data = {'type': 'rest' if is_rest else 'note'}
+
+    if not is_rest and pitch is not None:
+        note_data['pitch'] = _extract_pitch(pitch)
+
+    # Durée
+    if duration is not None:
+        note_data['duration'] = int(duration.text)
+
+    # Type de note (quarter, eighth, etc.)
+    if note_type is not None:
+        note_data['note_type'] = note_type.text
+
+    # Voix (plusieurs voix peuvent partager une portée)
+    if voice is not None and voice.text and voice.text.strip().isdigit():
+        note_data['voice'] = int(voice.text)
+    else:
+        note_data['voice'] = 1
+
+    return note_data, chord, ties
+
+
+def _extract_pitch(pitch: ET.Element) -> Dict[str, Any]:
+    """Hauteur d'une note (step, octave, alter)"""
+    step = octave = alter = None
+    for child in pitch:
+        tag = child.tag
+        if tag == 'step':
+            if step is None:
+                step = child
+        elif tag == 'octave':
+            if octave is None:
+                octave = child
+        elif tag == 'alter':
+            if alter is None:
+                alter = child
+
+    return {
+        'step': step.text if step is not None else None,
+        'octave': int(octave.text) if octave is not None else None,
+        'alter': int(alter.text) if alter is not None else 0
+    }
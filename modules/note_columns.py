@@ -0,0 +1,251 @@
+"""
+Module de représentation en colonnes des notes d'une mélodie
+
+Les étapes du pipeline (analyse, transposition, tablature) parcouraient des
+listes de dictionnaires, un par note, recopiées pour chaque transposition
+essayée. NoteColumns range les mêmes informations dans des colonnes
+parallèles (array.array) : une note occupe 25 octets au lieu de
+plusieurs centaines, et une transposition ne remplace que les colonnes de
+hauteur, les autres étant partagées.
+
+Pour les appelants existants, NoteColumns se comporte comme une liste de
+notes : l'indexation et l'itération renvoient le dictionnaire habituel de
+MelodyExtractor (type, pitch, octave, alter, duration, note_type, measure,
+time, midi), construit à la demande.
+"""
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Valeurs absentes (None dans la vue dictionnaire)
+NO_LABEL = -1
+NO_DURATION = -1
+NO_OCTAVE = -128
+
+# Noms des notes après transposition (demi-tons depuis C)
+SEMITONE_NAMES = ('C', 'C#', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B')
+
+
+class NoteColumns:
+    """
+    Notes et silences d'une mélodie, en colonnes parallèles
+
+    Colonnes: midi, rest (drapeau silence), onset (début en divisions),
+    duration, measure, voice, part (index dans part_ids), pitch, octave,
+    alter et note_type ; pitch et note_type sont des index dans labels.
+    Les tables dérivées (transposed) partagent les colonnes inchangées :
+    une table n'est complétée (add_note/add_rest) que pendant sa construction.
+    """
+
+    def __init__(self, part_ids: Optional[List[str]] = None):
+        """
+        Args:
+            part_ids: Identifiants des parties (colonne part = index dans cette liste)
+        """
+        self.part_ids = list(part_ids or [])
+        self.labels: List[str] = []
+        self._label_codes: Dict[str, int] = {}
+        self.midi = array('h')
+        self.rest = array('b')
+        self.onset = array('i')
+        self.duration = array('i')
+        self.measure = array('i')
+        self.voice = array('h')
+        self.part = array('h')
+        self.pitch = array('h')
+        self.octave = array('b')
+        self.alter = array('b')
+        self.note_type = array('h')
+
+    @classmethod
+    def from_notes(cls, notes: Iterable[Dict[str, Any]]) -> 'NoteColumns':
+        """
+        Construit la table depuis des notes au format de MelodyExtractor
+
+        Args:
+            notes: Notes et silences (dictionnaires)
+
+        Returns:
+            Table équivalente
+        """
+        columns = cls()
+        for note in notes:
+            if note['type'] == 'rest':
+                columns.add_rest(note.get('time', 0), note.get('duration'), note.get('note_type'),
+                                 note.get('measure', 0))
+            else:
+                columns.add_note(note.get('midi', 0), note.get('time', 0), note.get('duration'),
+                                 note.get('note_type'), note.get('measure', 0), note.get('pitch'),
+                                 note.get('octave'), note.get('alter', 0))
+        return columns
+
+    def add_note(self, midi: int, time: int, duration: Optional[int], note_type: Optional[str],
+                 measure: int, pitch: Optional[str], octave: Optional[int], alter: int = 0,
+                 voice: int = 1, part: int = 0):
+        """
+        Ajoute une note
+
+        Args:
+            midi: Hauteur MIDI (C4 = 60)
+            time: Début (divisions depuis le début de la partie)
+            duration: Durée en divisions (None si inconnue)
+            note_type: Type de note (quarter, eighth...)
+            measure: Numéro de mesure
+            pitch: Nom de la note (C, D... ou F#, Bb après transposition)
+            octave: Octave
+            alter: Altération (-1 = bémol, 0 = naturel, 1 = dièse)
+            voice: Voix MusicXML
+            part: Index de la partie dans part_ids
+        """
+        self._append(0, midi, time, duration, note_type, measure, voice, part)
+        self.pitch.append(self._label(pitch))
+        self.octave.append(NO_OCTAVE if octave is None else octave)
+        self.alter.append(alter or 0)
+
+    def add_rest(self, time: int, duration: Optional[int], note_type: Optional[str], measure: int,
+                 voice: int = 1, part: int = 0):
+        """
+        Ajoute un silence
+
+        Args:
+            time: Début (divisions depuis le début de la partie)
+            duration: Durée en divisions (None si inconnue)
+            note_type: Type de note (quarter, eighth...)
+            measure: Numéro de mesure
+            voice: Voix MusicXML
+            part: Index de la partie dans part_ids
+        """
+        self._append(1, 0, time, duration, note_type, measure, voice, part)
+        self.pitch.append(NO_LABEL)
+        self.octave.append(NO_OCTAVE)
+        self.alter.append(0)
+
+    def _append(self, rest: int, midi: int, time: int, duration: Optional[int], note_type: Optional[str],
+                measure: int, voice: int, part: int):
+        self.rest.append(rest)
+        self.midi.append(midi)
+        self.onset.append(time)
+        self.duration.append(NO_DURATION if duration is None else duration)
+        self.note_type.append(self._label(note_type))
+        self.measure.append(measure)
+        self.voice.append(voice)
+        self.part.append(part)
+
+    def _label(self, label: Optional[str]) -> int:
+        """Code d'un nom (note, type de note), ajouté à labels au besoin"""
+        if label is None:
+            return NO_LABEL
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.rest)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index de note hors limites")
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Vue dictionnaire d'une note (nouveau dictionnaire: le modifier ne modifie pas la table)
+
+        Args:
+            index: Position de la note
+
+        Returns:
+            Note au format de MelodyExtractor
+        """
+        duration = self.duration[index]
+        note_type = self.note_type[index]
+        note = {
+            'type': 'rest' if self.rest[index] else 'note',
+            'duration': None if duration == NO_DURATION else duration,
+            'note_type': None if note_type == NO_LABEL else self.labels[note_type],
+            'measure': self.measure[index],
+            'time': self.onset[index]
+        }
+        if not self.rest[index]:
+            pitch = self.pitch[index]
+            octave = self.octave[index]
+            note['pitch'] = None if pitch == NO_LABEL else self.labels[pitch]
+            note['octave'] = None if octave == NO_OCTAVE else octave
+            note['alter'] = self.alter[index]
+            note['midi'] = self.midi[index]
+        return note
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Notes sous forme de liste de dictionnaires"""
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire occupée par les colonnes (octets)"""
+        return sum(column.itemsize * len(column) for column in self._columns().values())
+
+    def _columns(self) -> Dict[str, array]:
+        return {name: getattr(self, name) for name in (
+            'midi', 'rest', 'onset', 'duration', 'measure', 'voice', 'part',
+            'pitch', 'octave', 'alter', 'note_type')}
+
+    def transposed(self, semitones: int) -> 'NoteColumns':
+        """
+        Table transposée de `semitones` demi-tons
+
+        Seules les colonnes de hauteur (midi, pitch, octave, alter) sont
+        recalculées, les autres sont partagées avec cette table. Les notes
+        transposées sont renommées d'après leur hauteur MIDI (SEMITONE_NAMES),
+        comme Transposer._transpose_note.
+
+        Args:
+            semitones: Nombre de demi-tons (+ monte, - descend)
+
+        Returns:
+            Nouvelle table
+        """
+        result = NoteColumns(self.part_ids)
+        result.labels = list(self.labels)
+        result._label_codes = dict(self._label_codes)
+        for name, column in self._columns().items():
+            setattr(result, name, column)
+
+        names = [result._label(name) for name in SEMITONE_NAMES]
+        midi = [m if rest else m + semitones for m, rest in zip(self.midi, self.rest)]
+        result.midi = array('h', midi)
+        result.pitch = array('h', [NO_LABEL if rest else names[m % 12] for m, rest in zip(midi, self.rest)])
+        result.octave = array('b', [NO_OCTAVE if rest else m // 12 - 1 for m, rest in zip(midi, self.rest)])
+        result.alter = array('b', bytes(len(midi)))
+        return result
+
+    def spellings(self) -> Counter:
+        """
+        Noms des notes jouées et leur nombre d'occurrences (silences exclus)
+
+        Returns:
+            Counter {(pitch, octave): occurrences}, dans l'ordre de première apparition
+        """
+        counts = Counter(code for code, rest in zip(zip(self.pitch, self.octave), self.rest) if not rest)
+        return Counter({
+            (None if pitch == NO_LABEL else self.labels[pitch], None if octave == NO_OCTAVE else octave): count
+            for (pitch, octave), count in counts.items()
+        })
+
+    def midi_counts(self) -> Counter:
+        """
+        Hauteurs MIDI jouées et leur nombre d'occurrences (silences exclus)
+
+        Returns:
+            Counter {midi: occurrences}
+        """
+        return Counter(m for m, rest in zip(self.midi, self.rest) if not rest)
@@ -0,0 +1,390 @@
+"""
+Module de sélection du backend OCR
+
+Le pipeline ne dépend que de l'interface OCRBackend ; le backend effectif est
+choisi par son nom (Config.OCR_BACKEND) :
+- cli: Audiveris local en ligne de commande (AudiverisOCR)
+- http: service Audiveris distant (AudiverisHTTPClient)
+- fixture: MusicXML pré-enregistrés servis avec une latence simulée, pour
+  tester en charge et profiler le reste du pipeline sans JVM
+"""
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, List
+
+from .deadline import Deadline, DeadlineExceededError
+from .musicxml_parser import parse_musicxml
+from .ocr_cache import OCRCache, read_with_cache
+from .ocr_progress import CombinedProgress, OCRCancelledError, ProgressCallback
+from .score_merger import merge_scores
+
+logger = logging.getLogger(__name__)
+
+# Extensions des fichiers servis par le backend fixture
+FIXTURE_EXTENSIONS = ('.mxl', '.musicxml', '.xml')
+
+
+class OCRBackend:
+    """Interface commune des backends OCR"""
+
+    name = None
+
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lit une partition et extrait les données musicales
+
+        Args:
+            input_file: Fichier PDF ou image de la partition
+            output_dir: Dossier de sortie pour les fichiers MusicXML
+            progress: Callback (pourcentage, message) de progression de l'OCR (optionnel)
+            cancel_event: Événement dont le déclenchement interrompt l'OCR (optionnel)
+            deadline: Délai de la conversion, qui borne la durée de l'OCR (optionnel)
+
+        Returns:
+            Dictionnaire contenant les données extraites ou None en cas d'erreur
+
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        raise NotImplementedError
+
+    def cache_options(self) -> Dict[str, Any]:
+        """Options du backend faisant partie de la clé du cache OCR"""
+        return {}
+
+    def read(self, input_file: Path, output_dir: Path,
+             cache: Optional[OCRCache] = None,
+             progress: Optional[ProgressCallback] = None,
+             cancel_event: Optional[threading.Event] = None,
+             deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lit une partition en passant par le cache OCR
+
+        Args:
+            input_file: Fichier PDF ou image de la partition
+            output_dir: Dossier de sortie pour les fichiers MusicXML
+            cache: Cache des résultats OCR (optionnel)
+            progress: Callback (pourcentage, message) de progression de l'OCR (optionnel)
+            cancel_event: Événement dont le déclenchement interrompt l'OCR (optionnel)
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Données musicales extraites
+        """
+        # Les backends qui ne suivent pas la progression gardent la signature simple
+        options = {name: value for name, value in (('progress', progress), ('cancel_event', cancel_event),
+                                                   ('deadline', deadline))
+                   if value is not None}
+        return read_with_cache(cache, input_file,
+                               lambda: self.read_partition(input_file, output_dir, **options),
+                               self.cache_options() or None)
+
+    def read_pages(self, page_files: List[Path], output_dir: Path,
+                   max_workers: Optional[int] = None,
+                   cache: Optional[OCRCache] = None,
+                   progress: Optional[ProgressCallback] = None,
+                   cancel_event: Optional[threading.Event] = None,
+                   deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lit les pages d'une même partition (une image par page) en parallèle
+
+        Chaque page passe par read() (et donc par le cache) dans son propre
+        dossier de sortie ; les partitions obtenues sont fusionnées dans
+        l'ordre des pages (mesures renumérotées, parties alignées).
+
+        Args:
+            page_files: Images des pages, dans l'ordre
+            output_dir: Dossier de sortie pour les fichiers MusicXML
+            max_workers: Nombre de pages lues simultanément (défaut: nombre de CPU)
+            cache: Cache des résultats OCR (optionnel)
+            progress: Callback (pourcentage, message), moyenne des pages (optionnel)
+            cancel_event: Événement dont le déclenchement interrompt l'OCR (optionnel)
+            deadline: Délai de la conversion, commun à toutes les pages (optionnel)
+
+        Returns:
+            Données musicales de la partition complète (pages non lues listées
+            dans 'failed_pages') ou None si aucune page n'a été lue
+
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        page_files = [Path(page) for page in page_files]
+        workers = min(len(page_files), max_workers or os.cpu_count() or 1)
+        pages_dir = Path(output_dir) / f"{page_files[0].stem}_pages"
+        combined = CombinedProgress(len(page_files), progress)
+
+        logger.info(f"Lecture de {len(page_files)} pages ({workers} en parallèle)")
+
+        def read_page(index: int) -> Optional[Dict[str, Any]]:
+            page_progress = combined.for_page(index)
+            result = self.read(page_files[index], pages_dir / f"page_{index + 1:03d}", cache,
+                               page_progress, cancel_event, deadline)
+            if page_progress:
+                page_progress(100, "Page lue" if result else "Page illisible")
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            page_results = list(executor.map(read_page, range(len(page_files))))
+
+        return merge_scores(page_results)
+
+    def start_upload(self, filename: str, deadline: Optional[Deadline] = None):
+        """
+        Ouvre un upload transmis au moteur OCR au fil de sa réception
+
+        Args:
+            filename: Nom du fichier uploadé
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Objet fichier recevant le contenu (UploadRelay), ou None si le
+            backend ne le permet pas : l'upload est alors enregistré localement
+        """
+        return None
+
+    def read_uploads(self, uploads: List[Any],
+                     cache: Optional[OCRCache] = None,
+                     progress: Optional[ProgressCallback] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Récupère les résultats d'uploads relayés par start_upload()
+
+        Le cache est consulté avec l'empreinte calculée pendant l'upload ; en
+        cas de succès, le travail déjà soumis est annulé. Plusieurs uploads
+        sont les pages d'une même partition, fusionnées dans l'ordre.
+
+        Args:
+            uploads: Uploads relayés (UploadRelay), dans l'ordre des pages
+            cache: Cache des résultats OCR (optionnel)
+            progress: Callback (pourcentage, message) de progression de l'OCR (optionnel)
+            cancel_event: Événement dont le déclenchement interrompt l'OCR (optionnel)
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Données musicales extraites ou None en cas d'erreur
+
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        combined = CombinedProgress(len(uploads), progress) if len(uploads) > 1 else None
+        options = self.cache_options() or None
+
+        def read_upload(index: int) -> Optional[Dict[str, Any]]:
+            upload = uploads[index]
+            upload_progress = combined.for_page(index) if combined else progress
+            try:
+                result = read_with_cache(cache, None,
+                                         lambda: upload.result(upload_progress, cancel_event, deadline),
+                                         options, digest=upload.digest)
+            finally:
+                # Résultat trouvé dans le cache (ou erreur): le travail soumis est inutile
+                upload.cancel()
+            if combined and upload_progress:
+                upload_progress(100, "Page lue" if result else "Page illisible")
+            return result
+
+        if combined is None:
+            return read_upload(0)
+
+        with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+            page_results = list(executor.map(read_upload, range(len(uploads))))
+
+        return merge_scores(page_results)
+
+
+class CLIBackend(OCRBackend):
+    """Audiveris local, lancé en ligne de commande"""
+
+    name = 'cli'
+
+    def __init__(self, audiveris_path: str = '/usr/local/bin/audiveris', dpi: int = 300,
+                 parallel_pages: bool = False, max_workers: Optional[int] = None,
+                 preprocess: bool = False, book_store=None):
+        """
+        Args:
+            audiveris_path: Chemin vers l'exécutable Audiveris
+            dpi: Résolution de rendu et de normalisation
+            parallel_pages: Traiter les pages des PDF en parallèle
+            max_workers: Nombre de pages traitées simultanément (défaut: nombre de CPU)
+            preprocess: Normaliser les images avant l'OCR
+            book_store: Projets .omr réutilisés pour ré-exporter sans retranscrire (BookStore, optionnel)
+        """
+        self.audiveris_path = audiveris_path
+        self.dpi = dpi
+        self.parallel_pages = parallel_pages
+        self.max_workers = max_workers
+        self.preprocess = preprocess
+        self.book_store = book_store
+
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        from .ocr_reader import AudiverisOCR
+
+        ocr = AudiverisOCR(self.audiveris_path, dpi=self.dpi, preprocess=self.preprocess,
+                           book_store=self.book_store)
+        if self.parallel_pages or self.preprocess:
+            # Les PDF doivent être rendus page par page pour être normalisés
+            workers = self.max_workers if self.parallel_pages else 1
+            return ocr.read_partition_pages(input_file, output_dir, max_workers=workers,
+                                            progress=progress, cancel_event=cancel_event, deadline=deadline)
+        return ocr.read_partition(input_file, output_dir, progress=progress, cancel_event=cancel_event,
+                                  deadline=deadline)
+
+    def cache_options(self) -> Dict[str, Any]:
+        options = {}
+        if self.parallel_pages:
+            options['parallel_pages'] = True
+        if self.preprocess:
+            options['preprocess'] = self.dpi
+        return options
+
+
+class HTTPBackend(OCRBackend):
+    """Service Audiveris distant (client HTTP partagé du processus)"""
+
+    name = 'http'
+
+    def __init__(self, client=None):
+        """
+        Args:
+            client: Client AudiverisHTTPClient (défaut: client partagé du processus)
+        """
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .ocr_reader_http import get_client
+            self._client = get_client()
+        return self._client
+
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        return self.client.read_partition(input_file, output_dir, progress=progress, cancel_event=cancel_event,
+                                          deadline=deadline)
+
+    def start_upload(self, filename: str, deadline: Optional[Deadline] = None):
+        return self.client.start_upload(filename, deadline)
+
+
+class FixtureBackend(OCRBackend):
+    """
+    MusicXML pré-enregistrés servis à la place de l'OCR
+
+    Si fixture_path est un dossier, le fichier portant le nom de l'upload est
+    servi s'il existe, sinon les fichiers du dossier sont servis à tour de rôle.
+    Le MusicXML est parsé à chaque appel, comme après un vrai OCR.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, fixture_path: Path, latency: float = 0.0, jitter: float = 0.0):
+        """
+        Args:
+            fixture_path: Fichier MusicXML ou dossier de fichiers MusicXML
+            latency: Durée simulée d'un OCR (secondes)
+            jitter: Variation aléatoire de la latence (± secondes)
+        """
+        self.fixture_path = Path(fixture_path)
+        self.latency = latency
+        self.jitter = jitter
+
+        if self.fixture_path.is_dir():
+            self.fixtures = sorted(f for f in self.fixture_path.iterdir()
+                                   if f.suffix.lower() in FIXTURE_EXTENSIONS)
+        elif self.fixture_path.exists():
+            self.fixtures = [self.fixture_path]
+        else:
+            self.fixtures = []
+
+        if not self.fixtures:
+            raise FileNotFoundError(f"Aucun MusicXML de test trouvé dans {self.fixture_path}")
+
+        self._rotation = itertools.cycle(self.fixtures)
+        self._lock = threading.Lock()
+        logger.info(f"Backend OCR fixture: {len(self.fixtures)} fichier(s), latence {latency}s")
+
+    def _select_fixture(self, input_file: Path) -> Path:
+        """Fichier du même nom que l'upload, sinon le suivant de la rotation"""
+        for fixture in self.fixtures:
+            if fixture.stem == input_file.stem:
+                return fixture
+        with self._lock:
+            return next(self._rotation)
+
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        fixture = self._select_fixture(Path(input_file))
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if progress:
+            progress(0, f"Lecture simulée de {fixture.name}")
+        # La latence simulée est interruptible et bornée par le délai, comme un vrai OCR
+        wait = min(delay, deadline.remaining()) if deadline is not None else delay
+        if cancel_event is None:
+            time.sleep(wait)
+        elif cancel_event.wait(wait):
+            raise OCRCancelledError("OCR annulé")
+        if wait < delay:
+            raise DeadlineExceededError("OCR: délai dépassé")
+        return parse_musicxml(fixture)
+
+    def cache_options(self) -> Dict[str, Any]:
+        # Ne jamais mélanger les résultats de test avec ceux d'un vrai OCR
+        return {'fixture': str(self.fixture_path)}
+
+
+# Registre des backends disponibles (nom -> fabrique)
+_backends: Dict[str, Callable[..., OCRBackend]] = {
+    CLIBackend.name: CLIBackend,
+    HTTPBackend.name: HTTPBackend,
+    FixtureBackend.name: FixtureBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[..., OCRBackend]):
+    """Enregistre un backend OCR supplémentaire"""
+    _backends[name] = factory
+
+
+def available_backends():
+    """Noms des backends OCR enregistrés"""
+    return sorted(_backends)
+
+
+def create_backend(name: str, **options) -> OCRBackend:
+    """
+    Crée un backend OCR à partir de son nom
+
+    Args:
+        name: Nom du backend ('cli', 'http', 'fixture'...)
+        **options: Paramètres du constructeur du backend
+
+    Returns:
+        Instance du backend
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    factory = _backends.get(name)
+    if factory is None:
+        raise ValueError(f"Backend OCR inconnu: {name} (disponibles: {', '.join(available_backends())})")
+    return factory(**options)
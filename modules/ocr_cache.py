@@ -0,0 +1,166 @@
+"""
+Cache des résultats OCR adressé par contenu
+
+Une passe Audiveris prend plusieurs minutes alors que les mêmes partitions sont
+régulièrement ré-uploadées. Ce module stocke sur disque, pour chaque fichier
+d'entrée, le dictionnaire MusicXML parsé et une copie du .mxl généré.
+
+La clé est le SHA-256 des octets du fichier, combiné à la version d'Audiveris
+et aux options OCR : changer l'un des trois invalide naturellement l'entrée.
+Le cache est borné en taille avec une éviction LRU (voir disk_store).
+"""
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable
+
+from .disk_store import LRUDiskStore, content_key, hash_file
+
+logger = logging.getLogger(__name__)
+
+RESULT_FILENAME = 'result.json'
+
+
+class OCRCache(LRUDiskStore):
+    """Cache disque LRU des résultats OCR (un dossier par entrée)"""
+
+    label = "Cache OCR"
+
+    def __init__(self, cache_dir: Path, max_size: int = 500 * 1024 * 1024,
+                 audiveris_version: str = 'unknown'):
+        """
+        Initialise le cache
+
+        Args:
+            cache_dir: Dossier de stockage des entrées
+            max_size: Taille maximale du cache en octets
+            audiveris_version: Version d'Audiveris (fait partie de la clé)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.audiveris_version = audiveris_version
+        super().__init__(self.cache_dir, max_size)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _entry_key(self, path: Path) -> Optional[str]:
+        return path.name if path.is_dir() else None
+
+    def _stamp_path(self, key: str) -> Path:
+        # Écrit en dernier: un dossier sans résultat n'est pas une entrée
+        return self.cache_dir / key / RESULT_FILENAME
+
+    def make_key(self, input_file: Path, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Calcule la clé de cache d'un fichier d'entrée
+
+        Args:
+            input_file: Fichier PDF ou image uploadé
+            options: Options OCR influençant le résultat
+
+        Returns:
+            Clé hexadécimale (SHA-256)
+        """
+        return self.make_key_from_digest(hash_file(input_file), options)
+
+    def make_key_from_digest(self, content_digest: str,
+                             options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Calcule la clé de cache à partir d'une empreinte déjà connue
+
+        Args:
+            content_digest: SHA-256 hexadécimal du contenu uploadé
+            options: Options OCR influençant le résultat
+
+        Returns:
+            Clé hexadécimale (SHA-256)
+        """
+        return content_key(content_digest, self.audiveris_version, options)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère un résultat OCR
+
+        Args:
+            key: Clé retournée par make_key()
+
+        Returns:
+            Données MusicXML parsées ou None si absentes
+        """
+        found = self._lookup(key)
+        if found is None:
+            return None
+        entry_dir, serial = found
+
+        try:
+            result = json.loads((entry_dir / RESULT_FILENAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            self._discard(key, serial, e)
+            return None
+
+        logger.info(f"Cache OCR: hit {key[:12]}")
+        return result
+
+    def put(self, key: str, result: Dict[str, Any], musicxml_file: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Stocke un résultat OCR
+
+        Args:
+            key: Clé retournée par make_key()
+            result: Données MusicXML parsées
+            musicxml_file: Fichier .mxl/.xml généré par Audiveris (copié dans le cache)
+
+        Returns:
+            Le résultat tel que stocké (source_file pointe vers la copie en cache)
+        """
+        entry_dir = self._entry_path(key)
+        tmp_dir = self._temp_path(key, directory=True)
+
+        result = dict(result)
+        try:
+            if musicxml_file is not None and Path(musicxml_file).exists():
+                cached_musicxml = tmp_dir / f"score{Path(musicxml_file).suffix}"
+                shutil.copyfile(musicxml_file, cached_musicxml)
+                result['source_file'] = str(entry_dir / cached_musicxml.name)
+
+            (tmp_dir / RESULT_FILENAME).write_text(json.dumps(result), encoding='utf-8')
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._commit(key, tmp_dir)
+        return result
+
+
+def read_with_cache(cache: Optional[OCRCache], input_file: Optional[Path],
+                    read_fn: Callable[[], Optional[Dict[str, Any]]],
+                    options: Optional[Dict[str, Any]] = None,
+                    digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Exécute une lecture OCR en passant par le cache
+
+    Args:
+        cache: Cache à utiliser (None = pas de cache)
+        input_file: Fichier uploadé (sert au calcul de la clé)
+        read_fn: Fonction réalisant l'OCR en cas d'absence dans le cache
+        options: Options OCR faisant partie de la clé
+        digest: SHA-256 du contenu, déjà calculé (upload relayé sans copie locale)
+
+    Returns:
+        Données MusicXML parsées ou None en cas d'erreur
+    """
+    if cache is None or (digest is None and not Path(input_file).exists()):
+        return read_fn()
+
+    key = cache.make_key_from_digest(digest, options) if digest else cache.make_key(input_file, options)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = read_fn()
+    # Une lecture incomplète (pages en échec) n'est pas conservée: elle sera retentée
+    if result and not result.get('failed_pages'):
+        source_file = result.get('source_file')
+        result = cache.put(key, result, Path(source_file) if source_file else None)
+    return result
@@ -0,0 +1,146 @@
+"""
+Module de suivi de la progression d'Audiveris
+
+Audiveris n'expose pas de progression : il journalise simplement, pour chaque
+feuille (page) du livre, l'étape de transcription en cours (LOAD, BINARY, ...,
+PAGE) puis l'export. Ce module transforme ces lignes de log, lues au fil de
+l'exécution, en pourcentage d'avancement et en message lisible.
+"""
+import re
+import threading
+from typing import Optional, Callable, Tuple
+
+# Callback de progression: (pourcentage 0-100, message)
+ProgressCallback = Callable[[int, str], None]
+
+# Étapes de transcription d'une feuille, dans l'ordre d'exécution d'Audiveris
+AUDIVERIS_STEPS = [
+    'LOAD', 'BINARY', 'SCALE', 'GRID', 'HEADERS', 'STEM_SEEDS', 'BEAMS', 'LEDGERS',
+    'HEADS', 'STEMS', 'REDUCTION', 'CUE_BEAMS', 'TEXTS', 'MEASURES', 'CHORDS',
+    'CURVES', 'SYMBOLS', 'LINKS', 'RHYTHMS', 'PAGE'
+]
+
+# Libellés affichés pour les étapes principales (les autres gardent leur nom)
+STEP_LABELS = {
+    'LOAD': "Chargement de l'image",
+    'BINARY': "Binarisation",
+    'SCALE': "Mesure de l'échelle",
+    'GRID': "Détection des portées",
+    'HEADS': "Détection des notes",
+    'STEMS': "Détection des hampes",
+    'TEXTS': "Lecture des textes",
+    'MEASURES': "Découpage en mesures",
+    'RHYTHMS': "Analyse rythmique",
+    'PAGE': "Assemblage de la page"
+}
+
+# Part de la progression couverte par la transcription des feuilles ; le
+# reste revient à l'export MusicXML puis au parsing (100 % à la toute fin)
+SHEETS_SHARE = 90
+EXPORT_PROGRESS = 95
+
+_SHEET_PATTERN = re.compile(r'#(\d+)\]')
+_SHEET_COUNT_PATTERN = re.compile(r'(\d+)\s+sheets?\b|sheets?\s*:\s*(\d+)', re.IGNORECASE)
+_STEP_PATTERN = re.compile(r'\b(' + '|'.join(AUDIVERIS_STEPS) + r')\b')
+_EXPORT_PATTERN = re.compile(r'\bexport', re.IGNORECASE)
+
+
+class OCRCancelledError(Exception):
+    """Levée lorsque l'OCR est interrompu à la demande de l'utilisateur"""
+
+
+class AudiverisLogParser:
+    """
+    Convertit le log d'Audiveris, ligne par ligne, en événements de progression
+
+    Le nombre de feuilles est pris dans le log quand Audiveris l'indique, ou
+    fourni à la construction (nombre de pages du PDF) ; à défaut, une seule
+    feuille est supposée et le total est ajusté dès qu'une feuille suivante
+    apparaît.
+    """
+
+    def __init__(self, sheets: Optional[int] = None):
+        self.sheets = sheets or 1
+        self.sheets_known = sheets is not None
+        self.sheet = 1
+        self.step_index = -1
+        self.exporting = False
+        self.progress = 0
+
+    def feed(self, line: str) -> Optional[Tuple[int, str]]:
+        """
+        Analyse une ligne du log
+
+        Args:
+            line: Ligne émise par Audiveris
+
+        Returns:
+            (pourcentage, message) si la progression a changé, None sinon
+        """
+        if not self.sheets_known:
+            count = _SHEET_COUNT_PATTERN.search(line)
+            if count:
+                self.sheets = max(1, int(count.group(1) or count.group(2)))
+                self.sheets_known = True
+
+        sheet_match = _SHEET_PATTERN.search(line)
+        if sheet_match:
+            sheet = int(sheet_match.group(1))
+            if sheet != self.sheet:
+                self.sheet = sheet
+                self.step_index = -1
+            self.sheets = max(self.sheets, sheet)
+
+        step_match = _STEP_PATTERN.search(line)
+        if step_match:
+            self.step_index = max(self.step_index, AUDIVERIS_STEPS.index(step_match.group(1)))
+        elif _EXPORT_PATTERN.search(line):
+            self.exporting = True
+
+        return self._event()
+
+    def _event(self) -> Optional[Tuple[int, str]]:
+        """Événement correspondant à l'état courant (None si inchangé)"""
+        if self.exporting:
+            progress, message = EXPORT_PROGRESS, "Export MusicXML"
+        elif self.step_index < 0:
+            return None
+        else:
+            step = AUDIVERIS_STEPS[self.step_index]
+            done = (self.sheet - 1 + (self.step_index + 1) / len(AUDIVERIS_STEPS)) / self.sheets
+            progress = int(done * SHEETS_SHARE)
+            label = STEP_LABELS.get(step, step.replace('_', ' ').capitalize())
+            message = label if self.sheets == 1 else f"Page {self.sheet}/{self.sheets} : {label}"
+
+        # La progression ne recule jamais (feuilles traitées dans le désordre)
+        if progress <= self.progress:
+            return None
+        self.progress = progress
+        return progress, message
+
+
+class CombinedProgress:
+    """
+    Agrège la progression de plusieurs OCR parallèles (une page chacun)
+
+    Chaque page compte pour une part égale ; le callback reçoit la moyenne.
+    """
+
+    def __init__(self, pages: int, callback: Optional[ProgressCallback]):
+        self.pages = [0] * pages
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def for_page(self, index: int) -> Optional[ProgressCallback]:
+        """Callback à transmettre à l'OCR de la page `index` (0-based)"""
+        if self.callback is None:
+            return None
+
+        def update(progress: int, message: str):
+            with self.lock:
+                self.pages[index] = progress
+                total = sum(self.pages) // len(self.pages)
+                done = sum(1 for page in self.pages if page >= 100)
+            self.callback(total, f"{done}/{len(self.pages)} pages lues - page {index + 1} : {message}")
+
+        return update
@@ -4,12 +4,23 @@ Module de lecture de partitions via OCR musical (Audiveris)
 Ce module fournit une interface pour utiliser Audiveris en ligne de commande
 et parser les fichiers MusicXML générés.
 """
+import os
+import shutil
+import signal
 import subprocess
 import logging
-import xml.etree.ElementTree as ET
-import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Tuple
+
+from .musicxml_parser import parse_musicxml
+from .deadline import Deadline, DeadlineExceededError
+from .ocr_cache import OCRCache
+from .ocr_progress import AudiverisLogParser, CombinedProgress, OCRCancelledError, ProgressCallback
+from .omr_store import BookStore
+from .score_merger import merge_scores
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +28,32 @@ logger = logging.getLogger(__name__)
 class AudiverisOCR:
     """Interface avec Audiveris pour la lecture de partitions"""
 
-    def __init__(self, audiveris_path: str = '/usr/local/bin/audiveris'):
+    # Extensions d'images pouvant être normalisées avant l'OCR
+    IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tif', '.tiff'}
+
+    # Durée maximale d'une exécution d'Audiveris (secondes), réduite au délai de la conversion
+    TIMEOUT = 900
+
+    # Lignes de log conservées pour le diagnostic d'un échec
+    LOG_TAIL_LINES = 50
+
+    def __init__(self, audiveris_path: str = '/usr/local/bin/audiveris', dpi: int = 300,
+                 preprocess: bool = False, book_store: Optional[BookStore] = None):
         """
         Initialise le lecteur OCR
 
         Args:
             audiveris_path: Chemin vers l'exécutable Audiveris
+            dpi: Résolution de rendu des pages PDF et de normalisation des images
+            preprocess: Normaliser les images (redressement, binarisation, rognage,
+                rééchantillonnage) avant l'OCR
+            book_store: Projets .omr déjà transcrits, réutilisés pour un simple
+                ré-export (optionnel)
         """
         self.audiveris_path = Path(audiveris_path)
+        self.dpi = dpi
+        self.preprocess = preprocess
+        self.book_store = book_store
         self._check_audiveris()
 
     def _check_audiveris(self) -> bool:
@@ -36,19 +65,41 @@ class AudiverisOCR:
         logger.info(f"Audiveris trouvé à: {self.audiveris_path}")
         return True
 
-    def read_partition(self, input_file: Path, output_dir: Path) -> Optional[Dict[str, Any]]:
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       preprocess: Optional[bool] = None,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Lit une partition et extrait les données musicales
 
+        Le log d'Audiveris est lu au fil de l'exécution et converti en
+        événements de progression (feuille et étape en cours). Si un projet
+        .omr existe déjà pour ce contenu, le MusicXML en est simplement
+        ré-exporté.
+
         Args:
             input_file: Fichier PDF ou image de la partition
             output_dir: Dossier de sortie pour les fichiers MusicXML
+            preprocess: Normaliser l'image avant l'OCR (défaut: réglage du lecteur)
+            progress: Callback (pourcentage, message) appelé à chaque avancée (optionnel)
+            cancel_event: Événement dont le déclenchement tue Audiveris (optionnel)
+            deadline: Délai de la conversion, qui borne celui d'Audiveris (optionnel)
 
         Returns:
             Dictionnaire contenant les données extraites ou None en cas d'erreur
+
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
         """
         logger.info(f"Lecture de la partition: {input_file}")
 
+        if cancel_event is not None and cancel_event.is_set():
+            raise OCRCancelledError("OCR annulé")
+        if deadline is not None:
+            deadline.check("OCR")
+
         if not input_file.exists():
             logger.error(f"Fichier non trouvé: {input_file}")
             return None
@@ -56,34 +107,113 @@ class AudiverisOCR:
         # Créer le dossier de sortie
         output_dir.mkdir(parents=True, exist_ok=True)
 
+        if preprocess is None:
+            preprocess = self.preprocess
+        preprocess = preprocess and input_file.suffix.lower() in self.IMAGE_EXTENSIONS
+
+        # Contenu déjà transcrit: ré-export depuis son projet .omr
+        book_key = None
+        if self.book_store is not None:
+            book_key = self.book_store.make_key(input_file, {'preprocess': self.dpi} if preprocess else None)
+            book = self.book_store.get(book_key)
+            if book is not None:
+                result = self.export_book(book, output_dir, input_file.stem, progress, cancel_event, deadline)
+                if result is not None:
+                    return result
+                logger.warning("Ré-export du projet .omr impossible, transcription complète")
+
+        if preprocess:
+            input_file = self._preprocess_image(input_file, output_dir)
+
+        result = self._run_and_parse(input_file, output_dir, self._count_sheets(input_file),
+                                     progress, cancel_event, deadline, save_book=book_key is not None)
+        if result is not None and book_key is not None:
+            self._store_book(book_key, output_dir / f"{input_file.stem}.omr")
+        return result
+
+    def export_book(self, book_file: Path, output_dir: Path, name: Optional[str] = None,
+                    progress: Optional[ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None,
+                    deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Ré-exporte le MusicXML d'un projet .omr sans refaire la transcription
+
+        Le projet est copié dans output_dir : Audiveris peut le modifier et
+        l'original reste intact.
+
+        Args:
+            book_file: Projet .omr issu d'une transcription précédente
+            output_dir: Dossier de sortie pour les fichiers MusicXML
+            name: Nom de base des fichiers produits (défaut: nom du projet)
+            progress: Callback (pourcentage, message) (optionnel)
+            cancel_event: Événement dont le déclenchement tue Audiveris (optionnel)
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Dictionnaire contenant les données extraites ou None en cas d'erreur
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        working_copy = output_dir / f"{name or book_file.stem}.omr"
+        shutil.copyfile(book_file, working_copy)
+
+        logger.info(f"Ré-export depuis le projet {book_file.name}")
+        return self._run_and_parse(working_copy, output_dir, None, progress, cancel_event, deadline)
+
+    def _store_book(self, book_key: str, book_file: Path):
+        """Conserve le projet sauvegardé par Audiveris (sans effet s'il est absent)"""
+        if not book_file.exists():
+            logger.warning(f"Projet {book_file.name} non sauvegardé par Audiveris")
+            return
+        try:
+            self.book_store.put(book_key, book_file)
+        except OSError as e:
+            logger.warning(f"Impossible de conserver le projet {book_file.name}: {e}")
+
+    def _run_and_parse(self, source: Path, output_dir: Path, sheets: Optional[int],
+                       progress: Optional[ProgressCallback],
+                       cancel_event: Optional[threading.Event],
+                       deadline: Optional[Deadline] = None,
+                       save_book: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Lance Audiveris sur une image, un PDF ou un projet .omr puis parse le MusicXML exporté
+
+        Args:
+            source: Fichier à traiter
+            output_dir: Dossier de sortie
+            sheets: Nombre de feuilles attendues (progression), None si inconnu
+            progress: Callback de progression (optionnel)
+            cancel_event: Événement d'annulation (optionnel)
+            deadline: Délai de la conversion (optionnel)
+            save_book: Sauvegarder le projet .omr dans output_dir
+
+        Returns:
+            Dictionnaire contenant les données extraites ou None en cas d'erreur
+        """
         # Commande Audiveris en mode batch
         command = [
             str(self.audiveris_path),
             '-batch',
             '-export',
+            *(['-save'] if save_book else []),
             '-output', str(output_dir),
-            str(input_file)
+            str(source)
         ]
 
         logger.info(f"Commande Audiveris: {' '.join(command)}")
 
         try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=900  # 15 minutes max
-            )
-
-            if result.returncode != 0:
-                logger.error(f"Erreur Audiveris: {result.stderr}")
+            returncode, output = self._run_audiveris(command, AudiverisLogParser(sheets), progress,
+                                                     cancel_event, deadline)
+
+            if returncode != 0:
+                logger.error(f"Erreur Audiveris: {output}")
                 return None
 
             logger.info("Audiveris terminé avec succès")
 
             # Chercher le fichier MusicXML généré
             # Audiveris génère un fichier avec le même nom de base que l'entrée
-            base_name = input_file.stem
+            base_name = source.stem
             expected_mxl = output_dir / f"{base_name}.mxl"
             expected_xml = output_dir / f"{base_name}.xml"
 
@@ -106,195 +236,227 @@ class AudiverisOCR:
 
             logger.info(f"Fichier MusicXML trouvé: {musicxml_file}")
 
+            if progress:
+                progress(100, "Partition lue")
             return self.parse_musicxml(musicxml_file)
 
+        except (OCRCancelledError, DeadlineExceededError):
+            raise
         except subprocess.TimeoutExpired:
-            logger.error("Timeout Audiveris (> 5 minutes)")
+            logger.error(f"Timeout Audiveris (> {self.TIMEOUT // 60} minutes)")
             return None
         except Exception as e:
             logger.error(f"Erreur lors de l'exécution d'Audiveris: {e}")
             return None
 
-    def parse_musicxml(self, musicxml_file: Path) -> Dict[str, Any]:
+    def _run_audiveris(self, command, parser: AudiverisLogParser,
+                       progress: Optional[ProgressCallback],
+                       cancel_event: Optional[threading.Event],
+                       deadline: Optional[Deadline] = None) -> Tuple[int, str]:
         """
-        Parse un fichier MusicXML et extrait les informations
+        Exécute Audiveris en lisant son log ligne par ligne
 
-        Args:
-            musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl compressé) généré par Audiveris
+        Un thread de surveillance tue le processus en cas d'annulation ou de
+        dépassement du délai (TIMEOUT, ou moins s'il reste moins de temps à la
+        conversion) ; la lecture du log se termine alors d'elle-même.
 
         Returns:
-            Dictionnaire structuré avec les données musicales
-        """
-        logger.info(f"Parsing MusicXML: {musicxml_file}")
+            (code de retour, dernières lignes du log)
 
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+            subprocess.TimeoutExpired: Si Audiveris dépasse TIMEOUT
+        """
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            # Groupe de processus dédié: le lanceur audiveris est un script qui démarre la JVM
+            start_new_session=(os.name == 'posix')
+        )
+        stop = cancel_event or threading.Event()
+        killed = []
+
+        limit = Deadline.after(self.TIMEOUT, deadline)
+
+        def watch():
+            while process.poll() is None:
+                if stop.wait(0.2) or limit.expired:
+                    killed.append('cancel' if stop.is_set() else 'timeout')
+                    self._kill(process)
+                    return
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+
+        # Garder la fin du log pour le diagnostic en cas d'échec
+        tail = deque(maxlen=self.LOG_TAIL_LINES)
+        with process.stdout:
+            for line in process.stdout:
+                line = line.rstrip()
+                tail.append(line)
+                event = parser.feed(line)
+                if event and progress:
+                    progress(*event)
+
+        returncode = process.wait()
+        watcher.join()
+
+        if killed == ['cancel']:
+            logger.info("OCR annulé: processus Audiveris arrêté")
+            raise OCRCancelledError("OCR annulé")
+        if killed == ['timeout']:
+            if deadline is not None and deadline.expired:
+                logger.info("Délai de la conversion dépassé: processus Audiveris arrêté")
+                raise DeadlineExceededError("OCR: délai dépassé")
+            raise subprocess.TimeoutExpired(command, self.TIMEOUT)
+        return returncode, '\n'.join(tail)
+
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        """Tue Audiveris et ses processus fils (la JVM lancée par le script)"""
         try:
-            # Gérer les fichiers .mxl (compressés)
-            if musicxml_file.suffix.lower() == '.mxl':
-                logger.info("Fichier MXL détecté - décompression en cours")
-                with zipfile.ZipFile(musicxml_file, 'r') as zip_ref:
-                    # Trouver le fichier XML principal (pas dans META-INF)
-                    xml_files = [f for f in zip_ref.namelist()
-                                if f.endswith('.xml') and 'META-INF' not in f]
-
-                    if not xml_files:
-                        logger.error("Aucun fichier XML trouvé dans l'archive MXL")
-                        return None
-
-                    main_xml = xml_files[0]
-                    logger.info(f"Extraction de {main_xml} depuis l'archive MXL")
-
-                    with zip_ref.open(main_xml) as xml_file:
-                        tree = ET.parse(xml_file)
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
             else:
-                # Fichier XML non compressé
-                tree = ET.parse(musicxml_file)
-
-            root = tree.getroot()
-
-            # Extraire les métadonnées
-            metadata = self._extract_metadata(root)
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+    def _count_sheets(self, input_file: Path) -> Optional[int]:
+        """Nombre de pages d'un PDF (None si inconnu ou pour une image)"""
+        if input_file.suffix.lower() != '.pdf':
+            return 1
+        try:
+            from pdf2image import pdfinfo_from_path
+            return int(pdfinfo_from_path(str(input_file))['Pages'])
+        except Exception:
+            return None
 
-            # Extraire les mesures et notes
-            parts = self._extract_parts(root)
+    def _preprocess_image(self, input_file: Path, output_dir: Path) -> Path:
+        """Normalise une image avant l'OCR (l'originale est utilisée en cas d'échec)"""
+        from .image_preprocessor import preprocess_image
 
-            result = {
-                'metadata': metadata,
-                'parts': parts,
-                'source_file': str(musicxml_file)
-            }
+        try:
+            return preprocess_image(input_file, output_dir / 'preprocessed' / f"{input_file.stem}.png", self.dpi)
+        except Exception as e:
+            logger.warning(f"Normalisation impossible ({e}), OCR sur l'image d'origine")
+            return input_file
+
+    def read_partition_pages(self, input_file: Path, output_dir: Path,
+                             max_workers: Optional[int] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             cancel_event: Optional[threading.Event] = None,
+                             deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lit un PDF multi-pages en traitant les pages en parallèle
 
-            logger.info(f"MusicXML parsé avec succès: {len(parts)} partie(s)")
-            return result
+        Chaque page est rendue en PNG (pdf2image), éventuellement normalisée,
+        puis confiée à son propre processus Audiveris ; les partitions obtenues
+        sont fusionnées en une seule (mesures renumérotées, parties alignées).
 
-        except ET.ParseError as e:
-            logger.error(f"Erreur de parsing XML: {e}")
-            return None
-        except zipfile.BadZipFile as e:
-            logger.error(f"Erreur: fichier MXL corrompu: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Erreur lors du parsing MusicXML: {e}")
-            return None
+        Args:
+            input_file: Fichier PDF de la partition
+            output_dir: Dossier de sortie pour les fichiers MusicXML
+            max_workers: Nombre de pages traitées simultanément (défaut: nombre de CPU)
+            progress: Callback (pourcentage, message), moyenne des pages (optionnel)
+            cancel_event: Événement dont le déclenchement tue les OCR en cours (optionnel)
+            deadline: Délai de la conversion, commun à toutes les pages (optionnel)
 
-    def _extract_metadata(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrait les métadonnées du MusicXML"""
-        metadata = {
-            'title': None,
-            'composer': None,
-            'key': None,
-            'time_signature': None,
-            'tempo': None
-        }
-
-        # Titre et compositeur
-        work = root.find('.//work/work-title')
-        if work is not None:
-            metadata['title'] = work.text
-
-        creator = root.find('.//creator[@type="composer"]')
-        if creator is not None:
-            metadata['composer'] = creator.text
-
-        # Tonalité (key signature)
-        key = root.find('.//attributes/key')
-        if key is not None:
-            fifths = key.find('fifths')
-            mode = key.find('mode')
-            if fifths is not None:
-                metadata['key'] = {
-                    'fifths': int(fifths.text),
-                    'mode': mode.text if mode is not None else 'major'
-                }
-
-        # Signature rythmique (time signature)
-        time = root.find('.//attributes/time')
-        if time is not None:
-            beats = time.find('beats')
-            beat_type = time.find('beat-type')
-            if beats is not None and beat_type is not None:
-                metadata['time_signature'] = f"{beats.text}/{beat_type.text}"
-
-        # Tempo
-        sound = root.find('.//sound[@tempo]')
-        if sound is not None:
-            metadata['tempo'] = int(float(sound.get('tempo')))
-
-        return metadata
-
-    def _extract_parts(self, root: ET.Element) -> List[Dict[str, Any]]:
-        """Extrait les parties (instruments/voix) et leurs notes"""
-        parts = []
-
-        for part in root.findall('.//part'):
-            part_id = part.get('id')
-            measures = []
-
-            for measure in part.findall('measure'):
-                measure_number = measure.get('number')
-                notes = self._extract_notes(measure)
-
-                measures.append({
-                    'number': int(measure_number) if measure_number else 0,
-                    'notes': notes
-                })
-
-            parts.append({
-                'id': part_id,
-                'measures': measures
-            })
-
-        return parts
-
-    def _extract_notes(self, measure: ET.Element) -> List[Dict[str, Any]]:
-        """Extrait les notes d'une mesure"""
-        notes = []
-
-        for note in measure.findall('note'):
-            note_data = {}
-
-            # Note ou silence
-            if note.find('rest') is not None:
-                note_data['type'] = 'rest'
-            else:
-                note_data['type'] = 'note'
+        Returns:
+            Dictionnaire contenant les données extraites ou None en cas d'erreur
 
-                pitch = note.find('pitch')
-                if pitch is not None:
-                    step = pitch.find('step')
-                    octave = pitch.find('octave')
-                    alter = pitch.find('alter')
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        from pdf2image import convert_from_path, pdfinfo_from_path
 
-                    note_data['pitch'] = {
-                        'step': step.text if step is not None else None,
-                        'octave': int(octave.text) if octave is not None else None,
-                        'alter': int(alter.text) if alter is not None else 0
-                    }
+        if input_file.suffix.lower() != '.pdf':
+            return self.read_partition(input_file, output_dir, progress=progress, cancel_event=cancel_event,
+                                       deadline=deadline)
 
-            # Durée
-            duration = note.find('duration')
-            if duration is not None:
-                note_data['duration'] = int(duration.text)
+        try:
+            page_count = int(pdfinfo_from_path(str(input_file))['Pages'])
+        except Exception as e:
+            logger.warning(f"Nombre de pages inconnu ({e}), lecture en un seul bloc")
+            return self.read_partition(input_file, output_dir, progress=progress, cancel_event=cancel_event,
+                                       deadline=deadline)
+
+        if page_count <= 1 and not self.preprocess:
+            return self.read_partition(input_file, output_dir, progress=progress, cancel_event=cancel_event,
+                                       deadline=deadline)
+
+        workers = min(page_count, max_workers or os.cpu_count() or 1)
+        pages_dir = output_dir / f"{input_file.stem}_pages"
+        pages_dir.mkdir(parents=True, exist_ok=True)
+
+        logger.info(f"Lecture page par page: {page_count} pages, {workers} processus Audiveris")
+
+        page_files = convert_from_path(
+            str(input_file),
+            dpi=self.dpi,
+            output_folder=str(pages_dir),
+            output_file=input_file.stem,
+            fmt='png',
+            paths_only=True,
+            thread_count=workers
+        )
+
+        if self.preprocess:
+            from .image_preprocessor import preprocess_pages
+            page_files = preprocess_pages(page_files, pages_dir / 'preprocessed', self.dpi, workers)
+
+        combined = CombinedProgress(len(page_files), progress)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            page_results = list(executor.map(
+                lambda item: self.read_partition(Path(item[1]), pages_dir / f"page_{item[0]:03d}", preprocess=False,
+                                                 progress=combined.for_page(item[0] - 1),
+                                                 cancel_event=cancel_event, deadline=deadline),
+                enumerate(page_files, start=1)
+            ))
+
+        return merge_scores(page_results)
 
-            # Type de note (quarter, eighth, etc.)
-            note_type = note.find('type')
-            if note_type is not None:
-                note_data['note_type'] = note_type.text
+    def parse_musicxml(self, musicxml_file: Path) -> Dict[str, Any]:
+        """
+        Parse un fichier MusicXML et extrait les informations
 
-            notes.append(note_data)
+        Args:
+            musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl compressé) généré par Audiveris
 
-        return notes
+        Returns:
+            Dictionnaire structuré avec les données musicales
+        """
+        return parse_musicxml(musicxml_file)
 
 
-def read_partition_from_pdf(pdf_path: Path, output_dir: Path) -> Optional[Dict[str, Any]]:
+def read_partition_from_pdf(pdf_path: Path, output_dir: Path,
+                            cache: Optional[OCRCache] = None,
+                            parallel_pages: bool = False,
+                            max_workers: Optional[int] = None,
+                            preprocess: bool = False,
+                            dpi: int = 300) -> Optional[Dict[str, Any]]:
     """
     Fonction helper pour lire une partition depuis un PDF
 
     Args:
         pdf_path: Chemin du fichier PDF
         output_dir: Dossier de sortie
+        cache: Cache des résultats OCR (optionnel)
+        parallel_pages: Traiter les pages du PDF en parallèle
+        max_workers: Nombre de pages traitées simultanément (défaut: nombre de CPU)
+        preprocess: Normaliser les images avant l'OCR
+        dpi: Résolution de rendu et de normalisation
 
     Returns:
         Données musicales extraites
     """
-    ocr = AudiverisOCR()
-    return ocr.read_partition(pdf_path, output_dir)
+    from .ocr_backends import CLIBackend
+
+    backend = CLIBackend(dpi=dpi, parallel_pages=parallel_pages,
+                         max_workers=max_workers, preprocess=preprocess)
+    return backend.read(pdf_path, output_dir, cache)
@@ -4,57 +4,358 @@ Module de lecture de partitions via Audiveris HTTP API
 Ce module fournit une interface pour utiliser Audiveris via son service HTTP
 au lieu d'appeler l'exécutable en ligne de commande.
 """
+import hashlib
+import math
 import os
+import queue
+import time
 import logging
+import threading
 import requests
-import xml.etree.ElementTree as ET
-import zipfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union, Iterator
+
+from .deadline import Deadline, DeadlineExceededError, budget
+from .musicxml_parser import parse_musicxml, parse_musicxml_bytes
+from .ocr_cache import OCRCache
+from .ocr_progress import OCRCancelledError, ProgressCallback
 
 logger = logging.getLogger(__name__)
 
 
+class CircuitOpenError(ConnectionError):
+    """Levée lorsque le circuit est ouvert: le service est considéré indisponible"""
+
+
+class ServiceBusyError(Exception):
+    """Levée lorsque le service refuse un travail (429): file d'attente pleine"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UploadAbortedError(Exception):
+    """Levée dans le corps d'un upload relayé interrompu (client déconnecté, délai dépassé)"""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur protégeant les appels au service OCR
+
+    Après `failure_threshold` échecs consécutifs le circuit s'ouvre : les appels
+    échouent immédiatement pendant `reset_timeout` secondes. Un appel d'essai
+    est ensuite autorisé (semi-ouvert) ; son succès referme le circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        """
+        Initialise le disjoncteur
+
+        Args:
+            failure_threshold: Nombre d'échecs consécutifs avant ouverture
+            reset_timeout: Durée d'ouverture avant un appel d'essai (secondes)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """État courant du disjoncteur"""
+        with self.lock:
+            return self._state()
+
+    def _state(self) -> str:
+        """État courant (lock déjà acquis)"""
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """Indique si un appel peut être tenté"""
+        with self.lock:
+            state = self._state()
+            if state == self.HALF_OPEN:
+                # Un seul appel d'essai: le prochain attendra un nouveau délai
+                self.opened_at = time.monotonic()
+                return True
+            return state == self.CLOSED
+
+    def record_success(self):
+        """Enregistre un appel réussi (referme le circuit)"""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """Enregistre un échec (ouvre le circuit au-delà du seuil)"""
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Service OCR indisponible: circuit ouvert pour {self.reset_timeout} s")
+                self.opened_at = time.monotonic()
+
+
+class ServiceEndpoint:
+    """Instance du service Audiveris: disjoncteur, état de santé et travaux en cours"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.breaker = CircuitBreaker()
+        self.health = None  # (état, horodatage)
+        self.outstanding = 0
+
+    def __repr__(self) -> str:
+        return f"ServiceEndpoint({self.url})"
+
+
 class AudiverisHTTPClient:
-    """Client HTTP pour le service Audiveris"""
+    """
+    Client HTTP pour le service Audiveris
 
-    def __init__(self, service_url: Optional[str] = None):
+    Plusieurs instances du service peuvent être déclarées (URLs séparées par
+    des virgules) : chaque travail est confié à l'instance en bonne santé qui
+    a le moins de travaux en cours. Une instance en échec est écartée, puis
+    réintégrée dès qu'un contrôle de santé réussit à nouveau.
+    """
+
+    # Attente maximale d'un long-poll sur GET /jobs/<id> (secondes)
+    POLL_WAIT = 30
+    # Attente maximale d'une requête de suivi quand l'annulation est possible (secondes)
+    CANCEL_POLL_WAIT = 2
+    # Messages de progression selon l'état du travail côté service
+    JOB_STATUS_MESSAGES = {
+        'queued': "En file d'attente sur le service OCR",
+        'running': "Analyse en cours sur le service OCR"
+    }
+    # Timeout des requêtes courtes (soumission, annulation, marge du long-poll)
+    REQUEST_TIMEOUT = 30
+    # En-tête transmettant au service le temps restant à la conversion (secondes)
+    DEADLINE_HEADER = 'X-Request-Timeout'
+    # Durée de validité de l'état de santé mis en cache (secondes)
+    HEALTH_TTL = 30
+    # Taille du pool de connexions HTTP persistantes (par instance)
+    POOL_SIZE = 10
+    # Délai avant nouvel essai si le service saturé n'indique pas de Retry-After (secondes)
+    DEFAULT_RETRY_AFTER = 5
+
+    def __init__(self, service_url: Optional[Union[str, List[str]]] = None, job_timeout: float = 900,
+                 check_service: bool = True):
         """
         Initialise le client HTTP
 
         Args:
-            service_url: URL du service Audiveris (défaut: depuis variable d'environnement)
+            service_url: URL(s) du service Audiveris, liste ou chaîne séparée par des
+                virgules (défaut: depuis variable d'environnement)
+            job_timeout: Durée maximale d'un travail OCR, file d'attente comprise (secondes)
+            check_service: Vérifier immédiatement que le service répond
+        """
+        urls = service_url or os.getenv('AUDIVERIS_SERVICE_URL', 'http://audiveris:8080')
+        if isinstance(urls, str):
+            urls = urls.split(',')
+        self.endpoints = [ServiceEndpoint(url.strip()) for url in urls if url.strip()]
+        if not self.endpoints:
+            raise ValueError("Aucune URL de service Audiveris configurée")
+
+        self.service_url = ', '.join(endpoint.url for endpoint in self.endpoints)
+        self.job_timeout = job_timeout
+        self.session = self._create_session()
+        # Contrôles de santé sans relance: une instance malade doit être écartée sans délai
+        self.health_session = requests.Session()
+        self._lock = threading.Lock()
+        self._rotation = 0
+
+        if check_service:
+            self._check_service()
+
+    def _create_session(self) -> requests.Session:
         """
-        self.service_url = service_url or os.getenv('AUDIVERIS_SERVICE_URL', 'http://audiveris:8080')
-        self._check_service()
+        Crée la session HTTP partagée (connexions persistantes)
+
+        Les appels idempotents (GET, DELETE) sont relancés avec un délai
+        exponentiel en cas d'erreur réseau ou de 502/503/504 ; la soumission
+        (POST) ne l'est jamais pour ne pas créer de travail en double. Avec
+        plusieurs instances, une connexion refusée n'est pas relancée : le
+        travail est aussitôt confié à une autre instance.
+        """
+        retry = Retry(
+            total=3,
+            connect=0 if len(self.endpoints) > 1 else None,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(['GET', 'DELETE']),
+            raise_on_status=False
+        )
+        pool_size = self.POOL_SIZE * len(self.endpoints)
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _request(self, endpoint: ServiceEndpoint, method: str, path: str,
+                 session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+        """
+        Effectue un appel à une instance du service à travers son disjoncteur
+
+        Raises:
+            CircuitOpenError: L'instance est considérée indisponible
+        """
+        if not endpoint.breaker.allow_request():
+            raise CircuitOpenError(f"Service Audiveris indisponible ({endpoint.url}), appel refusé")
 
-    def _check_service(self) -> bool:
-        """Vérifie que le service Audiveris est accessible"""
         try:
-            response = requests.get(f"{self.service_url}/health", timeout=5)
-            if response.status_code == 200:
-                logger.info(f"Service Audiveris accessible à: {self.service_url}")
-                return True
-            else:
-                logger.warning(f"Service Audiveris répond avec le code {response.status_code}")
-                return False
+            response = (session or self.session).request(method, f"{endpoint.url}{path}", **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            endpoint.breaker.record_failure()
+            self._set_health(endpoint, False)
+            raise
+
+        if response.status_code >= 500:
+            endpoint.breaker.record_failure()
+        else:
+            endpoint.breaker.record_success()
+        return response
+
+    def _set_health(self, endpoint: ServiceEndpoint, healthy: bool):
+        """Met à jour l'état de santé d'une instance (écartée ou réintégrée)"""
+        previous = endpoint.health[0] if endpoint.health else None
+        endpoint.health = (healthy, time.monotonic())
+        if previous is True and not healthy:
+            logger.warning(f"Service Audiveris écarté: {endpoint.url}")
+        elif previous is False and healthy:
+            logger.info(f"Service Audiveris réintégré: {endpoint.url}")
+
+    def _check_endpoint(self, endpoint: ServiceEndpoint) -> bool:
+        """Vérifie qu'une instance du service est accessible"""
+        try:
+            response = self._request(endpoint, 'GET', '/health', session=self.health_session, timeout=5)
+        except CircuitOpenError:
+            self._set_health(endpoint, False)
+            return False
         except requests.ConnectionError:
-            logger.error(f"Impossible de se connecter au service Audiveris à {self.service_url}")
-            raise ConnectionError(f"Service Audiveris non accessible à {self.service_url}")
+            logger.error(f"Impossible de se connecter au service Audiveris à {endpoint.url}")
+            return False
         except requests.Timeout:
-            logger.error("Timeout lors de la connexion au service Audiveris")
-            raise TimeoutError("Service Audiveris ne répond pas")
+            logger.error(f"Timeout lors de la connexion au service Audiveris à {endpoint.url}")
+            return False
+
+        healthy = response.status_code == 200
+        if healthy:
+            logger.info(f"Service Audiveris accessible à: {endpoint.url}")
+        else:
+            logger.warning(f"Service Audiveris {endpoint.url} répond avec le code {response.status_code}")
+        self._set_health(endpoint, healthy)
+        return healthy
+
+    def _check_service(self) -> bool:
+        """
+        Vérifie que le service Audiveris est accessible (au moins une instance)
+
+        Raises:
+            ConnectionError: Aucune instance ne répond
+        """
+        healthy = [self._check_endpoint(endpoint) for endpoint in self.endpoints]
+        if not any(healthy):
+            raise ConnectionError(f"Service Audiveris non accessible à {self.service_url}")
+        return True
+
+    def _is_endpoint_healthy(self, endpoint: ServiceEndpoint) -> bool:
+        """État de santé d'une instance, mis en cache pendant HEALTH_TTL secondes"""
+        if endpoint.breaker.state == CircuitBreaker.OPEN:
+            return False
+        if endpoint.health is not None and time.monotonic() - endpoint.health[1] < self.HEALTH_TTL:
+            return endpoint.health[0]
+        return self._check_endpoint(endpoint)
+
+    def is_healthy(self) -> bool:
+        """
+        État de santé du service, mis en cache pendant HEALTH_TTL secondes
+
+        Returns:
+            True si au moins une instance répondait lors de la dernière vérification
+        """
+        return any(self._is_endpoint_healthy(endpoint) for endpoint in self.endpoints)
+
+    def _acquire_endpoint(self, exclude: List[ServiceEndpoint]) -> Optional[ServiceEndpoint]:
+        """
+        Choisit l'instance en bonne santé ayant le moins de travaux en cours
+
+        Les instances à égalité sont choisies à tour de rôle. Le travail est
+        compté sur l'instance jusqu'à l'appel de _release_endpoint.
 
-    def read_partition(self, input_file: Path, output_dir: Path) -> Optional[Dict[str, Any]]:
+        Args:
+            exclude: Instances déjà essayées pour ce travail
+
+        Returns:
+            Instance choisie ou None si aucune n'est disponible
+        """
+        candidates = [endpoint for endpoint in self.endpoints
+                      if endpoint not in exclude and self._is_endpoint_healthy(endpoint)]
+        if not candidates:
+            return None
+
+        with self._lock:
+            self._rotation += 1
+            offset = self._rotation % len(candidates)
+            rotated = candidates[offset:] + candidates[:offset]
+            endpoint = min(rotated, key=lambda candidate: candidate.outstanding)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _release_endpoint(self, endpoint: ServiceEndpoint):
+        """Libère le travail compté sur une instance"""
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """État de chaque instance du service (santé, disjoncteur, travaux en cours)"""
+        return [{
+            'url': endpoint.url,
+            'healthy': endpoint.health[0] if endpoint.health else None,
+            'circuit': endpoint.breaker.state,
+            'outstanding': endpoint.outstanding
+        } for endpoint in self.endpoints]
+
+    def read_partition(self, input_file: Path, output_dir: Path,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Lit une partition et extrait les données musicales via l'API HTTP
 
+        Si l'instance choisie est injoignable, le travail est soumis à la
+        suivante (aucun travail n'a pu être créé sur la première). Une fois
+        le travail créé, une perte de connexion pendant son suivi l'annule :
+        il n'est pas soumis une seconde fois ailleurs. Le délai
+        de la conversion borne l'attente et est transmis au service, qui
+        abandonne le travail s'il ne peut plus aboutir à temps.
+
         Args:
             input_file: Fichier PDF ou image de la partition
-            output_dir: Dossier de sortie pour les fichiers MusicXML (local, pour référence)
+            output_dir: Dossier de sortie (inutilisé: le MusicXML est parsé en mémoire)
+            progress: Callback (pourcentage, message) informé de l'état du travail (optionnel)
+            cancel_event: Événement dont le déclenchement annule le travail (optionnel)
+            deadline: Délai de la conversion (optionnel)
 
         Returns:
             Dictionnaire contenant les données extraites ou None en cas d'erreur
+
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
         """
         logger.info(f"Envoi de la partition au service OCR: {input_file}")
 
@@ -62,60 +363,317 @@ class AudiverisHTTPClient:
             logger.error(f"Fichier non trouvé: {input_file}")
             return None
 
+        tried = []
+        busy = {}  # instance saturée → délai avant nouvel essai
+        limit = Deadline.after(self.job_timeout, deadline)
         try:
-            # Envoyer le fichier au service Audiveris
-            with open(input_file, 'rb') as f:
-                files = {'file': (input_file.name, f, self._get_mimetype(input_file))}
+            while True:
+                endpoint = self._acquire_endpoint(tried + list(busy))
+                if endpoint is None:
+                    if not busy:
+                        logger.error(f"Service OCR indisponible: {self.service_url}")
+                        return None
+
+                    # Toutes les instances joignables sont saturées: attendre qu'une place se libère
+                    delay = min(busy.values())
+                    if delay > limit.remaining():
+                        if deadline is not None and delay > deadline.remaining():
+                            raise DeadlineExceededError("OCR: délai dépassé, service OCR saturé")
+                        logger.error(f"Service OCR saturé depuis plus de {self.job_timeout} s")
+                        return None
+                    logger.info(f"Service OCR saturé, nouvel essai dans {delay} s")
+                    if progress:
+                        progress(0, "Service OCR saturé, en attente d'une place")
+                    if cancel_event is None:
+                        time.sleep(delay)
+                    elif cancel_event.wait(delay):
+                        raise OCRCancelledError("OCR annulé")
+                    busy.clear()
+                    continue
+
+                try:
+                    try:
+                        job = self._submit_job(endpoint, input_file, limit)
+                    except ServiceBusyError as e:
+                        logger.info(f"Service OCR {endpoint.url} saturé (nouvel essai possible dans {e.retry_after} s)")
+                        busy[endpoint] = e.retry_after
+                        continue
+                    except (requests.ConnectionError, requests.HTTPError, CircuitOpenError) as e:
+                        logger.warning(f"Service OCR {endpoint.url} en échec ({e}), essai sur une autre instance")
+                        tried.append(endpoint)
+                        continue
+                    if job is None:
+                        return None
+
+                    # Travail créé: il reste sur cette instance, même si son suivi échoue
+                    try:
+                        return self._fetch_result(endpoint, job, progress, cancel_event, limit, deadline)
+                    except (requests.ConnectionError, requests.Timeout, CircuitOpenError) as e:
+                        logger.error(f"Suivi du travail OCR {job['job_id']} impossible sur {endpoint.url} ({e}), "
+                                     f"annulation")
+                        self.cancel_job(endpoint, job['job_id'])
+                        if isinstance(e, requests.Timeout):
+                            raise
+                        return None
+                finally:
+                    self._release_endpoint(endpoint)
+
+        except (OCRCancelledError, DeadlineExceededError):
+            raise
+        except requests.Timeout:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceededError("OCR: délai dépassé")
+            logger.error("Timeout lors de l'appel au service OCR")
+            return None
+        except Exception as e:
+            logger.error(f"Erreur lors de l'appel au service OCR: {e}")
+            return None
+
+    def _fetch_result(self, endpoint: ServiceEndpoint, job: Dict[str, Any],
+                      progress: Optional[ProgressCallback] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      limit: Optional[Deadline] = None,
+                      deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Attend la fin d'un travail et parse le MusicXML renvoyé
+
+        Args:
+            endpoint: Instance traitant le travail
+            job: Description du travail soumis
+            progress: Callback de progression (optionnel)
+            cancel_event: Événement d'annulation (optionnel)
+            limit: Fin de l'attente (défaut: job_timeout à partir de maintenant)
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Données musicales extraites ou None en cas d'échec
+
+        Raises:
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        response = self._wait_for_job(endpoint, job['job_id'], progress, cancel_event, limit, deadline)
+        if response is None:
+            return None
+
+        if not self._is_json(response):
+            # Le MusicXML est renvoyé directement: parsing en mémoire
+            output_file_path = response.headers.get('X-Output-File', job['job_id'])
+            logger.info(f"Fichier MusicXML reçu: {output_file_path} ({len(response.content)} octets)")
+            return self.parse_musicxml_bytes(response.content, output_file_path)
+
+        job = response.json()
+        if job['status'] == 'cancelled' and deadline is not None and deadline.expired:
+            # Abandonné par le service à l'expiration du délai transmis
+            raise DeadlineExceededError("OCR: délai dépassé")
+        logger.error(f"OCR a échoué ({job['status']}): {job.get('details') or job.get('error')}")
+        return None
+
+    def _submit_job(self, endpoint: ServiceEndpoint, input_file: Path,
+                    limit: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Soumet un fichier à une instance du service OCR (POST /jobs)
+
+        Args:
+            endpoint: Instance choisie
+            input_file: Fichier PDF ou image de la partition
+            limit: Fin de l'attente du résultat, transmise au service (optionnel)
+
+        Returns:
+            Description du travail créé ou None si le fichier est refusé
+
+        Raises:
+            ServiceBusyError: File d'attente de l'instance pleine (429)
+            requests.HTTPError: Erreur de l'instance (5xx), une autre peut être essayée
+            DeadlineExceededError: Si le délai est déjà dépassé
+        """
+        headers = {}
+        if limit is not None:
+            limit.check("OCR")
+            # Arrondi supérieur: le service ne doit pas abandonner le travail avant le client
+            headers[self.DEADLINE_HEADER] = str(math.ceil(limit.remaining()))
+
+        with open(input_file, 'rb') as f:
+            files = {'file': (input_file.name, f, self._get_mimetype(input_file))}
+
+            logger.info(f"Envoi de la requête POST à {endpoint.url}/jobs")
+            response = self._request(
+                endpoint, 'POST', '/jobs',
+                files=files,
+                headers=headers,
+                timeout=budget(limit, self.REQUEST_TIMEOUT)
+            )
+
+        if response.status_code == 429:
+            raise ServiceBusyError(f"Service OCR saturé ({endpoint.url})", self._retry_after(response))
+
+        if response.status_code >= 500:
+            raise requests.HTTPError(f"{response.status_code} - {response.text}", response=response)
+
+        if response.status_code != 202:
+            logger.error(f"Erreur du service OCR: {response.status_code} - {response.text}")
+            return None
+
+        job = response.json()
+        logger.info(f"Travail OCR {job['job_id']} en file d'attente sur {endpoint.url}")
+        return job
+
+    def _wait_for_job(self, endpoint: ServiceEndpoint, job_id: str,
+                      progress: Optional[ProgressCallback] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      limit: Optional[Deadline] = None,
+                      deadline: Optional[Deadline] = None) -> Optional[requests.Response]:
+        """
+        Attend la fin d'un travail OCR par long-polling (GET /jobs/<id>?wait=N)
+
+        Chaque requête reste courte : aucune connexion n'est tenue ouverte
+        pendant toute la durée de l'OCR. Avec inline=1, la requête qui observe
+        la fin du travail reçoit directement le MusicXML, sans second aller-retour.
+        Le travail est annulé côté service si le délai global est dépassé ou
+        si cancel_event est déclenché (vérifié entre deux requêtes, plus
+        courtes dans ce cas).
+
+        Args:
+            endpoint: Instance traitant le travail
+            job_id: Identifiant du travail
+            progress: Callback informé du passage de la file d'attente à l'analyse (optionnel)
+            cancel_event: Événement d'annulation (optionnel)
+            limit: Fin de l'attente (défaut: job_timeout à partir de maintenant)
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Réponse finale (MusicXML si succès, état JSON sinon) ou None en cas d'erreur
 
-                logger.info(f"Envoi de la requête POST à {self.service_url}/ocr")
-                response = requests.post(
-                    f"{self.service_url}/ocr",
-                    files=files,
-                    timeout=300  # 5 minutes max
-                )
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        limit = limit or Deadline.after(self.job_timeout, deadline)
+        poll_wait = self.POLL_WAIT if cancel_event is None else self.CANCEL_POLL_WAIT
+        status = None
+
+        while not limit.expired:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"Annulation du travail OCR {job_id}")
+                self.cancel_job(endpoint, job_id)
+                raise OCRCancelledError("OCR annulé")
+
+            wait = max(1, min(poll_wait, int(limit.remaining())))
+            response = self._request(
+                endpoint, 'GET', f"/jobs/{job_id}",
+                params={'wait': wait, 'inline': 1},
+                timeout=wait + self.REQUEST_TIMEOUT
+            )
 
             if response.status_code != 200:
                 logger.error(f"Erreur du service OCR: {response.status_code} - {response.text}")
                 return None
 
-            result = response.json()
+            if not self._is_json(response) or response.json()['status'] in ('done', 'failed', 'cancelled'):
+                return response
 
-            if not result.get('success'):
-                logger.error(f"OCR a échoué: {result.get('error')}")
-                return None
+            if progress and response.json()['status'] != status:
+                status = response.json()['status']
+                progress(0, self.JOB_STATUS_MESSAGES.get(status, status))
 
-            # Télécharger le fichier MusicXML généré
-            output_file_path = result.get('output_file')
-            logger.info(f"Fichier MusicXML généré: {output_file_path}")
+        self.cancel_job(endpoint, job_id)
+        if deadline is not None and deadline.expired:
+            logger.info(f"Délai de la conversion dépassé, travail OCR {job_id} annulé")
+            raise DeadlineExceededError("OCR: délai dépassé")
+        logger.error(f"Timeout du travail OCR {job_id} (> {self.job_timeout} s), annulation")
+        return None
 
-            # Télécharger le fichier
-            download_url = f"{self.service_url}/download/{output_file_path}"
-            musicxml_response = requests.get(download_url, timeout=30)
+    def cancel_job(self, endpoint: ServiceEndpoint, job_id: str) -> bool:
+        """
+        Annule un travail OCR (DELETE /jobs/<id>)
 
-            if musicxml_response.status_code != 200:
-                logger.error(f"Erreur lors du téléchargement du MusicXML: {musicxml_response.status_code}")
-                return None
+        Args:
+            endpoint: Instance traitant le travail
+            job_id: Identifiant du travail
 
-            # Sauvegarder le fichier localement
-            output_dir.mkdir(parents=True, exist_ok=True)
-            local_musicxml_path = output_dir / Path(output_file_path).name
-            local_musicxml_path.write_bytes(musicxml_response.content)
+        Returns:
+            True si le service a accepté l'annulation
+        """
+        try:
+            response = self._request(endpoint, 'DELETE', f"/jobs/{job_id}", timeout=self.REQUEST_TIMEOUT)
+            return response.status_code == 200
+        except (requests.RequestException, CircuitOpenError) as e:
+            logger.warning(f"Impossible d'annuler le travail OCR {job_id}: {e}")
+            return False
 
-            logger.info(f"Fichier MusicXML sauvegardé localement: {local_musicxml_path}")
+    def start_upload(self, filename: str, deadline: Optional[Deadline] = None) -> Optional['UploadRelay']:
+        """
+        Ouvre un upload relayé en flux vers une instance du service
 
-            # Parser le fichier MusicXML
-            return self.parse_musicxml(local_musicxml_path)
+        Args:
+            filename: Nom du fichier de partition
+            deadline: Délai de la conversion, transmis au service (optionnel)
 
-        except requests.Timeout:
-            logger.error("Timeout lors de l'appel au service OCR (> 5 minutes)")
+        Returns:
+            Objet fichier dans lequel écrire le contenu, ou None si aucune
+            instance n'est disponible (l'upload doit alors être conservé localement)
+        """
+        endpoint = self._acquire_endpoint([])
+        if endpoint is None:
             return None
-        except requests.ConnectionError as e:
-            logger.error(f"Erreur de connexion au service OCR: {e}")
+        return UploadRelay(self, endpoint, filename, deadline)
+
+    def _stream_job(self, endpoint: ServiceEndpoint, chunks: Iterator[bytes], filename: str,
+                    deadline: Optional[Deadline] = None) -> Optional['PendingJob']:
+        """
+        Soumet un travail dont le contenu est envoyé au fil de sa réception (POST /jobs, corps brut)
+
+        Le corps n'étant pas rejouable, un refus (429, erreur) n'est pas
+        retenté sur une autre instance.
+
+        Args:
+            endpoint: Instance choisie (libérée en cas d'échec)
+            chunks: Blocs du fichier, dans l'ordre
+            filename: Nom du fichier de partition
+            deadline: Délai de la conversion (optionnel)
+
+        Returns:
+            Travail soumis, ou None si le service l'a refusé
+        """
+        limit = Deadline.after(self.job_timeout, deadline)
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            self.DEADLINE_HEADER: str(math.ceil(limit.remaining()))
+        }
+
+        logger.info(f"Envoi en flux de {filename} à {endpoint.url}/jobs")
+        try:
+            response = self._request(
+                endpoint, 'POST', '/jobs',
+                params={'filename': filename},
+                data=chunks,
+                headers=headers,
+                timeout=self.REQUEST_TIMEOUT
+            )
+        except (requests.RequestException, CircuitOpenError, UploadAbortedError) as e:
+            logger.error(f"Envoi en flux vers {endpoint.url} impossible: {e}")
+            self._release_endpoint(endpoint)
             return None
-        except Exception as e:
-            logger.error(f"Erreur lors de l'appel au service OCR: {e}")
+
+        if response.status_code != 202:
+            logger.error(f"Upload refusé par le service OCR: {response.status_code} - {response.text}")
+            self._release_endpoint(endpoint)
             return None
 
+        job = response.json()
+        logger.info(f"Travail OCR {job['job_id']} en file d'attente sur {endpoint.url}")
+        return PendingJob(self, endpoint, job)
+
+    def _retry_after(self, response: requests.Response) -> float:
+        """Délai indiqué par l'en-tête Retry-After (secondes)"""
+        try:
+            return max(0.0, float(response.headers['Retry-After']))
+        except (KeyError, ValueError):
+            return self.DEFAULT_RETRY_AFTER
+
+    def _is_json(self, response: requests.Response) -> bool:
+        """Indique si la réponse est un état JSON (et non un fichier MusicXML)"""
+        return response.headers.get('Content-Type', '').startswith('application/json')
+
     def _get_mimetype(self, file_path: Path) -> str:
         """Retourne le type MIME du fichier"""
         extension = file_path.suffix.lower()
@@ -138,176 +696,253 @@ class AudiverisHTTPClient:
         Returns:
             Dictionnaire structuré avec les données musicales
         """
-        logger.info(f"Parsing MusicXML: {musicxml_file}")
+        return parse_musicxml(musicxml_file)
 
-        try:
-            # Gérer les fichiers .mxl (compressés)
-            if musicxml_file.suffix.lower() == '.mxl':
-                logger.info("Fichier MXL détecté - décompression en cours")
-                with zipfile.ZipFile(musicxml_file, 'r') as zip_ref:
-                    # Trouver le fichier XML principal (pas dans META-INF)
-                    xml_files = [f for f in zip_ref.namelist()
-                                if f.endswith('.xml') and 'META-INF' not in f]
-
-                    if not xml_files:
-                        logger.error("Aucun fichier XML trouvé dans l'archive MXL")
-                        return None
+    def parse_musicxml_bytes(self, data: bytes, source_name: str) -> Dict[str, Any]:
+        """
+        Parse un MusicXML reçu en mémoire, sans passer par le disque
 
-                    main_xml = xml_files[0]
-                    logger.info(f"Extraction de {main_xml} depuis l'archive MXL")
+        Args:
+            data: Contenu du fichier MusicXML (.xml) ou MXL (.mxl compressé)
+            source_name: Nom du fichier d'origine (conservé dans source_file)
 
-                    with zip_ref.open(main_xml) as xml_file:
-                        tree = ET.parse(xml_file)
-            else:
-                # Fichier XML non compressé
-                tree = ET.parse(musicxml_file)
+        Returns:
+            Dictionnaire structuré avec les données musicales
+        """
+        return parse_musicxml_bytes(data, source_name)
+
+
+class PendingJob:
+    """
+    Travail soumis à une instance du service dont le résultat reste à récupérer
 
-            root = tree.getroot()
+    L'instance reste comptée comme occupée (répartition de charge) jusqu'à la
+    récupération du résultat ou l'annulation du travail.
+    """
 
-            # Extraire les métadonnées
-            metadata = self._extract_metadata(root)
+    def __init__(self, client: AudiverisHTTPClient, endpoint: ServiceEndpoint, job: Dict[str, Any]):
+        self.client = client
+        self.endpoint = endpoint
+        self.job = job
+        self._released = False
 
-            # Extraire les mesures et notes
-            parts = self._extract_parts(root)
+    def result(self, progress: Optional[ProgressCallback] = None,
+               cancel_event: Optional[threading.Event] = None,
+               deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Attend la fin du travail et retourne les données musicales
 
-            result = {
-                'metadata': metadata,
-                'parts': parts,
-                'source_file': str(musicxml_file)
-            }
+        Args:
+            progress: Callback (pourcentage, message) informé de l'état du travail (optionnel)
+            cancel_event: Événement dont le déclenchement annule le travail (optionnel)
+            deadline: Délai de la conversion (optionnel)
 
-            logger.info(f"MusicXML parsé avec succès: {len(parts)} partie(s)")
-            return result
+        Returns:
+            Dictionnaire contenant les données extraites ou None en cas d'erreur
 
-        except ET.ParseError as e:
-            logger.error(f"Erreur de parsing XML: {e}")
-            return None
-        except zipfile.BadZipFile as e:
-            logger.error(f"Erreur: fichier MXL corrompu: {e}")
+        Raises:
+            OCRCancelledError: Si cancel_event a été déclenché pendant l'OCR
+            DeadlineExceededError: Si le délai de la conversion est dépassé
+        """
+        try:
+            return self.client._fetch_result(self.endpoint, self.job, progress, cancel_event,
+                                             Deadline.after(self.client.job_timeout, deadline), deadline)
+        except (OCRCancelledError, DeadlineExceededError):
+            raise
+        except requests.Timeout:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceededError("OCR: délai dépassé")
+            logger.error("Timeout lors de l'appel au service OCR")
             return None
         except Exception as e:
-            logger.error(f"Erreur lors du parsing MusicXML: {e}")
+            logger.error(f"Erreur lors de l'appel au service OCR: {e}")
             return None
+        finally:
+            self._release()
 
-    def _extract_metadata(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrait les métadonnées du MusicXML"""
-        metadata = {
-            'title': None,
-            'composer': None,
-            'key': None,
-            'time_signature': None,
-            'tempo': None
-        }
+    def cancel(self):
+        """Annule le travail si son résultat n'a pas été demandé"""
+        if not self._released:
+            self.client.cancel_job(self.endpoint, self.job['job_id'])
+            self._release()
 
-        # Titre et compositeur
-        work = root.find('.//work/work-title')
-        if work is not None:
-            metadata['title'] = work.text
-
-        creator = root.find('.//creator[@type="composer"]')
-        if creator is not None:
-            metadata['composer'] = creator.text
-
-        # Tonalité (key signature)
-        key = root.find('.//attributes/key')
-        if key is not None:
-            fifths = key.find('fifths')
-            mode = key.find('mode')
-            if fifths is not None:
-                metadata['key'] = {
-                    'fifths': int(fifths.text),
-                    'mode': mode.text if mode is not None else 'major'
-                }
-
-        # Signature rythmique (time signature)
-        time = root.find('.//attributes/time')
-        if time is not None:
-            beats = time.find('beats')
-            beat_type = time.find('beat-type')
-            if beats is not None and beat_type is not None:
-                metadata['time_signature'] = f"{beats.text}/{beat_type.text}"
-
-        # Tempo
-        sound = root.find('.//sound[@tempo]')
-        if sound is not None:
-            metadata['tempo'] = int(float(sound.get('tempo')))
-
-        return metadata
-
-    def _extract_parts(self, root: ET.Element) -> List[Dict[str, Any]]:
-        """Extrait les parties (instruments/voix) et leurs notes"""
-        parts = []
-
-        for part in root.findall('.//part'):
-            part_id = part.get('id')
-            measures = []
-
-            for measure in part.findall('measure'):
-                measure_number = measure.get('number')
-                notes = self._extract_notes(measure)
-
-                measures.append({
-                    'number': int(measure_number) if measure_number else 0,
-                    'notes': notes
-                })
-
-            parts.append({
-                'id': part_id,
-                'measures': measures
-            })
-
-        return parts
-
-    def _extract_notes(self, measure: ET.Element) -> List[Dict[str, Any]]:
-        """Extrait les notes d'une mesure"""
-        notes = []
-
-        for note in measure.findall('note'):
-            note_data = {}
-
-            # Note ou silence
-            if note.find('rest') is not None:
-                note_data['type'] = 'rest'
-            else:
-                note_data['type'] = 'note'
-
-                pitch = note.find('pitch')
-                if pitch is not None:
-                    step = pitch.find('step')
-                    octave = pitch.find('octave')
-                    alter = pitch.find('alter')
-
-                    note_data['pitch'] = {
-                        'step': step.text if step is not None else None,
-                        'octave': int(octave.text) if octave is not None else None,
-                        'alter': int(alter.text) if alter is not None else 0
-                    }
-
-            # Durée
-            duration = note.find('duration')
-            if duration is not None:
-                note_data['duration'] = int(duration.text)
-
-            # Type de note (quarter, eighth, etc.)
-            note_type = note.find('type')
-            if note_type is not None:
-                note_data['note_type'] = note_type.text
-
-            notes.append(note_data)
-
-        return notes
-
-
-def read_partition_from_pdf(pdf_path: Path, output_dir: Path) -> Optional[Dict[str, Any]]:
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.client._release_endpoint(self.endpoint)
+
+
+class UploadRelay:
+    """
+    Relaie un upload vers le service OCR au fil de sa réception
+
+    Objet fichier donné au parseur multipart de Werkzeug à la place du fichier
+    temporaire : chaque bloc reçu est haché (clé du cache OCR) puis transmis
+    au service par une requête POST /jobs en streaming (transfert chunked).
+    Le fichier n'est jamais écrit sur le disque du nœud web. La file de blocs
+    est bornée : la réception suit le rythme de l'envoi.
+
+    Un upload qui ne se termine pas (client déconnecté, abort(), délai
+    dépassé) coupe l'envoi : le service ne reçoit jamais de fichier tronqué
+    et l'instance est libérée.
+    """
+
+    # Blocs en attente d'envoi (Werkzeug lit par blocs de 64 KB)
+    QUEUE_CHUNKS = 16
+    # Attente de la réponse du service une fois le fichier entièrement reçu (secondes)
+    SUBMIT_TIMEOUT = 60
+    # Attente maximale d'un bloc de l'upload avant d'abandonner l'envoi (secondes)
+    IDLE_TIMEOUT = 60
+
+    def __init__(self, client: AudiverisHTTPClient, endpoint: ServiceEndpoint, filename: str,
+                 deadline: Optional[Deadline] = None):
+        self.filename = filename
+        self.size = 0
+        self.job: Optional[PendingJob] = None
+        self._hash = hashlib.sha256()
+        self._chunks = queue.Queue(maxsize=self.QUEUE_CHUNKS)
+        self._finished = False
+        # Posé quand l'envoi s'est arrêté avant la fin: les blocs suivants sont ignorés
+        self._aborted = threading.Event()
+        # Posé pour couper l'envoi en cours (upload inachevé, réponse abandonnée)
+        self._cancelled = threading.Event()
+        # Posé par wait() quand la réponse du service tarde: le travail créé ensuite est annulé
+        self._abandoned = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._send, args=(client, endpoint, deadline), daemon=True)
+        self._thread.start()
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 du contenu reçu (complet une fois l'upload terminé)"""
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        self._put(bytes(data))
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # Appelé par Werkzeug à la fin du fichier: l'envoi est terminé
+        self._finish()
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        return b''
+
+    def close(self):
+        self._finish()
+
+    def _put(self, item: Optional[bytes]):
+        while not self._aborted.is_set():
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._put(None)
+
+    def _iter_chunks(self, deadline: Optional[Deadline]) -> Iterator[bytes]:
+        idle = Deadline.after(self.IDLE_TIMEOUT, deadline)
+        while True:
+            if self._cancelled.is_set():
+                raise UploadAbortedError(f"upload de {self.filename} interrompu")
+            if idle.expired:
+                raise UploadAbortedError(f"upload de {self.filename} sans nouvelles depuis {self.IDLE_TIMEOUT}s")
+            try:
+                chunk = self._chunks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if chunk is None:
+                return
+            idle = Deadline.after(self.IDLE_TIMEOUT, deadline)
+            yield chunk
+
+    def _send(self, client: AudiverisHTTPClient, endpoint: ServiceEndpoint, deadline: Optional[Deadline]):
+        try:
+            job = client._stream_job(endpoint, self._iter_chunks(deadline), self.filename, deadline)
+        finally:
+            self._aborted.set()
+
+        with self._lock:
+            if not self._abandoned:
+                self.job = job
+                return
+        if job is not None:
+            logger.warning(f"Travail OCR {job.job['job_id']} accepté trop tard: annulation")
+            job.cancel()
+
+    def abort(self):
+        """Coupe l'envoi d'un upload resté inachevé (sans effet sur un upload reçu en entier)"""
+        if not self._finished:
+            self._cancelled.set()
+
+    def wait(self) -> Optional[PendingJob]:
+        """
+        Termine l'envoi et attend la réponse du service
+
+        Returns:
+            Travail soumis, ou None si le service l'a refusé
+        """
+        if self._abandoned:
+            return None
+        self._finish()
+        self._thread.join(self.SUBMIT_TIMEOUT)
+        with self._lock:
+            if self.job is None and self._thread.is_alive():
+                logger.error(f"Pas de réponse du service OCR pour {self.filename} après {self.SUBMIT_TIMEOUT}s")
+                self._abandoned = True
+                self._cancelled.set()
+            return self.job
+
+    def result(self, progress: Optional[ProgressCallback] = None,
+               cancel_event: Optional[threading.Event] = None,
+               deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Résultat du travail soumis (voir PendingJob.result), None si la soumission a échoué"""
+        job = self.wait()
+        if job is None:
+            return None
+        return job.result(progress, cancel_event, deadline)
+
+    def cancel(self):
+        """Annule le travail soumis si son résultat n'a pas été demandé"""
+        job = self.wait()
+        if job is not None:
+            job.cancel()
+
+
+# Client partagé par tout le processus (connexions et état de santé réutilisés)
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AudiverisHTTPClient:
+    """Retourne le client HTTP partagé du processus (créé à la demande)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AudiverisHTTPClient(check_service=False)
+        return _client
+
+
+def read_partition_from_pdf(pdf_path: Path, output_dir: Path,
+                            cache: Optional[OCRCache] = None) -> Optional[Dict[str, Any]]:
     """
     Fonction helper pour lire une partition depuis un PDF
 
     Args:
         pdf_path: Chemin du fichier PDF
         output_dir: Dossier de sortie
+        cache: Cache des résultats OCR (optionnel)
 
     Returns:
         Données musicales extraites
     """
-    client = AudiverisHTTPClient()
-    return client.read_partition(pdf_path, output_dir)
+    from .ocr_backends import HTTPBackend
+
+    return HTTPBackend(get_client()).read(pdf_path, output_dir, cache)
@@ -0,0 +1,103 @@
+"""
+Stockage des projets Audiveris (.omr) adressé par contenu
+
+Un projet .omr contient le résultat de toutes les étapes de transcription
+(binarisation, portées, notes...). Audiveris ré-exporte le MusicXML d'un
+projet en quelques secondes, là où la transcription des images prend
+plusieurs minutes. Ce module conserve le projet de chaque fichier traité.
+
+La clé est le SHA-256 des octets du fichier, combiné à la version d'Audiveris
+et aux options de rendu (normalisation des images) : une nouvelle version
+d'Audiveris retranscrit naturellement les partitions. Le stockage est borné
+en taille avec une éviction LRU (voir disk_store).
+"""
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from .disk_store import LRUDiskStore, content_key, hash_file
+
+logger = logging.getLogger(__name__)
+
+BOOK_EXTENSION = '.omr'
+
+
+class BookStore(LRUDiskStore):
+    """Stockage disque LRU des projets .omr"""
+
+    label = "Projets .omr"
+
+    def __init__(self, store_dir: Path, max_size: int = 1024 * 1024 * 1024,
+                 audiveris_version: str = 'unknown'):
+        """
+        Initialise le stockage
+
+        Args:
+            store_dir: Dossier de stockage des projets
+            max_size: Taille maximale du stockage en octets
+            audiveris_version: Version d'Audiveris (fait partie de la clé)
+        """
+        self.audiveris_version = audiveris_version
+        super().__init__(store_dir, max_size)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.store_dir / f"{key}{BOOK_EXTENSION}"
+
+    def _entry_key(self, path: Path) -> Optional[str]:
+        return path.stem if path.suffix == BOOK_EXTENSION else None
+
+    def make_key(self, input_file: Path, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Calcule la clé du projet d'un fichier d'entrée
+
+        Args:
+            input_file: Fichier PDF ou image de la partition
+            options: Options de rendu influençant la transcription
+
+        Returns:
+            Clé hexadécimale (SHA-256)
+        """
+        return content_key(hash_file(input_file), self.audiveris_version, options)
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Récupère le projet d'un fichier déjà transcrit
+
+        Args:
+            key: Clé retournée par make_key()
+
+        Returns:
+            Chemin du projet .omr (à copier avant usage) ou None s'il est absent
+        """
+        found = self._lookup(key)
+        if found is None:
+            return None
+        logger.info(f"Projet .omr trouvé: {key[:12]}")
+        return found[0]
+
+    def put(self, key: str, book_file: Path) -> Optional[Path]:
+        """
+        Conserve le projet produit par une transcription
+
+        Args:
+            key: Clé retournée par make_key()
+            book_file: Projet .omr sauvegardé par Audiveris (copié)
+
+        Returns:
+            Chemin du projet stocké, None s'il n'a pas pu l'être
+        """
+        tmp_file = self._temp_path(key)
+        try:
+            shutil.copyfile(book_file, tmp_file)
+        except OSError as e:
+            logger.warning(f"Projet .omr {key[:12]} non conservé: {e}")
+            tmp_file.unlink(missing_ok=True)
+            return None
+        return self._commit(key, tmp_file)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du stockage"""
+        stats = super().get_stats()
+        stats['books'] = stats['entries']
+        return stats
@@ -0,0 +1,361 @@
+"""
+Cache binaire des partitions MusicXML parsées
+
+Relancer le pipeline sur un même fichier (.mxl ou .xml) le décompresse et le
+parse à chaque fois. Ce module conserve le résultat du parsing dans un format
+binaire compact : un en-tête JSON (métadonnées, parties, table des noms) suivi
+des colonnes des mesures et des notes (array.array), relues par mmap sans
+décodage intermédiaire.
+
+La clé est le SHA-256 des octets du fichier ; les entrées sont rangées par
+version du parser (musicxml_parser.PARSER_VERSION) : un parser modifié ignore
+et supprime les entrées des versions précédentes. Le cache est borné en
+taille avec une éviction LRU (voir disk_store).
+"""
+import itertools
+import json
+import logging
+import mmap
+import shutil
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, List
+
+from .disk_store import LRUDiskStore, content_key, hash_file
+from .musicxml_parser import PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+ENTRY_EXTENSION = '.score'
+
+# Signature, version du format et longueur de l'en-tête JSON
+MAGIC = b'HTPS'
+FORMAT_VERSION = 1
+PREFIX = struct.Struct('<4sHI')
+
+# Alignement des colonnes dans le fichier (octets)
+ALIGNMENT = 8
+
+# Valeurs absentes (clé absente ou None dans le dictionnaire)
+NO_VALUE = -1
+NO_OCTAVE = -32768
+
+# Genre d'événement (colonne kind)
+KIND_NOTE = 0
+KIND_REST = 1
+KIND_UNPITCHED = 2  # note sans hauteur (<unpitched/>)
+
+# Colonnes: nom → type array
+MEASURE_COLUMNS = (('number', 'i'), ('start', 'i'), ('length', 'i'), ('count', 'i'))
+NOTE_COLUMNS = (('kind', 'b'), ('step', 'h'), ('octave', 'h'), ('alter', 'b'), ('duration', 'i'),
+                ('note_type', 'h'), ('voice', 'h'), ('onset', 'i'))
+
+MEASURE_KEYS = {'number', 'notes', 'start', 'length'}
+NOTE_KEYS = {'type', 'pitch', 'duration', 'note_type', 'voice', 'onset'}
+PART_KEYS = {'id', 'measures', 'divisions'}
+
+
+def dump_score(score: Dict[str, Any], path: Path):
+    """
+    Écrit une partition parsée au format binaire
+
+    Args:
+        score: Données MusicXML retournées par musicxml_parser
+        path: Fichier à écrire
+
+    Raises:
+        ValueError: Si la partition ne suit pas la structure du parser
+            (clé inconnue, valeur hors des colonnes)
+    """
+    labels: List[str] = []
+    codes: Dict[str, int] = {}
+
+    def label(value: Optional[str]) -> int:
+        if value is None:
+            return NO_VALUE
+        if value not in codes:
+            codes[value] = len(labels)
+            labels.append(value)
+        return codes[value]
+
+    measures = {name: array(typecode) for name, typecode in MEASURE_COLUMNS}
+    notes = {name: array(typecode) for name, typecode in NOTE_COLUMNS}
+    parts = []
+
+    try:
+        for part in score['parts']:
+            if not set(part) <= PART_KEYS:
+                raise ValueError(f"clés de partie inconnues: {set(part) - PART_KEYS}")
+            parts.append({'id': part['id'], 'divisions': part.get('divisions'), 'measures': len(part['measures'])})
+
+            for measure in part['measures']:
+                if not set(measure) <= MEASURE_KEYS:
+                    raise ValueError(f"clés de mesure inconnues: {set(measure) - MEASURE_KEYS}")
+                measures['number'].append(measure['number'])
+                measures['start'].append(measure.get('start', NO_VALUE))
+                measures['length'].append(measure.get('length', NO_VALUE))
+                measures['count'].append(len(measure['notes']))
+
+                for note in measure['notes']:
+                    if not set(note) <= NOTE_KEYS:
+                        raise ValueError(f"clés de note inconnues: {set(note) - NOTE_KEYS}")
+                    pitch = note.get('pitch')
+                    if note['type'] == 'rest':
+                        kind = KIND_REST
+                    elif pitch is None:
+                        kind = KIND_UNPITCHED
+                    else:
+                        kind = KIND_NOTE
+                    pitch = pitch or {}
+                    octave = pitch.get('octave')
+                    notes['kind'].append(kind)
+                    notes['step'].append(label(pitch.get('step')))
+                    notes['octave'].append(NO_OCTAVE if octave is None else octave)
+                    notes['alter'].append(pitch.get('alter', 0))
+                    notes['duration'].append(note.get('duration', NO_VALUE))
+                    notes['note_type'].append(label(note.get('note_type')))
+                    notes['voice'].append(note.get('voice', NO_VALUE))
+                    notes['onset'].append(note.get('onset', NO_VALUE))
+    except (OverflowError, TypeError, KeyError) as e:
+        raise ValueError(f"partition non sérialisable: {e}")
+
+    # En-tête: tout ce qui n'est pas une colonne
+    columns = list(measures.items()) + list(notes.items())
+    header = {
+        'parser_version': PARSER_VERSION,
+        'byteorder': sys.byteorder,
+        'score': {key: value for key, value in score.items() if key != 'parts'},
+        'parts': parts,
+        'labels': labels,
+        'columns': {}
+    }
+    offset = 0
+    for name, column in columns:
+        header['columns'][name] = [column.typecode, offset, len(column)]
+        offset += _padded(len(column) * column.itemsize)
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(bytes(_padded(f.tell()) - f.tell()))
+        for _, column in columns:
+            data = column.tobytes()
+            f.write(data)
+            f.write(bytes(_padded(len(data)) - len(data)))
+
+
+def load_score(path: Path) -> Dict[str, Any]:
+    """
+    Relit une partition écrite par dump_score
+
+    Le fichier est projeté en mémoire (mmap) et les colonnes lues en place
+    (memoryview), sans copie ni décodage avant la construction des notes.
+
+    Args:
+        path: Fichier écrit par dump_score
+
+    Returns:
+        Données MusicXML, identiques à celles passées à dump_score
+
+    Raises:
+        ValueError: Si le fichier est invalide, d'un autre format ou d'une autre version du parser
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < PREFIX.size:
+            raise ValueError("fichier tronqué")
+        magic, format_version, header_length = PREFIX.unpack_from(data)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("format inconnu")
+        header = json.loads(data[PREFIX.size:PREFIX.size + header_length])
+        if header['parser_version'] != PARSER_VERSION or header['byteorder'] != sys.byteorder:
+            raise ValueError("entrée d'une autre version du parser")
+
+        base = _padded(PREFIX.size + header_length)
+        view = memoryview(data)
+        try:
+            columns = {}
+            for name, (typecode, offset, count) in header['columns'].items():
+                start = base + offset
+                size = count * array(typecode).itemsize
+                if start + size > len(data):
+                    raise ValueError("fichier tronqué")
+                with view[start:start + size] as raw, raw.cast(typecode) as column:
+                    columns[name] = column.tolist()
+        finally:
+            view.release()
+
+    return _build_score(header, columns)
+
+
+def _build_score(header: Dict[str, Any], columns: Dict[str, List[int]]) -> Dict[str, Any]:
+    """Reconstruit le dictionnaire du parser depuis l'en-tête et les colonnes"""
+    labels = header['labels'] + [None]  # NO_VALUE (-1) → None
+    steps = [labels[code] for code in columns['step']]
+    note_types = [labels[code] for code in columns['note_type']]
+    octaves = [None if octave == NO_OCTAVE else octave for octave in columns['octave']]
+    kind_names = {KIND_NOTE: 'note', KIND_REST: 'rest', KIND_UNPITCHED: 'note'}
+
+    # Notes complètes en une compréhension, puis retrait des clés absentes (rare)
+    notes = [
+        {'type': 'note', 'pitch': {'step': step, 'octave': octave, 'alter': alter},
+         'duration': duration, 'note_type': note_type, 'voice': voice, 'onset': onset}
+        if kind == KIND_NOTE else
+        {'type': kind_names[kind], 'duration': duration, 'note_type': note_type, 'voice': voice, 'onset': onset}
+        for kind, step, octave, alter, duration, note_type, voice, onset in zip(
+            columns['kind'], steps, octaves, columns['alter'], columns['duration'],
+            note_types, columns['voice'], columns['onset'])
+    ]
+    for key, values, absent in (('duration', columns['duration'], NO_VALUE), ('note_type', note_types, None),
+                                ('voice', columns['voice'], NO_VALUE), ('onset', columns['onset'], NO_VALUE)):
+        if absent in values:
+            for index, value in enumerate(values):
+                if value == absent:
+                    del notes[index][key]
+
+    measure_rows = zip(*(columns[name] for name, _ in MEASURE_COLUMNS))
+    position = 0
+    parts = []
+    for part_header in header['parts']:
+        measures = []
+        for number, start, length, count in itertools.islice(measure_rows, part_header['measures']):
+            measure = {'number': number, 'notes': notes[position:position + count]}
+            position += count
+            if start != NO_VALUE:
+                measure['start'] = start
+            if length != NO_VALUE:
+                measure['length'] = length
+            measures.append(measure)
+
+        parts.append({'id': part_header['id'], 'measures': measures, 'divisions': part_header['divisions']})
+
+    score = dict(header['score'])
+    score['parts'] = parts
+    return score
+
+
+def _padded(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class ParseCache(LRUDiskStore):
+    """Cache disque LRU des partitions parsées (un fichier .score par entrée)"""
+
+    label = "Cache de parsing"
+
+    def __init__(self, cache_dir: Path, max_size: int = 200 * 1024 * 1024):
+        """
+        Initialise le cache
+
+        Args:
+            cache_dir: Dossier du cache (un sous-dossier par version du parser)
+            max_size: Taille maximale du cache en octets
+        """
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / f"v{PARSER_VERSION}"
+        super().__init__(self.entries_dir, max_size)
+        self._remove_stale_versions()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / f"{key}{ENTRY_EXTENSION}"
+
+    def _entry_key(self, path: Path) -> Optional[str]:
+        return path.stem if path.suffix == ENTRY_EXTENSION else None
+
+    def _remove_stale_versions(self):
+        """Supprime les entrées écrites par d'autres versions du parser"""
+        for version_dir in self.cache_dir.iterdir():
+            if version_dir != self.entries_dir and version_dir.is_dir() and version_dir.name.startswith('v'):
+                logger.info(f"Cache de parsing: suppression des entrées {version_dir.name}")
+                shutil.rmtree(version_dir, ignore_errors=True)
+
+    def make_key(self, musicxml_file: Path, variant: str = '') -> str:
+        """
+        Calcule la clé de cache d'un fichier MusicXML
+
+        Args:
+            musicxml_file: Fichier MusicXML (.xml) ou MXL (.mxl)
+            variant: Lecture effectuée (ex. partie principale seule), fait partie de la clé
+
+        Returns:
+            Clé hexadécimale (SHA-256)
+        """
+        return content_key(hash_file(musicxml_file), options={'variant': variant})
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une partition parsée
+
+        Args:
+            key: Clé retournée par make_key()
+
+        Returns:
+            Données MusicXML parsées ou None si absentes
+        """
+        found = self._lookup(key)
+        if found is None:
+            return None
+        entry, serial = found
+
+        try:
+            score = load_score(entry)
+        except (OSError, ValueError, KeyError) as e:
+            self._discard(key, serial, e)
+            return None
+
+        logger.info(f"Cache de parsing: hit {key[:12]}")
+        return score
+
+    def put(self, key: str, score: Dict[str, Any]) -> bool:
+        """
+        Stocke une partition parsée
+
+        Args:
+            key: Clé retournée par make_key()
+            score: Données MusicXML parsées
+
+        Returns:
+            True si la partition a été stockée
+        """
+        tmp_file = self._temp_path(key)
+        try:
+            dump_score(score, tmp_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Partition non mise en cache: {e}")
+            tmp_file.unlink(missing_ok=True)
+            return False
+
+        return self._commit(key, tmp_file) is not None
+
+
+def parse_with_cache(cache: Optional[ParseCache], musicxml_file: Path,
+                     parse_fn: Callable[[], Optional[Dict[str, Any]]],
+                     variant: str = '') -> Optional[Dict[str, Any]]:
+    """
+    Exécute un parsing en passant par le cache
+
+    Args:
+        cache: Cache à utiliser (None = pas de cache)
+        musicxml_file: Fichier MusicXML (sert au calcul de la clé)
+        parse_fn: Fonction réalisant le parsing en cas d'absence dans le cache
+        variant: Lecture effectuée par parse_fn (fait partie de la clé)
+
+    Returns:
+        Données MusicXML parsées ou None en cas d'erreur
+    """
+    if cache is None or not Path(musicxml_file).exists():
+        return parse_fn()
+
+    key = cache.make_key(musicxml_file, variant)
+    cached = cache.get(key)
+    if cached is not None:
+        # Même contenu, fichier peut-être différent (nouvel upload)
+        cached['source_file'] = str(musicxml_file)
+        return cached
+
+    result = parse_fn()
+    if result:
+        cache.put(key, result)
+    return result
@@ -7,6 +7,8 @@ from typing import Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from enum import Enum
 
+from .deadline import Deadline
+
 
 class ProgressStatus(Enum):
     """États possibles d'une étape"""
@@ -92,26 +94,51 @@ class ProgressTracker:
         }
     ]
 
-    def __init__(self, session_id: str):
+    # Upload MusicXML: la partition est lue directement, sans OCR
+    MUSICXML_PIPELINE_STEPS = [
+        {
+            'id': 'musicxml',
+            'name': 'Lecture MusicXML',
+            'substeps': []
+        }
+    ] + PIPELINE_STEPS[1:]
+
+    # Upload MIDI: les notes sont lues directement, sans OCR ni MusicXML
+    MIDI_PIPELINE_STEPS = [
+        {
+            'id': 'midi',
+            'name': 'Lecture MIDI',
+            'substeps': []
+        }
+    ] + PIPELINE_STEPS[1:]
+
+    def __init__(self, session_id: str, pipeline_steps: Optional[list] = None,
+                 deadline: Optional[Deadline] = None):
         """
         Initialise le tracker de progression
 
         Args:
             session_id: Identifiant unique de la session
+            pipeline_steps: Étapes suivies (défaut: PIPELINE_STEPS)
+            deadline: Délai de la conversion suivie (optionnel)
         """
         self.session_id = session_id
+        self.pipeline_steps = pipeline_steps or self.PIPELINE_STEPS
         self.steps = {}
         self.current_step = None
         self.callbacks = []
         self.lock = threading.Lock()
         self.start_time = time.time()
+        # Déclenché par cancel(): les étapes longues (OCR) s'interrompent
+        self.cancel_event = threading.Event()
+        self.deadline = deadline
 
         # Initialiser toutes les étapes
         self._initialize_steps()
 
     def _initialize_steps(self):
         """Initialise toutes les étapes avec le statut PENDING"""
-        for step_def in self.PIPELINE_STEPS:
+        for step_def in self.pipeline_steps:
             step = ProgressStep(
                 id=step_def['id'],
                 name=step_def['name'],
@@ -182,13 +209,27 @@ class ProgressTracker:
                         self._notify_change()
                         break
 
+    def update_substep(self, step_id: str, substep_id: str, progress: int, message: str = ""):
+        """Met à jour l'avancement (0-100) d'une sous-étape en cours"""
+        with self.lock:
+            if step_id in self.steps:
+                for substep in self.steps[step_id].substeps:
+                    if substep.id == substep_id:
+                        substep.status = ProgressStatus.IN_PROGRESS
+                        substep.progress = max(0, min(100, int(progress)))
+                        substep.message = message
+                        self._update_step_progress(step_id)
+                        self._notify_change()
+                        break
+
     def _update_step_progress(self, step_id: str):
         """Met à jour le progrès global d'une étape basé sur ses sous-étapes"""
         if step_id in self.steps:
             step = self.steps[step_id]
             if step.substeps:
-                completed = sum(1 for s in step.substeps if s.status == ProgressStatus.COMPLETED)
-                step.progress = int((completed / len(step.substeps)) * 100)
+                # Les sous-étapes en cours comptent pour leur avancement partiel
+                done = sum(100 if s.status == ProgressStatus.COMPLETED else s.progress for s in step.substeps)
+                step.progress = int(done / len(step.substeps))
             else:
                 step.progress = 100 if step.status == ProgressStatus.COMPLETED else 50
 
@@ -198,9 +239,20 @@ class ProgressTracker:
             return 0
 
         total_steps = len(self.steps)
-        completed_steps = sum(1 for s in self.steps.values() if s.status == ProgressStatus.COMPLETED)
+        done = sum(100 if s.status == ProgressStatus.COMPLETED else s.progress for s in self.steps.values())
+
+        return int(done / total_steps)
+
+    def cancel(self):
+        """Demande l'annulation du pipeline (l'étape en cours s'interrompt)"""
+        with self.lock:
+            self.cancel_event.set()
+            self._notify_change()
 
-        return int((completed_steps / total_steps) * 100)
+    @property
+    def is_cancelled(self) -> bool:
+        """Indique si l'annulation a été demandée"""
+        return self.cancel_event.is_set()
 
     def get_overall_progress(self) -> int:
         """Calcule le progrès global du pipeline"""
@@ -214,6 +266,7 @@ class ProgressTracker:
             'overall_progress': self._calculate_overall_progress(),
             'elapsed_time': int(time.time() - self.start_time),
             'current_step': self.current_step,
+            'cancelled': self.cancel_event.is_set(),
             'steps': [
                 {
                     'id': step.id,
@@ -266,10 +319,11 @@ def get_tracker(session_id: str) -> Optional[ProgressTracker]:
         return _trackers.get(session_id)
 
 
-def create_tracker(session_id: str) -> ProgressTracker:
-    """Crée un nouveau tracker"""
+def create_tracker(session_id: str, pipeline_steps: Optional[list] = None,
+                   deadline: Optional[Deadline] = None) -> ProgressTracker:
+    """Crée un nouveau tracker (étapes par défaut: pipeline OCR complet)"""
     with _trackers_lock:
-        tracker = ProgressTracker(session_id)
+        tracker = ProgressTracker(session_id, pipeline_steps, deadline)
         _trackers[session_id] = tracker
         return tracker
 
@@ -0,0 +1,137 @@
+"""
+Module de fusion de partitions MusicXML parsées
+
+Lorsqu'une partition est lue page par page (OCR parallèle, upload de plusieurs
+images), chaque page produit son propre dictionnaire MusicXML. Ce module les
+assemble en une seule partition : les mesures sont renumérotées en continu et
+les parties restent alignées par identifiant, une partie absente d'une page
+étant complétée par des mesures de silence.
+"""
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def merge_scores(scores: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Fusionne plusieurs partitions (pages) en une seule
+
+    Les parties sont alignées d'une page à l'autre par identifiant (P1, P2...),
+    dans l'ordre de leur première apparition. Une page non lue (None) est
+    signalée dans 'failed_pages' ; une page lue mais sans musique est ignorée.
+
+    Args:
+        scores: Données MusicXML parsées de chaque page, dans l'ordre
+
+    Returns:
+        Données MusicXML de la partition complète ou None si aucune page valide
+    """
+    failed_pages = [number for number, score in enumerate(scores, start=1) if score is None]
+    pages = [score for score in scores if score and score.get('parts')]
+    if not pages:
+        logger.error("Aucune page exploitable à fusionner")
+        return None
+
+    if failed_pages:
+        logger.warning(f"OCR en échec pour les pages: {failed_pages}")
+    if len(pages) + len(failed_pages) < len(scores):
+        logger.warning(f"{len(scores) - len(pages) - len(failed_pages)} page(s) sans musique ignorée(s)")
+
+    page_parts = [_parts_by_id(page) for page in pages]
+    merged_parts = {}
+    for parts in page_parts:
+        for part_id in parts:
+            merged_parts.setdefault(part_id, {'id': part_id, 'measures': [], 'divisions': None})
+    measure_number = 0
+    position = 0  # début de la mesure en cours (ticks), les pages se suivant
+
+    for parts in page_parts:
+        page_measures = max(len(part['measures']) for part in parts.values())
+
+        for index in range(page_measures):
+            measure_number += 1
+            reference = _reference_measure(list(parts.values()), index)
+
+            for part_id, merged_part in merged_parts.items():
+                part = parts.get(part_id)
+
+                if part is not None and merged_part['divisions'] is None:
+                    merged_part['divisions'] = part.get('divisions')
+
+                if part is not None and index < len(part['measures']):
+                    measure = _shift_measure(part['measures'][index], position)
+                else:
+                    measure = _rest_measure(reference, position)
+
+                measure['number'] = measure_number
+                merged_part['measures'].append(measure)
+
+            position += _measure_duration(reference) if reference else 0
+
+    result = {
+        'metadata': _merge_metadata([page.get('metadata', {}) for page in pages]),
+        'parts': list(merged_parts.values()),
+        'source_file': pages[0].get('source_file'),
+        'pages': len(scores),
+        'failed_pages': failed_pages
+    }
+
+    logger.info(f"{len(pages)} page(s) fusionnée(s): {len(merged_parts)} partie(s), {measure_number} mesure(s)")
+    return result
+
+
+def _parts_by_id(page: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Parties d'une page par identifiant (P1, P2... d'après leur position si absent)"""
+    return {part.get('id') or f"P{index + 1}": part for index, part in enumerate(page['parts'])}
+
+
+def _reference_measure(parts: List[Dict[str, Any]], index: int) -> Optional[Dict[str, Any]]:
+    """Retourne la mesure la plus longue des parties à cet index (sert de gabarit)"""
+    candidates = [part['measures'][index] for part in parts if index < len(part['measures'])]
+    if not candidates:
+        return None
+    return max(candidates, key=_measure_duration)
+
+
+def _measure_duration(measure: Dict[str, Any]) -> int:
+    """Durée totale d'une mesure (en divisions)"""
+    if 'length' in measure:
+        return measure['length']
+    return sum(note.get('duration') or 0 for note in measure.get('notes', []))
+
+
+def _shift_measure(measure: Dict[str, Any], position: int) -> Dict[str, Any]:
+    """Copie d'une mesure placée à `position` (début des notes décalé d'autant)"""
+    measure = dict(measure)
+    if 'start' in measure:
+        shift = position - measure['start']
+        measure['start'] = position
+        measure['notes'] = [dict(note, onset=note['onset'] + shift) if 'onset' in note else note
+                            for note in measure['notes']]
+    return measure
+
+
+def _rest_measure(reference: Optional[Dict[str, Any]], position: int = 0) -> Dict[str, Any]:
+    """Crée une mesure de silence de même durée que la mesure de référence"""
+    duration = _measure_duration(reference) if reference else 0
+    rest = {
+        'type': 'rest',
+        'duration': duration,
+        'note_type': 'whole'
+    }
+    measure = {'notes': [rest]}
+    if reference and 'start' in reference:
+        rest['onset'] = measure['start'] = position
+        measure['length'] = duration
+    return measure
+
+
+def _merge_metadata(metadata_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Métadonnées de la première page, complétées par les pages suivantes"""
+    merged = dict(metadata_list[0])
+    for metadata in metadata_list[1:]:
+        for key, value in metadata.items():
+            if merged.get(key) is None and value is not None:
+                merged[key] = value
+    return merged
@@ -5,8 +5,11 @@ Ce module permet de transposer une mélodie pour la rendre jouable sur un harmon
 en trouvant automatiquement la meilleure transposition possible.
 """
 import logging
+from collections import Counter
 from typing import Dict, List, Any, Optional, Tuple
 
+from .note_columns import NoteColumns
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,10 +56,11 @@ class Transposer:
         # Si melody est un dict avec 'notes', extraire les notes
         notes_list = melody.get('notes', melody) if isinstance(melody, dict) else melody
 
-        transposed_notes = []
-        for note in notes_list:
-            transposed_note = self._transpose_note(note, semitones)
-            transposed_notes.append(transposed_note)
+        if isinstance(notes_list, NoteColumns):
+            # Colonnes: seules les hauteurs sont recalculées
+            transposed_notes = notes_list.transposed(semitones)
+        else:
+            transposed_notes = [self._transpose_note(note, semitones) for note in notes_list]
 
         # Si c'était un dict, reconstruire la structure
         if isinstance(melody, dict) and 'notes' in melody:
@@ -135,30 +139,47 @@ class Transposer:
         # Extraire la liste des notes
         notes_list = melody_data.get('notes', melody_data) if isinstance(melody_data, dict) else melody_data
 
-        # Construire l'ensemble des notes jouables sur l'harmonica
+        # Chaque nom de note n'est vérifié qu'une fois, pondéré par son nombre d'occurrences
+        if isinstance(notes_list, NoteColumns):
+            note_names = Counter({f"{pitch}{octave}": count
+                                  for (pitch, octave), count in notes_list.spellings().items()})
+        else:
+            note_names = Counter(f"{note['pitch']}{note['octave']}" for note in notes_list if note['type'] != 'rest')
+
+        return self._playability(note_names, self._playable_names(harmonica_map))
+
+    def _playable_names(self, harmonica_map: Dict[str, Any]) -> set:
+        """Ensemble des notes jouables sur l'harmonica (ex: 'C4')"""
         playable_set = set()
         for hole_data in harmonica_map.get('notes', {}).values():
             for action, note_info in hole_data.items():
                 if isinstance(note_info, dict) and 'note' in note_info and 'octave' in note_info:
                     note_name = f"{note_info['note']}{note_info['octave']}"
                     playable_set.add(note_name)
+        return playable_set
 
-        # Vérifier chaque note de la mélodie
-        total_notes = 0
-        playable_notes = 0
-        missing_notes = set()
+    def _transposed_names(self, midi_counts: Counter, semitones: int) -> Counter:
+        """Noms des notes après transposition (ils ne dépendent que de la hauteur MIDI)"""
+        names = Counter()
+        for midi, count in midi_counts.items():
+            pitch, octave = self._midi_to_note(midi + semitones)
+            names[f"{pitch}{octave}"] += count
+        return names
 
-        for note in notes_list:
-            if note['type'] == 'rest':
-                continue
+    def _playability(self, note_names: Counter, playable_set: set) -> Dict[str, Any]:
+        """
+        Calcule la jouabilité à partir des noms de notes de la mélodie
 
-            total_notes += 1
-            note_name = f"{note['pitch']}{note['octave']}"
+        Args:
+            note_names: Noms des notes (ex: 'C4') et leur nombre d'occurrences
+            playable_set: Notes jouables sur l'harmonica
 
-            if note_name in playable_set:
-                playable_notes += 1
-            else:
-                missing_notes.add(note_name)
+        Returns:
+            Dict au format de check_playability
+        """
+        total_notes = sum(note_names.values())
+        playable_notes = sum(count for name, count in note_names.items() if name in playable_set)
+        missing_notes = {name for name in note_names if name not in playable_set}
 
         coverage = playable_notes / total_notes if total_notes > 0 else 0
         playable = coverage == 1.0
@@ -204,13 +225,19 @@ class Transposer:
         best_coverage = 0
         best_playability = None
 
+        # Mélodie en colonnes: chaque transposition se déduit de l'histogramme des hauteurs
+        notes_list = melody_data.get('notes', melody_data) if isinstance(melody_data, dict) else melody_data
+        midi_counts = notes_list.midi_counts() if isinstance(notes_list, NoteColumns) else None
+        playable_set = self._playable_names(harmonica_map)
+
         # Tester chaque transposition possible
         for semitones in range(min_semitones, max_semitones + 1):
-            # Transposer la mélodie
-            transposed = self.transpose_melody(melody_data, semitones)
-
-            # Vérifier la jouabilité
-            playability = self.check_playability(transposed, harmonica_map)
+            if midi_counts is not None and semitones != 0:
+                playability = self._playability(self._transposed_names(midi_counts, semitones), playable_set)
+            else:
+                # Transposer la mélodie puis vérifier la jouabilité
+                transposed = self.transpose_melody(melody_data, semitones)
+                playability = self.check_playability(transposed, harmonica_map)
 
             # Si jouable à 100%, on a trouvé une solution
             if playability['playable']:
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark du parser MusicXML en flux
+
+Génère des partitions synthétiques de taille croissante (.xml et .mxl) et
+mesure, pour chacune, le temps et le pic mémoire :
+- du parcours en flux (iter_measures, mesures non conservées)
+- du parsing complet (parse_musicxml)
+- d'un arbre ElementTree complet (ET.parse, référence)
+
+puis compare les deux implémentations XML de parse_musicxml (lxml si
+installé, bibliothèque standard) sur des partitions de 1k, 10k et 100k notes,
+et l'extraction de la mélodie d'une partition à plusieurs parties: parsing
+complet (parse_musicxml) ou pré-lecture et partie principale seule
+(read_main_part), et enfin le parsing d'un .mxl de 50k notes face à sa
+relecture depuis le cache binaire (parse_cache).
+"""
+import sys
+import time
+import tempfile
+import tracemalloc
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Ajouter le projet au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import musicxml_parser
+from modules.melody_extractor import extract_melody_from_musicxml, read_main_part
+from modules.musicxml_parser import parse_musicxml, iter_measures
+from modules.parse_cache import dump_score, load_score
+
+NOTE = ('<note><pitch><step>{step}</step><octave>4</octave></pitch>'
+        '<duration>1</duration><voice>1</voice><type>quarter</type><stem>up</stem></note>')
+
+
+def write_score(path: Path, parts: int, measures: int):
+    """Écrit une partition partwise de parts x measures mesures (4 noires chacune)"""
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<score-partwise version="3.1">\n')
+        f.write('<work><work-title>Benchmark</work-title></work>\n<part-list>')
+        f.write(''.join(f'<score-part id="P{p}"><part-name>P{p}</part-name></score-part>'
+                        for p in range(1, parts + 1)))
+        f.write('</part-list>\n')
+        measure_notes = ''.join(NOTE.format(step=step) for step in 'CDEF')
+        for p in range(1, parts + 1):
+            f.write(f'<part id="P{p}">\n')
+            f.write('<measure number="1"><attributes><divisions>1</divisions>'
+                    '<key><fifths>0</fifths></key><time><beats>4</beats><beat-type>4</beat-type></time>'
+                    f'</attributes>{measure_notes}</measure>\n')
+            for m in range(2, measures + 1):
+                f.write(f'<measure number="{m}">{measure_notes}</measure>\n')
+            f.write('</part>\n')
+        f.write('</score-partwise>\n')
+
+
+def write_mxl(xml_path: Path) -> Path:
+    """Compresse un MusicXML en archive MXL"""
+    mxl_path = xml_path.with_suffix('.mxl')
+    with zipfile.ZipFile(mxl_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(xml_path, xml_path.name)
+    return mxl_path
+
+
+def measure(fn):
+    """Durée (s) et pic mémoire (Mo) d'un appel (mesurés séparément, tracemalloc ralentit)"""
+    start = time.perf_counter()
+    fn()
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak / 1024 / 1024
+
+
+def timed(fn):
+    """Durée (s) d'un appel"""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def consume_stream(path: Path):
+    for _ in iter_measures(path):
+        pass
+
+
+def benchmark(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'Fichier':>22} {'Taille':>9} | {'flux':>16} | {'parse_musicxml':>16} | {'ET.parse':>16}")
+        for parts, measures in sizes:
+            xml_path = Path(tmp) / f"score_{parts}x{measures}.xml"
+            write_score(xml_path, parts, measures)
+            mxl_path = write_mxl(xml_path)
+
+            for path in (xml_path, mxl_path):
+                size_mb = path.stat().st_size / 1024 / 1024
+                stream = measure(lambda: consume_stream(xml_path)) if path == xml_path else None
+                full = measure(lambda: parse_musicxml(path))
+                tree = measure(lambda: ET.parse(xml_path)) if path == xml_path else None
+
+                def fmt(result):
+                    return f"{result[0]:6.2f}s {result[1]:6.1f}Mo" if result else f"{'-':>16}"
+
+                print(f"{path.name:>22} {size_mb:7.1f}Mo | {fmt(stream)} | {fmt(full)} | {fmt(tree)}")
+
+
+def benchmark_backends(note_counts):
+    """Temps de parse_musicxml (meilleur de 3) selon l'implémentation XML, résultats identiques vérifiés"""
+    backends = ['etree'] + (['lxml'] if musicxml_parser.lxml_etree is not None else [])
+    default_backend = musicxml_parser.XML_BACKEND
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n{'Notes':>8} | " + ' | '.join(f"{backend:>8}" for backend in backends) + " | gain")
+        for notes in note_counts:
+            xml_path = Path(tmp) / f"score_{notes}.xml"
+            write_score(xml_path, 1, notes // 4)
+
+            durations, results = [], []
+            for backend in backends:
+                musicxml_parser.XML_BACKEND = backend
+                results.append(parse_musicxml(xml_path))
+                durations.append(min(timed(lambda: parse_musicxml(xml_path)) for _ in range(3)))
+            musicxml_parser.XML_BACKEND = default_backend
+
+            assert all(result == results[0] for result in results), "résultats différents"
+            gain = f"x{durations[0] / durations[-1]:.1f}" if len(durations) > 1 else '-'
+            print(f"{notes:>8} | " + ' | '.join(f"{duration:7.3f}s" for duration in durations) + f" | {gain}")
+
+    if len(backends) == 1:
+        print("lxml non installé: seule l'implémentation standard a été mesurée")
+
+
+def benchmark_main_part(part_counts, measures=500):
+    """Extraction de la mélodie: toutes les parties parsées ou seulement la partie principale"""
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n{'Parties':>8} | {'parse_musicxml':>16} | {'read_main_part':>16}")
+        for parts in part_counts:
+            xml_path = Path(tmp) / f"score_{parts}x{measures}.xml"
+            write_score(xml_path, parts, measures)
+
+            def full():
+                return extract_melody_from_musicxml(parse_musicxml(xml_path))
+
+            def lazy():
+                return extract_melody_from_musicxml(read_main_part(xml_path))
+
+            assert full()['notes'].to_list() == lazy()['notes'].to_list(), "mélodies différentes"
+            results = [measure(full), measure(lazy)]
+            print(f"{parts:>8} | " + ' | '.join(f"{d:6.2f}s {m:6.1f}Mo" for d, m in results))
+
+
+def benchmark_parse_cache(notes):
+    """Parsing d'un .mxl face à la relecture de son entrée de cache (meilleur de 3)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = Path(tmp) / "score.xml"
+        write_score(xml_path, 1, notes // 4)
+        mxl_path = write_mxl(xml_path)
+        entry = Path(tmp) / "score.score"
+        score = parse_musicxml(mxl_path)
+        dump_score(score, entry)
+        assert load_score(entry) == score, "entrée de cache différente"
+
+        parse = min(timed(lambda: parse_musicxml(mxl_path)) for _ in range(3))
+        load = min(timed(lambda: load_score(entry)) for _ in range(3))
+        print(f"\n{notes} notes: parse_musicxml(.mxl) {parse * 1000:.0f} ms, "
+              f"cache {load * 1000:.0f} ms ({entry.stat().st_size / 1024:.0f} Ko), x{parse / load:.0f}")
+
+
+if __name__ == '__main__':
+    benchmark([(4, 250), (8, 1000), (16, 2000)])
+    benchmark_backends([1_000, 10_000, 100_000])
+    benchmark_main_part([1, 5, 20])
+    benchmark_parse_cache(50_000)
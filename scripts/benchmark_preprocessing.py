@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la normalisation d'images avant OCR
+
+Compare, pour chaque image, le temps d'OCR Audiveris sur l'image d'origine
+et sur l'image normalisée (redressée, binarisée, rognée, ramenée à OCR_DPI).
+Sans Audiveris, seuls le coût de la normalisation et la réduction du nombre
+de pixels sont mesurés.
+"""
+import sys
+import time
+import tempfile
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+# Ajouter le projet au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from modules.image_preprocessor import preprocess_image
+from modules.ocr_reader import AudiverisOCR
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def pixel_count(image_path: Path) -> int:
+    """Nombre de pixels d'une image"""
+    with Image.open(image_path) as image:
+        return image.width * image.height
+
+
+def time_ocr(ocr: AudiverisOCR, image_path: Path, output_dir: Path) -> float:
+    """Durée d'un OCR Audiveris (secondes)"""
+    start = time.perf_counter()
+    ocr.read_partition(image_path, output_dir, preprocess=False)
+    return time.perf_counter() - start
+
+
+def benchmark(image_paths):
+    """Lance le benchmark sur une liste d'images"""
+    try:
+        ocr = AudiverisOCR(Config.AUDIVERIS_PATH, dpi=Config.OCR_DPI)
+    except FileNotFoundError:
+        ocr = None
+        print("⚠️  Audiveris non trouvé: seule la normalisation est mesurée\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        for image_path in image_paths:
+            start = time.perf_counter()
+            normalized = preprocess_image(image_path, tmp_dir / f"{image_path.stem}.png", Config.OCR_DPI)
+            preprocess_time = time.perf_counter() - start
+
+            before, after = pixel_count(image_path), pixel_count(normalized)
+            print(f"📄 {image_path.name}")
+            print(f"   Pixels: {before:,} → {after:,} ({after / before:.0%})")
+            print(f"   Normalisation: {preprocess_time:.2f} s")
+
+            if ocr:
+                raw_time = time_ocr(ocr, image_path, tmp_dir / 'raw')
+                clean_time = time_ocr(ocr, normalized, tmp_dir / 'clean')
+                print(f"   OCR original: {raw_time:.1f} s")
+                print(f"   OCR normalisé: {clean_time:.1f} s (+{preprocess_time:.1f} s de normalisation)")
+            print()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/benchmark_preprocessing.py <image> [<image> ...]")
+        sys.exit(1)
+
+    benchmark([Path(arg) for arg in sys.argv[1:]])
@@ -13,9 +13,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const fileInput = document.getElementById('file');
     if (fileInput) {
         fileInput.addEventListener('change', function(e) {
-            const file = e.target.files[0];
-            if (file) {
-                validateFile(file);
+            if (e.target.files.length) {
+                validateFiles(e.target.files);
             }
         });
     }
@@ -44,29 +43,44 @@ document.addEventListener('DOMContentLoaded', function() {
     initDragAndDrop();
 });
 
+const ALLOWED_EXTENSIONS = ['pdf', 'png', 'jpg', 'jpeg', 'mxl', 'xml', 'musicxml', 'mid', 'midi'];
+// Plusieurs fichiers: images uniquement, une par page de la partition
+const IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg'];
+
+function fileExtension(file) {
+    return file.name.includes('.') ? file.name.split('.').pop().toLowerCase() : '';
+}
+
 /**
- * Validate uploaded file
+ * Validate uploaded files (a single file, or several images forming the pages of one score)
  */
-function validateFile(file) {
+function validateFiles(files) {
     const maxSize = 10 * 1024 * 1024; // 10 MB
-    const allowedTypes = ['application/pdf', 'image/png', 'image/jpeg', 'image/jpg'];
+    const list = Array.from(files);
 
-    // Check size
-    if (file.size > maxSize) {
+    // Check size (the whole upload)
+    const totalSize = list.reduce((total, file) => total + file.size, 0);
+    if (totalSize > maxSize) {
         alert('Le fichier est trop volumineux. Taille maximale : 10 MB');
         document.getElementById('file').value = '';
         return false;
     }
 
-    // Check type
-    if (!allowedTypes.includes(file.type)) {
-        alert('Format de fichier non supporté. Utilisez PDF, PNG ou JPEG.');
+    // Check type (by extension: browsers report no MIME type for MusicXML)
+    if (!list.every(file => ALLOWED_EXTENSIONS.includes(fileExtension(file)))) {
+        alert('Format de fichier non supporté. Utilisez PDF, PNG, JPEG, MusicXML ou MIDI.');
+        document.getElementById('file').value = '';
+        return false;
+    }
+
+    if (list.length > 1 && !list.every(file => IMAGE_EXTENSIONS.includes(fileExtension(file)))) {
+        alert('Plusieurs fichiers : seules des images PNG ou JPEG (une par page) sont acceptées.');
         document.getElementById('file').value = '';
         return false;
     }
 
     // Display file info
-    displayFileInfo(file);
+    list.forEach(displayFileInfo);
     return true;
 }
 
@@ -122,7 +136,7 @@ function handleDrop(e) {
         const fileInput = document.getElementById('file');
         if (fileInput) {
             fileInput.files = files;
-            validateFile(files[0]);
+            validateFiles(files);
         }
     }
 }
@@ -27,6 +27,9 @@ class ProgressTracker {
             // Fermer si terminé
             if (data.overall_progress >= 100) {
                 this.complete(data);
+            } else if (data.cancelled) {
+                this.eventSource.close();
+                this.showError("Conversion annulée");
             }
         };
 
@@ -166,6 +169,18 @@ class ProgressTracker {
         }, 2000);
     }
 
+    cancel() {
+        if (this.isComplete) return;
+        this.isComplete = true;
+
+        if (this.eventSource) {
+            this.eventSource.close();
+        }
+
+        // sendBeacon survit à la navigation qui suit le clic
+        navigator.sendBeacon(`/cancel/${this.sessionId}`);
+    }
+
     showError(message) {
         const errorContainer = document.getElementById('error-message');
         if (errorContainer) {
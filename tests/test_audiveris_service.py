@@ -0,0 +1,227 @@
+"""
+Tests unitaires du service Audiveris (file équitable, admission, index de /outputs)
+
+Le serveur est importé sans être démarré : aucune JVM ni dossier /uploads.
+"""
+import io
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'docker' / 'audiveris'))
+import server  # noqa: E402
+
+
+class FakeJob:
+    """Travail minimal pour la file (seul client_id est utilisé)"""
+
+    def __init__(self, client_id, name):
+        self.client_id = client_id
+        self.name = name
+
+
+def create_output(root, relative, age=0, size=10):
+    """Crée un fichier de sortie vieux de `age` secondes"""
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Client de test du service, avec un pool non démarré et un index vide"""
+    monkeypatch.setattr(server, 'UPLOAD_FOLDER', tmp_path / 'uploads')
+    monkeypatch.setattr(server, 'OUTPUT_FOLDER', tmp_path / 'outputs')
+    (tmp_path / 'uploads').mkdir()
+    (tmp_path / 'outputs').mkdir()
+    index = server.OutputIndex(tmp_path / 'outputs')
+    pool = server.AudiverisWorkerPool(workers=2, jobs_per_jvm=1, max_rss_mb=1024, max_queue=1,
+                                      job_estimate=30, output_index=index)
+    monkeypatch.setattr(server, 'output_index', index)
+    monkeypatch.setattr(server, 'worker_pool', pool)
+    return server.app.test_client()
+
+
+def test_fair_queue_round_robin():
+    """Les clients sont servis à tour de rôle, quel que soit le nombre de travaux soumis"""
+    queue = server.FairJobQueue(max_size=10)
+    for name in ('a1', 'a2', 'a3'):
+        assert queue.put(FakeJob('a', name))
+    queue.put(FakeJob('b', 'b1'))
+    queue.put(FakeJob('c', 'c1'))
+
+    assert [queue.get(timeout=0).name for _ in range(5)] == ['a1', 'b1', 'c1', 'a2', 'a3']
+    assert queue.get(timeout=0) is None
+
+
+def test_fair_queue_limits():
+    """La file refuse au-delà de sa taille et de la part d'un client ; une relance passe devant"""
+    queue = server.FairJobQueue(max_size=3, max_per_client=2)
+    assert queue.put(FakeJob('a', 'a1')) and queue.put(FakeJob('a', 'a2'))
+    assert not queue.put(FakeJob('a', 'a3'))
+    assert queue.put(FakeJob('b', 'b1'))
+    assert not queue.has_room('c')
+
+    assert queue.put(FakeJob('a', 'retry'), force=True)
+    assert queue.get(timeout=0).name == 'retry'
+
+
+def test_queue_full_returns_429_with_retry_after(service, tmp_path):
+    """Une soumission refusée indique quand réessayer, d'après la durée moyenne des travaux"""
+    upload = tmp_path / 'queued.png'
+    upload.write_bytes(b'image')
+    server.worker_pool.submit(upload, tmp_path / 'outputs' / 'queued')
+
+    response = service.post('/jobs', data={'file': (io.BytesIO(b'image'), 'score.png')},
+                            content_type='multipart/form-data')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '15'
+    assert response.get_json()['retry_after'] == 15
+    assert server.worker_pool.get_stats()['jobs_rejected'] == 1
+
+    # Moyenne mobile: les travaux mesurés rapprochent l'estimation de leur durée
+    server.worker_pool._record_duration(20, 2)
+    assert server.worker_pool.retry_after() == 12
+
+
+def test_janitor_ttl_and_quota(tmp_path):
+    """Le ménage supprime les fichiers expirés puis les plus anciens au-delà du quota"""
+    create_output(tmp_path, 'old/score.mxl', age=500)
+    create_output(tmp_path, 'middle/score.mxl', age=200)
+    create_output(tmp_path, 'recent/score.xml', age=100)
+    create_output(tmp_path, 'fresh/score.mxl', age=0)
+    create_output(tmp_path, 'fresh/notes.txt', age=1000)
+    index = server.OutputIndex(tmp_path)
+    index.rebuild()
+
+    assert index.collect(ttl=400, quota_bytes=25, grace=50) == 2
+    assert index.page(0, 10) == (['fresh/score.mxl', 'recent/score.xml'], 2)
+    assert not (tmp_path / 'old').exists() and not (tmp_path / 'middle').exists()
+    assert index.get_stats() == {'expired': 1, 'evicted': 1, 'files': 2, 'bytes': 20}
+
+    # Quota dépassé mais fichiers trop récents (délai de grâce): conservés
+    assert index.collect(ttl=0, quota_bytes=5, grace=150) == 0
+
+
+def test_list_pagination(service, tmp_path):
+    """/list renvoie une page du listing, le total et l'offset de la page suivante"""
+    for number in range(5):
+        server.output_index.add(create_output(tmp_path / 'outputs', f"job{number}/score.mxl"))
+
+    first = service.get('/list?limit=2').get_json()
+    last = service.get('/list?offset=4&limit=2').get_json()
+
+    assert first['files'] == ['job0/score.mxl', 'job1/score.mxl']
+    assert first['count'] == first['total'] == 5 and first['page_count'] == 2
+    assert first['next_offset'] == 2
+    assert last['files'] == ['job4/score.mxl'] and last['next_offset'] is None
+
+
+def test_cancel_while_finishing_keeps_batch_going(tmp_path):
+    """Un travail annulé pendant la récupération de sa sortie n'empêche pas les autres d'aboutir"""
+    class CancellingIndex(server.OutputIndex):
+        def add(self, path):
+            super().add(path)
+            first.cancel()  # DELETE /jobs/<id> pendant la récupération de la sortie
+
+    outputs = tmp_path / 'outputs'
+    pool = server.AudiverisWorkerPool(workers=1, jobs_per_jvm=2, max_rss_mb=1024,
+                                      output_index=CancellingIndex(outputs))
+    batch_dir = tmp_path / 'batch'
+    batch_dir.mkdir()
+    first, second = [server.OCRJob(tmp_path / f"{name}.png", outputs / name) for name in ('first', 'second')]
+    for job in (first, second):
+        (batch_dir / f"{job.batch_stem}.mxl").write_bytes(b'PK')
+
+    pool._finish_batch([first, second], batch_dir, recycled=False, log_tail='')
+
+    assert first.status == 'cancelled'
+    assert second.future.result(timeout=0) == outputs / 'second' / 'second.mxl'
+    assert pool.get_stats()['jobs_completed'] == 1
+
+
+def test_kill_process_group_stops_launched_jvm():
+    """Tuer le lanceur tue aussi le processus qu'il a démarré (la JVM)"""
+    launcher = subprocess.Popen(['sh', '-c', 'sleep 60 & echo $!; wait'], stdout=subprocess.PIPE,
+                                start_new_session=True)
+    child = int(launcher.stdout.readline())
+
+    server._kill_process_group(launcher)
+    launcher.stdout.close()
+
+    assert launcher.returncode is not None
+    for _ in range(50):
+        if not Path(f"/proc/{child}").exists() or 'Z' in Path(f"/proc/{child}/stat").read_text().split()[2]:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("processus fils toujours actif")
+
+
+def test_evicted_book_falls_back_to_transcription(tmp_path):
+    """Un projet .omr évincé entre la soumission et le lot n'empêche pas de traiter le travail"""
+    store = server.BookStore(tmp_path / 'books', max_bytes=100)
+    book = tmp_path / 'score.omr'
+    book.write_bytes(b'x' * 10)
+    store.put('key', book)
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'image')
+    pool = server.AudiverisWorkerPool(workers=1, jobs_per_jvm=1, max_rss_mb=1024, book_store=store)
+    job = server.OCRJob(upload, tmp_path / 'outputs' / 'score')
+    job.book = store.get('key')
+    batch_dir = tmp_path / 'batch'
+    batch_dir.mkdir()
+
+    (tmp_path / 'books' / 'key.omr').unlink()  # éviction après la soumission
+    link = pool._link_input(job, batch_dir)
+
+    assert job.book is None
+    assert link.suffix == '.png' and link.resolve() == upload.resolve()
+    assert store.get('key') is None
+
+
+def test_orphan_uploads_purged(service, tmp_path):
+    """Le ménage supprime les uploads anciens, sauf ceux des travaux encore en cours"""
+    uploads = tmp_path / 'uploads'
+    running = server.OCRJob(create_output(uploads, 'running/score.png', age=7200), tmp_path / 'outputs' / 'running',
+                            job_id='running')
+    create_output(uploads, 'orphan/score.png', age=7200)
+    create_output(uploads, 'legacy.png', age=7200)
+    create_output(uploads, 'recent/score.png', age=10)
+    for name in ('running', 'orphan', 'recent'):
+        os.utime(uploads / name, ((uploads / name / 'score.png').stat().st_mtime,) * 2)
+    server.jobs['running'] = running
+
+    try:
+        assert server.purge_uploads(3600) == 2
+    finally:
+        server.jobs.pop('running')
+    assert sorted(path.name for path in uploads.iterdir()) == ['recent', 'running']
+
+
+def test_book_store_matches_application_keys(tmp_path):
+    """Le service range ses projets .omr sous les mêmes clés que l'application, dans sa limite de taille"""
+    from modules.omr_store import BookStore
+
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'image')
+    store = server.BookStore(tmp_path / 'books', max_bytes=250)
+
+    assert store.make_key(upload) == BookStore(tmp_path / 'app', audiveris_version=server.AUDIVERIS_VERSION).make_key(upload)
+
+    for key in ('a', 'b', 'c'):
+        book = tmp_path / f"{key}.omr"
+        book.write_bytes(b'x' * 100)
+        store.put(key, book)
+
+    assert store.get('a') is None and store.get('c') is not None
+    assert store.get_stats() == {'books': 2, 'bytes': 200}
+    assert sorted(path.name for path in (tmp_path / 'books').iterdir()) == ['b.omr', 'c.omr']
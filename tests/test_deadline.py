@@ -0,0 +1,67 @@
+"""
+Tests du délai unique des conversions
+"""
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+import app as harpotab
+from modules.deadline import Deadline, DeadlineExceededError, budget
+from modules.ocr_backends import create_backend
+from modules.ocr_reader import AudiverisOCR
+from modules.progress_tracker import ProgressTracker
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def test_deadline_budget():
+    """Les timeouts des étapes sont pris sur le temps restant"""
+    deadline = Deadline(10)
+
+    assert budget(None, 30) == 30
+    assert 9 < budget(deadline, 30) <= 10
+    assert budget(deadline, 5) == 5
+    assert Deadline.after(300, deadline).expires_at == deadline.expires_at
+    assert 6 < deadline.reserve(3).remaining() <= 7
+
+    expired = deadline.reserve(20)
+    assert expired.expired and expired.remaining() == 0
+    with pytest.raises(DeadlineExceededError):
+        expired.check()
+
+
+@pytest.mark.skipif(shutil.which('sh') is None, reason="shell indisponible")
+def test_audiveris_killed_at_deadline(tmp_path):
+    """Audiveris est arrêté quand le délai de la conversion expire, pas au bout de TIMEOUT"""
+    script = tmp_path / 'audiveris'
+    script.write_text("#!/bin/sh\nsleep 30\n")
+    script.chmod(0o755)
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'fake image')
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        AudiverisOCR(str(script)).read_partition(upload, tmp_path / 'out', deadline=Deadline(0.5))
+    assert time.monotonic() - start < 5
+
+
+def test_conversion_stops_at_deadline(tmp_path, monkeypatch):
+    """Une conversion qui ne peut plus aboutir à temps s'arrête sans lancer les étapes suivantes"""
+    backend = create_backend('fixture', fixture_path=FIXTURES, latency=30)
+    monkeypatch.setattr(harpotab, 'get_ocr_backend', lambda: backend)
+    monkeypatch.setattr(harpotab, 'get_ocr_cache', lambda: None)
+    monkeypatch.setattr(harpotab.Config, 'CONVERSION_PDF_RESERVE', 0)
+    upload = tmp_path / 'simple_score.png'
+    upload.write_bytes(b'fake image')
+    tracker = ProgressTracker('session')
+
+    start = time.monotonic()
+    result = harpotab.process_conversion(upload, 'diatonic', 'C', tmp_path, tracker, deadline=Deadline(0.3))
+
+    assert time.monotonic() - start < 5
+    assert result['error'] == "Délai de conversion dépassé"
+    steps = {step['id']: step for step in tracker.get_status()['steps']}
+    assert steps['ocr']['status'] == 'error'
+    assert steps['melody']['status'] == 'pending'
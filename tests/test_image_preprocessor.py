@@ -0,0 +1,89 @@
+"""
+Tests unitaires pour le module image_preprocessor (images synthétiques)
+"""
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+np = pytest.importorskip('numpy')
+
+from PIL import Image  # noqa: E402
+from modules.image_preprocessor import (  # noqa: E402
+    TRIM_PADDING, binarize, deskew, estimate_skew, preprocess_pages, resample, trim_margins
+)
+
+
+def create_staff_page(width=1600, height=1200, angle=0.0):
+    """Page blanche portant trois portées (5 lignes chacune), inclinée de `angle` degrés"""
+    image = np.full((height, width), 255, np.uint8)
+    for staff in range(3):
+        top = 300 + staff * 250
+        for line in range(5):
+            y = top + line * 16
+            cv2.line(image, (150, y), (width - 150, y), 0, 2)
+    if angle:
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        image = cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+    return image
+
+
+def test_deskew_straightens_staff_lines():
+    """Une page inclinée de 3° est redressée à ±0,5° près"""
+    page = create_staff_page(angle=3.0)
+
+    assert abs(abs(estimate_skew(page)) - 3.0) < 0.5
+    assert abs(estimate_skew(deskew(page))) < 0.5
+    straight = create_staff_page()
+    assert deskew(straight) is straight
+
+
+def test_binarize_outputs_two_levels():
+    """La binarisation ne laisse que du noir et du blanc, malgré un éclairage inégal"""
+    page = create_staff_page()
+    shading = np.tile(np.linspace(0, 90, page.shape[1]).astype(np.uint8), (page.shape[0], 1))
+    page = np.clip(page.astype(int) - shading, 0, 255).astype(np.uint8)
+
+    binary = binarize(page)
+
+    assert set(np.unique(binary)) <= {0, 255}
+    # Les lignes de portée restent noires, le fond ombré redevient blanc
+    assert binary[300, 800] == 0 and binary[200, 1400] == 255
+
+
+def test_trim_removes_white_border():
+    """Les marges blanches sont rognées, en gardant TRIM_PADDING pixels autour du contenu"""
+    page = np.full((1000, 800), 255, np.uint8)
+    page[300:500, 200:600] = 0
+    page[50, 50] = 0  # poussière isolée dans la marge
+
+    trimmed = trim_margins(page)
+
+    assert trimmed.shape == (200 + 2 * TRIM_PADDING, 400 + 2 * TRIM_PADDING)
+    assert trim_margins(np.full((10, 10), 255, np.uint8)).shape == (10, 10)
+
+
+def test_resample_reaches_target_dpi():
+    """Une image trop résolue est réduite à la résolution cible, jamais agrandie"""
+    page = np.full((2200, 1700), 255, np.uint8)  # Lettre US à 200 dpi
+
+    assert resample(page, 100, source_dpi=200).shape == (1100, 850)
+    assert resample(page, 300, source_dpi=200) is page
+    # Sans résolution connue: estimée d'après la largeur d'une page A4
+    assert resample(page, 150).shape[1] == round(150 * 8.27)
+
+
+def test_preprocess_pages_keeps_order(tmp_path):
+    """Les pages normalisées en parallèle sont rendues dans leur ordre, à la résolution cible"""
+    pages = []
+    for number, angle in enumerate((2.0, -2.0), start=1):
+        path = tmp_path / f"page{number}.png"
+        Image.fromarray(create_staff_page(angle=angle)).save(path, dpi=(400, 400))
+        pages.append(path)
+
+    outputs = preprocess_pages(pages, tmp_path / 'out', target_dpi=200, max_workers=2)
+
+    assert [path.name for path in outputs] == ['page1.png', 'page2.png']
+    for path in outputs:
+        with Image.open(path) as image:
+            assert round(image.info['dpi'][0]) == 200
+            assert image.width <= 800
+            assert set(np.unique(np.asarray(image))) <= {0, 255}
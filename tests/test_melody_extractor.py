@@ -1,8 +1,11 @@
 """
 Tests unitaires pour le module melody_extractor
 """
+from pathlib import Path
+
 import pytest
-from modules.melody_extractor import MelodyExtractor, extract_melody_from_musicxml
+from modules.melody_extractor import MelodyExtractor, extract_melody_from_musicxml, read_main_part
+from modules.musicxml_parser import parse_musicxml, scan_musicxml
 
 
 def create_test_musicxml_data():
@@ -305,3 +308,60 @@ def test_helper_function():
     result2 = extract_melody_from_musicxml(musicxml_data, keep_rests=False)
     assert result2 is not None
     assert len(result2['notes']) == 4
+
+
+def test_extract_melody_uses_timeline():
+    """Les débuts du parser sont repris; accords et voix sont réduits à la note la plus haute"""
+    musicxml_data = parse_musicxml(Path(__file__).parent / 'fixtures' / 'timeline' / 'piano_score.musicxml')
+
+    result = MelodyExtractor().extract_melody(musicxml_data)
+
+    notes = [(n['type'], n.get('pitch'), n['time'], n['duration']) for n in result['notes']]
+    assert notes == [('note', 'E', 0, 4), ('note', 'G', 4, 6), ('rest', None, 10, 6)]
+    assert result['divisions'] == 2
+
+
+def create_orchestra_score(path, comment=''):
+    """Partition à trois parties: basse (nombreuses notes graves, liaisons), mélodie aiguë, partie vide"""
+    bass = ''.join(f'<note><pitch><step>{step}</step><octave>2</octave></pitch><duration>1</duration>'
+                   f'<type>quarter</type>{tie}</note>'
+                   for step, tie in [('C', ''), ('G', '<tie type="start"/>'), ('G', '<tie type="stop"/>'), ('E', '')])
+    melody = ''.join(f'<note><pitch><step>{step}</step><alter>{alter}</alter><octave>5</octave></pitch>'
+                     f'<duration>2</duration><type>half</type></note>' for step, alter in [('B', -1), ('D', 0)])
+    path.write_text(f"""<?xml version="1.0" encoding="UTF-8"?>
+<score-partwise>
+  <work><work-title>Orchestre</work-title></work>
+  <part-list><score-part id="P1"/><score-part id="P2"/><score-part id="P3"/></part-list>
+  <part id="P1">{''.join(f'<measure number="{n}">{bass}</measure>' for n in range(1, 9))}</part>
+  <part id="P2">{comment}{''.join(f'<measure number="{n}">{melody}</measure>' for n in range(1, 9))}</part>
+  <part id="P3"/>
+</score-partwise>""")
+    return path
+
+
+def test_read_main_part_matches_full_parse(tmp_path):
+    """La pré-lecture choisit la même partie que le parsing complet, lue seule et à l'identique"""
+    score = create_orchestra_score(tmp_path / 'orchestra.xml')
+    full = parse_musicxml(score)
+    extractor = MelodyExtractor()
+
+    scan = scan_musicxml(score)
+    assert scan['parts'] == [extractor._part_statistics(part) for part in full['parts']]
+    assert scan['parts'][0]['notes'] == 24 and scan['parts'][1]['max_midi'] == 82
+    assert scan['spans'] is not None
+
+    lazy = read_main_part(score)
+    assert [part['id'] for part in lazy['parts']] == ['P2'] and lazy['part_count'] == 3
+    assert lazy['parts'][0] == extractor._select_main_part(full['parts'])
+    assert lazy['metadata'] == full['metadata']
+    assert extract_melody_from_musicxml(lazy)['notes'].to_list() == \
+        extract_melody_from_musicxml(full)['notes'].to_list()
+
+
+def test_read_main_part_falls_back_to_full_pass(tmp_path):
+    """Une partie mal délimitée par la recherche textuelle est relue en parcourant tout le fichier"""
+    score = create_orchestra_score(tmp_path / 'orchestra.xml', comment='<!-- </part> -->')
+
+    lazy = read_main_part(score)
+
+    assert lazy['parts'] == [part for part in parse_musicxml(score)['parts'] if part['id'] == 'P2']
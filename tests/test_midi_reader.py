@@ -0,0 +1,114 @@
+"""
+Tests de la lecture directe des fichiers MIDI (sans OCR)
+"""
+import struct
+from pathlib import Path
+
+import app as harpotab
+from modules.midi_reader import read_midi
+from modules.progress_tracker import ProgressTracker
+
+DAGOBERT = Path(__file__).parent.parent / 'roi_dagobert.midi'
+
+
+def varlen(value):
+    """Encode une quantité de longueur variable MIDI"""
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(data)
+
+
+def write_midi(path, events, division=480, end_of_track=True):
+    """Écrit un fichier MIDI format 0 à partir d'événements (delta, octets)"""
+    track = b''.join(varlen(delta) + data for delta, data in events)
+    if end_of_track:
+        track += b'\x00\xff\x2f\x00'
+    path.write_bytes(b'MThd' + struct.pack('>IHHH', 6, 0, 1, division) +
+                     b'MTrk' + struct.pack('>I', len(track)) + track)
+    return path
+
+
+def test_read_midi_notes_rests_and_measures(tmp_path):
+    """Tempo, métrique, accord simplifié, silence et statut courant sont interprétés"""
+    midi_file = write_midi(tmp_path / 'song.mid', [
+        (0, b'\xff\x51\x03' + (500000).to_bytes(3, 'big')),  # 120 bpm
+        (0, b'\xff\x58\x04\x03\x02\x18\x08'),                 # 3/4
+        (0, b'\x90\x3c\x64'), (0, b'\x40\x64'),                # accord C4 + E4 (statut courant)
+        (480, b'\x80\x3c\x00'), (0, b'\x40\x00'),
+        (480, b'\x90\x43\x64'),                                # G4 après un silence d'une noire
+        (960, b'\x90\x43\x00'),                                # note-off par vélocité nulle
+        (0, b'\x99\x24\x64'), (240, b'\x89\x24\x00'),          # percussions ignorées
+    ])
+
+    melody = read_midi(midi_file)
+
+    assert (melody['tempo'], melody['time_signature'], melody['divisions']) == (120, '3/4', 480)
+    assert [(n['type'], n.get('midi'), n['time'], n['duration'], n['note_type'], n['measure'])
+            for n in melody['notes']] == [
+        ('note', 64, 0, 480, 'quarter', 1),
+        ('rest', None, 480, 480, 'quarter', 1),
+        ('note', 67, 960, 960, 'half', 1),
+    ]
+    assert melody['notes'][0]['pitch'] == 'E' and melody['notes'][0]['octave'] == 4
+    assert melody['total_measures'] == 1
+
+
+def test_read_midi_rejects_invalid_file(tmp_path):
+    """Un fichier qui n'est pas un Standard MIDI File est refusé proprement"""
+    bad = tmp_path / 'bad.mid'
+    bad.write_bytes(b'not a midi file')
+    assert read_midi(bad) is None
+
+
+def test_read_midi_rejects_malformed_events(tmp_path):
+    """Un message tronqué en fin de piste ou un statut système est refusé proprement"""
+    note = [(0, b'\x90\x3c\x64'), (480, b'\x80\x3c\x00')]
+
+    assert read_midi(write_midi(tmp_path / 'truncated.mid', note + [(0, b'\x90\x3c')], end_of_track=False)) is None
+    assert read_midi(write_midi(tmp_path / 'system.mid', note + [(0, b'\xf2\x00\x00')])) is None
+    assert read_midi(write_midi(tmp_path / 'meta.mid', note + [(0, b'\xff\x03\x10ab')], end_of_track=False)) is None
+
+
+def test_read_midi_restruck_note(tmp_path):
+    """Une touche rejouée avant d'être relâchée (note-on puis note-off au même tick) garde ses durées"""
+    midi_file = write_midi(tmp_path / 'restrike.mid', [
+        (0, b'\x90\x3c\x64'),
+        (480, b'\x90\x3c\x64'), (0, b'\x80\x3c\x00'),
+        (480, b'\x80\x3c\x00'),
+    ])
+
+    notes = read_midi(midi_file)['notes']
+
+    assert [(n['type'], n['time'], n['duration']) for n in notes] == [('note', 0, 480), ('note', 480, 480)]
+
+
+def test_read_midi_metadata():
+    """Le nom de la première piste sert de titre, la métrique découpe les mesures"""
+    melody = read_midi(DAGOBERT)
+
+    assert melody['title'] == 'Le bon roi Dagobert'
+    assert melody['notes'][0]['measure'] == 1
+    assert melody['total_measures'] == melody['notes'][-1]['measure'] > 1
+
+
+def test_midi_upload_skips_ocr(tmp_path, monkeypatch):
+    """Un MIDI est lu directement: ni OCR ni MusicXML"""
+    def no_ocr():
+        raise AssertionError("L'OCR ne doit pas être appelé")
+
+    monkeypatch.setattr(harpotab, 'get_ocr_backend', no_ocr)
+    monkeypatch.setattr(harpotab, 'extract_melody_from_musicxml', no_ocr)
+    upload = tmp_path / 'score.mid'
+    upload.write_bytes(DAGOBERT.read_bytes())
+    tracker = ProgressTracker('session', ProgressTracker.MIDI_PIPELINE_STEPS)
+
+    assert harpotab.allowed_file('score.MIDI') and harpotab.is_midi_file('score.mid')
+    harpotab.process_conversion(upload, 'diatonic', 'C', tmp_path, tracker)
+
+    steps = {step['id']: step for step in tracker.get_status()['steps']}
+    assert 'ocr' not in steps
+    assert steps['midi']['status'] == 'completed'
+    assert steps['melody']['status'] == 'completed'
@@ -0,0 +1,92 @@
+"""
+Tests de l'upload de plusieurs images (pages d'une même partition)
+"""
+import io
+import time
+from pathlib import Path
+
+import app as harpotab
+from modules.ocr_backends import FixtureBackend, create_backend
+from modules.ocr_cache import OCRCache
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+def test_read_pages_concurrently_and_merges(tmp_path):
+    """Les pages sont lues en parallèle puis fusionnées en une partition continue"""
+    backend = create_backend('fixture', fixture_path=FIXTURES_DIR, latency=0.5)
+    pages = []
+    for number in range(1, 4):
+        page = tmp_path / f"page{number}.png"
+        page.write_bytes(b'fake image')
+        pages.append(page)
+    events = []
+
+    start = time.monotonic()
+    score = backend.read_pages(pages, tmp_path / 'out', max_workers=3,
+                               progress=lambda *event: events.append(event))
+
+    assert time.monotonic() - start < 1.2
+    measures = score['parts'][0]['measures']
+    assert [measure['number'] for measure in measures] == list(range(1, 13))
+    assert events[-1][0] == 100 and events[-1][1].startswith("3/3 pages lues")
+
+
+def test_multi_image_upload_orders_pages(tmp_path, monkeypatch):
+    """Les images sont enregistrées et transmises dans l'ordre naturel de leurs noms"""
+    calls = []
+    monkeypatch.setattr(harpotab.Config, 'UPLOAD_FOLDER', tmp_path)
+    monkeypatch.setattr(harpotab, 'process_conversion', lambda **kwargs: calls.append(kwargs) or {})
+    client = harpotab.create_app('testing').test_client()
+
+    response = client.post('/convert', data={
+        'file': [(io.BytesIO(b'p10'), 'IMG_10.jpg'), (io.BytesIO(b'p2'), 'IMG_2.jpg'), (io.BytesIO(b'p9'), 'IMG_9.png')],
+        'harmonica_type': 'diatonic',
+        'harmonica_key': 'C'
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    for _ in range(50):
+        if calls:
+            break
+        time.sleep(0.05)
+    pages = calls[0]['page_files']
+    assert [page.name for page in pages] == ['IMG_2.jpg', 'IMG_9.png', 'IMG_10.jpg']
+    assert [page.read_bytes() for page in pages] == [b'p2', b'p9', b'p10']
+    assert calls[0]['input_file'] == pages[0]
+
+
+def test_multi_file_upload_rejects_non_images(tmp_path, monkeypatch):
+    """Plusieurs fichiers ne sont acceptés que s'ils sont tous des images"""
+    monkeypatch.setattr(harpotab.Config, 'UPLOAD_FOLDER', tmp_path)
+    client = harpotab.create_app('testing').test_client()
+
+    response = client.post('/convert', data={
+        'file': [(io.BytesIO(b'%PDF'), 'score.pdf'), (io.BytesIO(b'img'), 'page2.png')]
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    assert not any(tmp_path.iterdir())
+
+
+def test_failed_page_reported_and_not_cached(tmp_path):
+    """Une page non lue est signalée et le résultat incomplet n'entre pas dans le cache"""
+    class FlakyBackend(FixtureBackend):
+        def read_partition(self, input_file, output_dir, **kwargs):
+            if input_file.name == 'page2.png':
+                return None
+            return super().read_partition(input_file, output_dir, **kwargs)
+
+    backend = FlakyBackend(FIXTURES_DIR / 'simple_score.musicxml')
+    cache = OCRCache(tmp_path / 'cache')
+    pages = []
+    for number in range(1, 4):
+        page = tmp_path / f"page{number}.png"
+        page.write_bytes(f"image {number}".encode())
+        pages.append(page)
+
+    score = backend.read_pages(pages, tmp_path / 'out', cache=cache)
+
+    assert score['failed_pages'] == [2]
+    assert cache.get(cache.make_key(pages[1], backend.cache_options())) is None
+    assert cache.get(cache.make_key(pages[0], backend.cache_options())) is not None
@@ -0,0 +1,192 @@
+"""
+Tests unitaires pour le module musicxml_parser (parsing en flux)
+"""
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from modules import musicxml_parser
+from modules.musicxml_parser import parse_musicxml, parse_musicxml_bytes, iter_measures
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+FIXTURE = FIXTURES_DIR / 'simple_score.musicxml'
+
+
+def create_mxl(xml_bytes, name='score.xml'):
+    """Crée une archive MXL en mémoire"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('META-INF/container.xml', '<container/>')
+        archive.writestr(name, xml_bytes)
+    return buffer.getvalue()
+
+
+def test_parse_fixture():
+    """Métadonnées, mesures et notes sont extraites"""
+    result = parse_musicxml(FIXTURE)
+
+    assert result['metadata'] == {
+        'title': 'Simple Score',
+        'composer': 'HarpoTab',
+        'key': {'fifths': 0, 'mode': 'major'},
+        'time_signature': '4/4',
+        'tempo': 100
+    }
+    measures = result['parts'][0]['measures']
+    assert [m['number'] for m in measures] == [1, 2, 3, 4]
+    assert measures[0]['notes'][0] == {
+        'type': 'note',
+        'pitch': {'step': 'C', 'octave': 4, 'alter': 0},
+        'duration': 1,
+        'note_type': 'quarter',
+        'voice': 1,
+        'onset': 0
+    }
+    assert measures[2]['notes'][-1]['type'] == 'rest'
+    assert [(m['start'], m['length']) for m in measures] == [(0, 4), (4, 4), (8, 4), (12, 4)]
+    assert result['parts'][0]['divisions'] == 1
+
+
+def test_mxl_parsed_like_xml():
+    """Une archive MXL décompressée en flux donne le même résultat"""
+    xml_bytes = FIXTURE.read_bytes()
+
+    from_xml = parse_musicxml_bytes(xml_bytes, 'score.xml')
+    from_mxl = parse_musicxml_bytes(create_mxl(xml_bytes), 'score.mxl')
+
+    assert from_mxl['metadata'] == from_xml['metadata']
+    assert from_mxl['parts'] == from_xml['parts']
+
+
+def test_first_metadata_occurrence_wins():
+    """Seule la première occurrence de chaque métadonnée est retenue"""
+    xml = b"""<?xml version="1.0"?>
+<score-partwise>
+  <identification>
+    <creator type="lyricist">Parolier</creator>
+    <creator type="composer">Compositeur</creator>
+  </identification>
+  <part id="P1">
+    <measure number="1">
+      <attributes><time><beats>3</beats><beat-type>4</beat-type></time></attributes>
+    </measure>
+    <measure number="2">
+      <attributes><time><beats>2</beats><beat-type>4</beat-type></time></attributes>
+    </measure>
+  </part>
+  <part id="P2"/>
+</score-partwise>"""
+
+    result = parse_musicxml_bytes(xml, 'score.xml')
+
+    assert result['metadata']['composer'] == 'Compositeur'
+    assert result['metadata']['time_signature'] == '3/4'
+    assert [part['id'] for part in result['parts']] == ['P1', 'P2']
+    assert result['parts'][1]['measures'] == []
+
+
+def test_iter_measures_streams():
+    """Les mesures sont émises au fil de la lecture, avec leur partie"""
+    metadata = {}
+    measures = iter_measures(FIXTURE, metadata)
+
+    part_id, first = next(measures)
+    assert part_id == 'P1'
+    assert first['number'] == 1
+    assert metadata['time_signature'] == '4/4'
+    assert len(list(measures)) == 3
+
+
+def test_invalid_xml_returns_none():
+    """Un XML invalide ne lève pas d'exception"""
+    assert parse_musicxml_bytes(b'not xml at all', 'invalid.xml') is None
+    assert parse_musicxml_bytes(b'PK\x03\x04 corrupted', 'invalid.mxl') is None
+
+
+@pytest.mark.skipif(musicxml_parser.lxml_etree is None, reason="lxml non installé")
+def test_lxml_backend_matches_etree(monkeypatch):
+    """lxml et xml.etree donnent le même résultat (accords, silences, altérations, voix)"""
+    xml = b"""<?xml version="1.0"?>
+<!DOCTYPE score-partwise PUBLIC "-//Recordare//DTD MusicXML 4.0 Partwise//EN"
+  "http://www.musicxml.org/dtds/partwise.dtd">
+<score-partwise>
+  <work><work-title>Accords</work-title></work>
+  <part id="P1">
+    <!-- commentaire -->
+    <measure number="1">
+      <attributes><divisions>2</divisions><key><fifths>-1</fifths></key></attributes>
+      <note><pitch><step>B</step><alter>-1</alter><octave>4</octave></pitch><duration>2</duration>
+        <voice>1</voice><type>quarter</type></note>
+      <note><chord/><pitch><step>D</step><octave>5</octave></pitch><duration>2</duration><type>quarter</type></note>
+      <note><rest/><duration>1</duration><voice>2</voice><type>eighth</type></note>
+      <note><grace/><pitch><step>F</step><alter>1</alter><octave>4</octave></pitch><type>eighth</type></note>
+    </measure>
+  </part>
+</score-partwise>"""
+
+    results = {}
+    for backend in ('etree', 'lxml'):
+        monkeypatch.setattr(musicxml_parser, 'XML_BACKEND', backend)
+        results[backend] = parse_musicxml_bytes(xml, 'score.xml')
+
+    assert results['lxml'] == results['etree']
+    assert results['lxml']['metadata']['title'] == 'Accords'
+    assert len(results['lxml']['parts'][0]['measures'][0]['notes']) == 4
+
+
+@pytest.mark.skipif(musicxml_parser.lxml_etree is None, reason="lxml non installé")
+@pytest.mark.parametrize('fixture', [FIXTURE, FIXTURES_DIR / 'timeline' / 'piano_score.musicxml'],
+                         ids=lambda path: path.name)
+def test_backends_parse_fixture_identically(monkeypatch, fixture):
+    """Une même partition lue avec chaque backend XML donne le même résultat"""
+    results = {}
+    for backend in ('etree', 'lxml'):
+        monkeypatch.setattr(musicxml_parser, 'XML_BACKEND', backend)
+        results[backend] = parse_musicxml(fixture)
+
+    assert results['etree'] is not None
+    assert results['lxml'] == results['etree']
+
+
+def test_timeline_resolves_chords_voices_and_ties():
+    """Accords, voix (backup/forward), liaisons et changement de divisions donnent des débuts absolus"""
+    part = parse_musicxml(FIXTURES_DIR / 'timeline' / 'piano_score.musicxml')['parts'][0]
+    first, second = part['measures']
+
+    assert part['divisions'] == 2
+    assert [(n['pitch']['step'], n['onset'], n['duration'], n['voice']) for n in first['notes']] == [
+        ('E', 0, 4, 1), ('C', 0, 4, 1), ('G', 4, 6, 1), ('C', 2, 6, 2)
+    ]
+    assert (first['start'], first['length'], second['start']) == (0, 8, 8)
+    assert [(n['type'], n['onset'], n['duration']) for n in second['notes']] == [('rest', 10, 6)]
+
+
+def test_mxl_rootfile_from_container():
+    """La partition d'une archive MXL est le rootfile MusicXML désigné par container.xml"""
+    xml_bytes = FIXTURE.read_bytes()
+    other = xml_bytes.replace(b'Simple Score', b'Autre partition')
+    container = b"""<?xml version="1.0" encoding="UTF-8"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="score.pdf" media-type="application/pdf"/>
+    <rootfile full-path="scores/main.musicxml" media-type="application/vnd.recordare.musicxml+xml"/>
+  </rootfiles>
+</container>"""
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('META-INF/container.xml', container)
+        archive.writestr('aaa.xml', other)
+        archive.writestr('score.pdf', b'%PDF')
+        archive.writestr('scores/main.musicxml', xml_bytes)
+
+    assert parse_musicxml_bytes(buffer.getvalue(), 'score.mxl')['metadata']['title'] == 'Simple Score'
+
+    # Rootfile absent de l'archive: premier fichier MusicXML hors META-INF
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('META-INF/container.xml', container.replace(b'scores/main', b'missing'))
+        archive.writestr('aaa.xml', other)
+    assert parse_musicxml_bytes(buffer.getvalue(), 'score.mxl')['metadata']['title'] == 'Autre partition'
@@ -0,0 +1,36 @@
+"""
+Tests de la lecture directe des uploads MusicXML (sans OCR)
+"""
+import shutil
+from pathlib import Path
+
+import app as harpotab
+from modules.progress_tracker import ProgressTracker
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'simple_score.musicxml'
+
+
+def test_musicxml_extensions_accepted():
+    """Les extensions MusicXML sont acceptées et reconnues comme telles"""
+    for name in ('score.mxl', 'score.xml', 'score.MusicXML'):
+        assert harpotab.allowed_file(name)
+        assert harpotab.is_musicxml_file(name)
+    assert not harpotab.is_musicxml_file('score.pdf')
+
+
+def test_musicxml_upload_skips_ocr(tmp_path, monkeypatch):
+    """Un MusicXML est lu directement: aucune étape OCR, aucun appel au backend"""
+    def no_ocr():
+        raise AssertionError("L'OCR ne doit pas être appelé")
+
+    monkeypatch.setattr(harpotab, 'get_ocr_backend', no_ocr)
+    monkeypatch.setattr(harpotab, 'get_parse_cache', lambda: None)
+    upload = shutil.copy(FIXTURE, tmp_path / 'score.musicxml')
+    tracker = ProgressTracker('session', ProgressTracker.MUSICXML_PIPELINE_STEPS)
+
+    harpotab.process_conversion(Path(upload), 'diatonic', 'C', tmp_path, tracker)
+
+    steps = {step['id']: step for step in tracker.get_status()['steps']}
+    assert 'ocr' not in steps
+    assert steps['musicxml']['status'] == 'completed'
+    assert steps['melody']['status'] == 'completed'
@@ -0,0 +1,85 @@
+"""
+Tests de la représentation en colonnes des mélodies
+"""
+import sys
+from pathlib import Path
+
+from modules.harmonica_mapper import HarmonicaMapper
+from modules.melody_extractor import extract_melody_from_musicxml
+from modules.music_analyzer import analyze_music
+from modules.musicxml_parser import parse_musicxml
+from modules.note_columns import NoteColumns
+from modules.transposer import Transposer
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+MAPS_DIR = Path(__file__).parent.parent / 'data' / 'harmonica_maps'
+
+
+def create_notes(count):
+    """Mélodie avec silences et altérations, au format de MelodyExtractor"""
+    notes = []
+    for i in range(count):
+        if i % 7 == 6:
+            notes.append({'type': 'rest', 'duration': 2, 'note_type': 'eighth', 'measure': i // 4 + 1, 'time': i * 4})
+            continue
+        step, alter, midi = [('C', 0, 60), ('D', 0, 62), ('F', 1, 66), ('G', 0, 67), ('B', -1, 70), ('A', 0, 57)][i % 6]
+        notes.append({
+            'type': 'note', 'pitch': step, 'octave': 4 if midi >= 60 else 3, 'alter': alter,
+            'duration': 4, 'note_type': 'quarter', 'measure': i // 4 + 1, 'time': i * 4, 'midi': midi
+        })
+    return notes
+
+
+def test_extracted_melody_is_columnar():
+    """La mélodie extraite est en colonnes et se lit comme la liste de notes habituelle"""
+    melody = extract_melody_from_musicxml(parse_musicxml(FIXTURES_DIR / 'simple_score.musicxml'))
+    notes = melody['notes']
+
+    assert isinstance(notes, NoteColumns)
+    assert notes.part_ids[notes.part[0]] == melody['part_id']
+    assert notes.to_list() == NoteColumns.from_notes(notes).to_list()
+    assert notes[-1] == notes[len(notes) - 1]
+    assert all(set(note) == {'type', 'pitch', 'octave', 'alter', 'duration', 'note_type', 'measure', 'time', 'midi'}
+               for note in notes if note['type'] == 'note')
+
+
+def test_columns_use_less_memory():
+    """Une note en colonnes occupe un ordre de grandeur de moins qu'un dictionnaire"""
+    notes = create_notes(1000)
+    columns = NoteColumns.from_notes(notes)
+
+    assert columns.to_list() == notes
+    assert columns.nbytes * 10 <= sum(sys.getsizeof(note) for note in notes)
+
+
+def test_columns_match_dict_pipeline():
+    """Transposition, jouabilité, analyse et tablature donnent le même résultat qu'avec des dictionnaires"""
+    notes = create_notes(50)
+    columns = NoteColumns.from_notes(notes)
+    transposer = Transposer()
+    harmonica = HarmonicaMapper('diatonic', 'C', MAPS_DIR)
+
+    transposed = transposer.transpose_melody(columns, 5)
+    assert transposed.to_list() == transposer.transpose_melody(notes, 5)
+    assert transposed.onset is columns.onset
+    assert columns.to_list() == notes
+
+    for melody in (notes, transposer.transpose_melody(notes, -2)):
+        as_columns = NoteColumns.from_notes(melody)
+        assert transposer.check_playability(as_columns, harmonica.mapping) == \
+            transposer.check_playability(melody, harmonica.mapping)
+        assert analyze_music(as_columns) == analyze_music(melody)
+        assert harmonica.map_melody_to_tabs(as_columns) == HarmonicaMapper(
+            'diatonic', 'C', MAPS_DIR).map_melody_to_tabs(melody)
+
+    assert transposer.find_best_transposition({'notes': columns}, harmonica.mapping) == \
+        transposer.find_best_transposition({'notes': notes}, harmonica.mapping)
+
+
+def test_columns_accept_high_voice_numbers():
+    """Une voix MusicXML au-delà de 127 (<voice>200</voice>) est conservée"""
+    columns = NoteColumns()
+    columns.add_note(60, 0, 4, 'quarter', 1, 'C', 4, voice=200)
+    columns.add_rest(4, 4, 'quarter', 1, voice=300)
+
+    assert list(columns.voice) == [200, 300]
@@ -0,0 +1,100 @@
+"""
+Tests unitaires pour le module ocr_backends (backend fixture, registre)
+"""
+import time
+from pathlib import Path
+
+import pytest
+from modules.ocr_backends import (
+    OCRBackend, CLIBackend, FixtureBackend, create_backend, register_backend, available_backends
+)
+from modules.ocr_cache import OCRCache
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+def test_create_backend_by_name():
+    """Les backends sont créés à partir de leur nom"""
+    assert {'cli', 'http', 'fixture'} <= set(available_backends())
+    assert isinstance(create_backend('cli', dpi=200), CLIBackend)
+    assert isinstance(create_backend('fixture', fixture_path=FIXTURES_DIR), FixtureBackend)
+
+    with pytest.raises(ValueError):
+        create_backend('inconnu')
+
+
+def test_register_custom_backend(tmp_path):
+    """Un backend supplémentaire peut être enregistré"""
+    class StaticBackend(OCRBackend):
+        name = 'static'
+
+        def read_partition(self, input_file, output_dir):
+            return {'metadata': {}, 'parts': [], 'source_file': None}
+
+    register_backend('static', StaticBackend)
+    assert create_backend('static').read(tmp_path / 'score.pdf', tmp_path)['parts'] == []
+
+
+def test_fixture_backend_serves_musicxml(tmp_path):
+    """Le backend fixture parse le MusicXML enregistré après la latence simulée"""
+    backend = FixtureBackend(FIXTURES_DIR, latency=0.05)
+
+    start = time.perf_counter()
+    result = backend.read_partition(tmp_path / 'upload.pdf', tmp_path)
+
+    assert time.perf_counter() - start >= 0.05
+    assert result['metadata']['title'] == 'Simple Score'
+    assert result['metadata']['time_signature'] == '4/4'
+    assert len(result['parts'][0]['measures']) == 4
+
+
+def test_fixture_backend_selects_by_name(tmp_path):
+    """Le fichier portant le nom de l'upload est servi en priorité"""
+    (tmp_path / 'fixtures').mkdir()
+    for name in ('a', 'b'):
+        source = (FIXTURES_DIR / 'simple_score.musicxml').read_text()
+        (tmp_path / 'fixtures' / f'{name}.xml').write_text(source.replace('Simple Score', name))
+
+    backend = FixtureBackend(tmp_path / 'fixtures')
+    assert backend.read_partition(Path('b.pdf'), tmp_path)['metadata']['title'] == 'b'
+    assert backend.read_partition(Path('b.png'), tmp_path)['metadata']['title'] == 'b'
+
+
+def test_fixture_backend_missing_path(tmp_path):
+    """Un dossier sans MusicXML est refusé"""
+    with pytest.raises(FileNotFoundError):
+        FixtureBackend(tmp_path)
+
+
+def test_fixture_results_kept_apart_in_cache(tmp_path):
+    """Les résultats du backend fixture ne partagent pas les clés du vrai OCR"""
+    upload = tmp_path / 'score.pdf'
+    upload.write_bytes(b'%PDF-1.4 fake score')
+    cache = OCRCache(tmp_path / 'cache')
+
+    backend = FixtureBackend(FIXTURES_DIR)
+    assert backend.read(upload, tmp_path, cache) is not None
+    assert cache.get(cache.make_key(upload, backend.cache_options())) is not None
+    assert cache.get(cache.make_key(upload)) is None
+
+
+def test_relayed_upload_served_from_cache(tmp_path):
+    """Un upload relayé déjà en cache (même empreinte) n'attend pas le service: son travail est annulé"""
+    class Upload:
+        digest = 'a' * 64
+        cancelled = False
+
+        def result(self, progress=None, cancel_event=None, deadline=None):
+            return {'metadata': {'title': 'OCR'}, 'parts': [], 'source_file': None}
+
+        def cancel(self):
+            self.cancelled = True
+
+    cache = OCRCache(tmp_path / 'cache')
+    backend = FixtureBackend(FIXTURES_DIR)
+    first, second = Upload(), Upload()
+    second.result = None  # le service ne doit pas être attendu
+
+    assert backend.read_uploads([first], cache)['metadata']['title'] == 'OCR'
+    assert backend.read_uploads([second], cache)['metadata']['title'] == 'OCR'
+    assert second.cancelled and cache.hits == 1
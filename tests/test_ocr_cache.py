@@ -0,0 +1,111 @@
+"""
+Tests unitaires pour le module ocr_cache
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from modules.ocr_cache import OCRCache, read_with_cache
+
+
+def create_test_result(source_file=None):
+    """Crée un résultat OCR minimal"""
+    return {
+        'metadata': {'title': 'Test', 'time_signature': '4/4'},
+        'parts': [{'id': 'P1', 'measures': [{'number': 1, 'notes': []}]}],
+        'source_file': str(source_file) if source_file else None
+    }
+
+
+@pytest.fixture
+def upload(tmp_path):
+    """Fichier uploadé factice"""
+    path = tmp_path / 'score.pdf'
+    path.write_bytes(b'%PDF-1.4 fake score')
+    return path
+
+
+def test_cache_miss_then_hit(tmp_path, upload):
+    """Un résultat stocké est retrouvé avec la même clé"""
+    cache = OCRCache(tmp_path / 'cache', audiveris_version='5.9.0')
+    key = cache.make_key(upload)
+
+    assert cache.get(key) is None
+
+    mxl = tmp_path / 'score.mxl'
+    mxl.write_bytes(b'PK fake mxl')
+    stored = cache.put(key, create_test_result(mxl), mxl)
+
+    result = cache.get(key)
+    assert result['metadata']['title'] == 'Test'
+    assert result['source_file'] == stored['source_file']
+    assert (tmp_path / 'cache' / key / 'score.mxl').exists()
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+
+def test_cache_key_depends_on_version_and_options(tmp_path, upload):
+    """La version d'Audiveris et les options font partie de la clé"""
+    cache_a = OCRCache(tmp_path / 'a', audiveris_version='5.9.0')
+    cache_b = OCRCache(tmp_path / 'b', audiveris_version='5.10.0')
+
+    assert cache_a.make_key(upload) != cache_b.make_key(upload)
+    assert cache_a.make_key(upload) != cache_a.make_key(upload, {'dpi': 300})
+    assert cache_a.make_key(upload, {'dpi': 300}) == cache_a.make_key(upload, {'dpi': 300})
+
+
+def test_cache_lru_eviction(tmp_path):
+    """Les entrées les moins récemment utilisées sont évincées"""
+    cache = OCRCache(tmp_path / 'cache', max_size=10 ** 9)
+    cache.put('a', create_test_result())
+    entry_size = cache.total_size
+    cache.max_size = entry_size * 2
+
+    cache.put('b', create_test_result())
+    cache.get('a')  # 'a' devient la plus récente
+    cache.put('c', create_test_result())
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert not (tmp_path / 'cache' / 'b').exists()
+
+
+def test_cache_index_reloaded_from_disk(tmp_path):
+    """Un nouveau cache retrouve les entrées existantes"""
+    OCRCache(tmp_path / 'cache').put('a', create_test_result())
+
+    cache = OCRCache(tmp_path / 'cache')
+    assert cache.get('a') is not None
+
+
+def test_read_with_cache_runs_ocr_once(tmp_path, upload):
+    """L'OCR n'est exécuté qu'au premier appel"""
+    cache = OCRCache(tmp_path / 'cache')
+    calls = []
+
+    def fake_ocr():
+        calls.append(1)
+        return create_test_result()
+
+    first = read_with_cache(cache, upload, fake_ocr)
+    second = read_with_cache(cache, upload, fake_ocr)
+
+    assert len(calls) == 1
+    assert first['parts'] == second['parts']
+
+
+def test_cache_concurrent_puts_same_key(tmp_path):
+    """Des écritures simultanées d'une même clé, ou d'une entrée non indexée, aboutissent"""
+    cache = OCRCache(tmp_path / 'cache')
+    (tmp_path / 'cache' / 'a').mkdir()
+    (tmp_path / 'cache' / 'a' / 'stale.json').write_text('{}')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: cache.put('a', create_test_result()), range(16)))
+
+    assert cache.get('a')['metadata']['title'] == 'Test'
+    assert [path.name for path in (tmp_path / 'cache').iterdir()] == ['a']
+    assert not (tmp_path / 'cache' / 'a' / 'stale.json').exists()
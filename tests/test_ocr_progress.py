@@ -0,0 +1,117 @@
+"""
+Tests unitaires pour le suivi de progression et l'annulation de l'OCR
+"""
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from modules.ocr_progress import AudiverisLogParser, CombinedProgress, OCRCancelledError
+from modules.ocr_reader import AudiverisOCR
+from modules.progress_tracker import ProgressTracker
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'simple_score.musicxml'
+
+# Extrait du log d'Audiveris pour un livre de deux feuilles
+AUDIVERIS_LOG = """\
+INFO  [score] Book  loaded 2 sheets
+INFO  [score#1] 1 LOAD      duration 0.2 s
+INFO  [score#1] 1 BINARY    duration 0.4 s
+INFO  [score#1] 1 RHYTHMS   duration 0.1 s
+INFO  [score#1] 1 PAGE      duration 0.1 s
+INFO  [score#2] 2 LOAD      duration 0.2 s
+INFO  [score#2] 2 PAGE      duration 0.1 s
+INFO  [score] Exporting score to score.mxl
+"""
+
+
+def fake_audiveris(tmp_path, sleep=0.0):
+    """Script imitant Audiveris: journalise ses étapes puis écrit le MusicXML"""
+    script = tmp_path / 'audiveris'
+    script.write_text(f"""#!/bin/sh
+out=$4; name=$(basename "$5"); name=${{name%.*}}
+echo "INFO  [$name#1] 1 LOAD      duration 0.1 s"
+sleep {sleep}
+echo "INFO  [$name#1] 1 HEADS     duration 0.1 s"
+echo "INFO  [$name#1] 1 PAGE      duration 0.1 s"
+echo "INFO  [$name] Exporting score"
+cp {FIXTURE} "$out/$name.xml"
+""")
+    script.chmod(0o755)
+    return script
+
+
+def test_log_parser_reports_sheets_and_steps():
+    """Chaque étape d'une feuille fait avancer la progression, jamais reculer"""
+    parser = AudiverisLogParser()
+    events = [event for event in map(parser.feed, AUDIVERIS_LOG.splitlines()) if event]
+
+    percents = [percent for percent, _ in events]
+    assert percents == sorted(percents) and len(set(percents)) == len(percents)
+    assert events[0][1] == "Page 1/2 : Chargement de l'image"
+    assert events[-2] == (90, "Page 2/2 : Assemblage de la page")
+    assert events[-1] == (95, "Export MusicXML")
+
+
+def test_combined_progress_averages_pages():
+    """La progression de plusieurs pages est la moyenne des pages"""
+    received = []
+    combined = CombinedProgress(2, lambda percent, message: received.append((percent, message)))
+
+    combined.for_page(0)(100, "Partition lue")
+    combined.for_page(1)(50, "Binarisation")
+
+    assert received[-1] == (75, "1/2 pages lues - page 2 : Binarisation")
+    assert CombinedProgress(2, None).for_page(0) is None
+
+
+def test_tracker_substep_progress_and_cancel():
+    """L'avancement partiel d'une sous-étape remonte à l'étape et au global"""
+    tracker = ProgressTracker('session')
+    tracker.complete_substep('ocr', 'ocr_init')
+    tracker.update_substep('ocr', 'ocr_process', 50, "Page 1/2")
+
+    status = tracker.get_status()
+    ocr = status['steps'][0]
+    assert ocr['progress'] == 50
+    assert ocr['substeps'][1] == {'id': 'ocr_process', 'name': 'Analyse de la partition',
+                                  'status': 'in_progress', 'progress': 50, 'message': 'Page 1/2'}
+    assert status['overall_progress'] == 50 // len(ProgressTracker.PIPELINE_STEPS)
+    assert not status['cancelled']
+
+    tracker.cancel()
+    assert tracker.is_cancelled and tracker.get_status()['cancelled']
+
+
+@pytest.mark.skipif(shutil.which('sh') is None, reason="shell indisponible")
+def test_read_partition_streams_progress(tmp_path):
+    """Le log d'Audiveris est converti en progression pendant l'exécution"""
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'fake image')
+    events = []
+
+    ocr = AudiverisOCR(str(fake_audiveris(tmp_path)))
+    result = ocr.read_partition(upload, tmp_path / 'out', progress=lambda *event: events.append(event))
+
+    assert result['metadata']['title'] == 'Simple Score'
+    assert [message for _, message in events] == [
+        "Chargement de l'image", "Détection des notes", "Assemblage de la page", "Export MusicXML", "Partition lue"
+    ]
+    assert events[-1][0] == 100
+
+
+@pytest.mark.skipif(shutil.which('sh') is None, reason="shell indisponible")
+def test_read_partition_killed_on_cancel(tmp_path):
+    """Déclencher l'annulation tue Audiveris sans attendre la fin de l'OCR"""
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'fake image')
+    cancel_event = threading.Event()
+
+    ocr = AudiverisOCR(str(fake_audiveris(tmp_path, sleep=30)))
+    threading.Timer(0.3, cancel_event.set).start()
+
+    start = time.monotonic()
+    with pytest.raises(OCRCancelledError):
+        ocr.read_partition(upload, tmp_path / 'out', cancel_event=cancel_event)
+    assert time.monotonic() - start < 5
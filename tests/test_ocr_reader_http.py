@@ -0,0 +1,325 @@
+"""
+Tests unitaires pour le module ocr_reader_http (sans service Audiveris réel)
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+from modules.ocr_reader_http import AudiverisHTTPClient, CircuitBreaker, CircuitOpenError
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'simple_score.musicxml'
+
+
+class StubAudiverisHandler(BaseHTTPRequestHandler):
+    """Service Audiveris factice: /health, POST /jobs, GET et DELETE /jobs/<id>"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        if self.path == '/health':
+            status = 200 if stub['healthy'] else 503
+            self._send(status, json.dumps({'status': 'ok'}).encode())
+            return
+        if stub['drop_polls']:
+            # Connexion coupée sans réponse pendant le suivi du travail
+            self.close_connection = True
+            return
+        time.sleep(stub['delay'])
+        self._send(200, FIXTURE.read_bytes(), 'application/vnd.recordare.musicxml+xml',
+                   {'X-Output-File': 'score.xml'})
+
+    def _read_body(self):
+        """Corps de la requête et indicateur de corps complet (False si le client a coupé l'envoi)"""
+        if self.headers.get('Transfer-Encoding') != 'chunked':
+            return self.rfile.read(int(self.headers['Content-Length'])), True
+        body = b''
+        while True:
+            try:
+                size = int(self.rfile.readline().strip(), 16)
+            except ValueError:
+                # Ligne de taille vide ou invalide: envoi interrompu
+                return body, False
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            if size == 0:
+                return body, True
+
+    def do_POST(self):
+        stub = self.server.stub
+        body, complete = self._read_body()
+        stub['bodies'].append(body)
+        if not complete:
+            self.close_connection = True
+            return
+        time.sleep(stub['submit_delay'])
+        with stub['lock']:
+            if stub['busy'] > 0:
+                stub['busy'] -= 1
+                self._send(429, json.dumps({'error': 'queue full'}).encode(), headers={'Retry-After': '0.2'})
+                return
+            stub['jobs'] += 1
+        self._send(202, json.dumps({'job_id': uuid.uuid4().hex, 'status': 'queued'}).encode())
+
+    def do_DELETE(self):
+        self.server.stub['cancelled'].append(self.path.rsplit('/', 1)[-1])
+        self._send(200, json.dumps({'status': 'cancelled'}).encode())
+
+
+@pytest.fixture
+def stub_services():
+    """Démarre des services Audiveris factices; retourne une fonction de création"""
+    servers = []
+
+    def start(delay=0.0, healthy=True):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubAudiverisHandler)
+        server.stub = {'delay': delay, 'healthy': healthy, 'busy': 0, 'jobs': 0, 'bodies': [],
+                       'submit_delay': 0.0, 'drop_polls': False, 'cancelled': [], 'lock': threading.Lock()}
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def upload(tmp_path):
+    """Fichier uploadé factice"""
+    path = tmp_path / 'score.pdf'
+    path.write_bytes(b'%PDF-1.4 fake score')
+    return path
+
+
+def test_circuit_breaker_opens_after_threshold():
+    """Le circuit s'ouvre après N échecs consécutifs"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_circuit_breaker_half_open_trial():
+    """Après le délai, un seul appel d'essai est autorisé; son succès referme le circuit"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_client_fails_fast_when_service_down():
+    """Un service injoignable ouvre le circuit et les appels suivants échouent sans réseau"""
+    client = AudiverisHTTPClient(service_url='http://127.0.0.1:9', check_service=False)
+    endpoint = client.endpoints[0]
+    endpoint.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client.session = requests.Session()  # pas de relance: test rapide
+
+    assert not client.is_healthy()
+    with pytest.raises(CircuitOpenError):
+        client._request(endpoint, 'GET', '/health', timeout=1)
+
+
+def test_client_health_is_cached():
+    """L'état de santé n'est pas re-vérifié avant expiration du TTL"""
+    client = AudiverisHTTPClient(service_url='http://127.0.0.1:9', check_service=False)
+    client.endpoints[0].health = (True, time.monotonic())
+
+    assert client.is_healthy()
+
+
+def test_jobs_spread_across_services(stub_services, upload, tmp_path):
+    """Les travaux simultanés sont répartis sur les instances (moins de travaux en cours)"""
+    servers = [stub_services(delay=0.3) for _ in range(3)]
+    client = AudiverisHTTPClient(service_url=','.join(url(server) for server in servers))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.read_partition(upload, tmp_path)))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 6 and all(result['metadata']['title'] == 'Simple Score' for result in results)
+    assert [server.stub['jobs'] for server in servers] == [2, 2, 2]
+    assert all(stats['outstanding'] == 0 for stats in client.get_stats())
+
+
+def test_failing_service_ejected_then_reinstated(stub_services, upload, tmp_path):
+    """Une instance en échec de santé est écartée puis réintégrée une fois rétablie"""
+    healthy, sick = stub_services(), stub_services(healthy=False)
+    client = AudiverisHTTPClient(service_url=[url(healthy), url(sick)])
+    client.HEALTH_TTL = 0.1
+
+    for _ in range(3):
+        assert client.read_partition(upload, tmp_path) is not None
+    assert (healthy.stub['jobs'], sick.stub['jobs']) == (3, 0)
+
+    sick.stub['healthy'] = True
+    time.sleep(0.15)
+    for _ in range(4):
+        assert client.read_partition(upload, tmp_path) is not None
+    assert sick.stub['jobs'] > 0
+
+
+def test_unreachable_service_falls_back(stub_services, upload, tmp_path):
+    """Si l'instance choisie est injoignable, le travail passe sur une autre"""
+    server = stub_services()
+    client = AudiverisHTTPClient(service_url=f"http://127.0.0.1:9,{url(server)}", check_service=False)
+    client.endpoints[0].health = (True, time.monotonic())  # panne non encore détectée
+
+    for _ in range(2):
+        assert client.read_partition(upload, tmp_path) is not None
+    assert server.stub['jobs'] == 2
+    assert client.get_stats()[0]['healthy'] is False
+
+
+def test_lost_poll_cancels_job_without_resubmitting(stub_services, upload, tmp_path):
+    """Une connexion perdue pendant le suivi annule le travail au lieu de le soumettre ailleurs"""
+    servers = [stub_services(), stub_services()]
+    for server in servers:
+        server.stub['drop_polls'] = True
+    client = AudiverisHTTPClient(service_url=[url(server) for server in servers])
+    client.session = requests.Session()  # pas de relance: test rapide
+
+    assert client.read_partition(upload, tmp_path) is None
+
+    assert sum(server.stub['jobs'] for server in servers) == 1
+    assert sum(len(server.stub['cancelled']) for server in servers) == 1
+    assert all(stats['outstanding'] == 0 for stats in client.get_stats())
+
+
+def test_busy_service_retried_after_delay(stub_services, upload, tmp_path):
+    """Un service saturé (429) est réessayé après le délai Retry-After"""
+    server = stub_services()
+    server.stub['busy'] = 2
+    client = AudiverisHTTPClient(service_url=url(server))
+
+    start = time.monotonic()
+    assert client.read_partition(upload, tmp_path) is not None
+    assert time.monotonic() - start >= 0.4
+    assert server.stub['jobs'] == 1
+
+
+def test_busy_service_skipped_for_idle_one(stub_services, upload, tmp_path):
+    """Un travail refusé par une instance saturée part aussitôt sur une autre"""
+    busy, idle = stub_services(), stub_services()
+    busy.stub['busy'] = 10
+    client = AudiverisHTTPClient(service_url=[url(busy), url(idle)])
+
+    for _ in range(3):
+        assert client.read_partition(upload, tmp_path) is not None
+    assert (busy.stub['jobs'], idle.stub['jobs']) == (0, 3)
+
+
+def test_upload_relayed_while_received(stub_services):
+    """Un upload relayé est envoyé au service en flux, haché au passage, sans fichier local"""
+    server = stub_services()
+    client = AudiverisHTTPClient(service_url=url(server))
+    chunks = [bytes([n]) * 70000 for n in range(40)]
+
+    relay = client.start_upload('score.pdf')
+    for chunk in chunks:
+        relay.write(chunk)
+    relay.seek(0)
+
+    assert relay.wait() is not None
+    assert server.stub['bodies'] == [b''.join(chunks)]
+    assert relay.digest == hashlib.sha256(b''.join(chunks)).hexdigest()
+    assert client.get_stats()[0]['outstanding'] == 1
+    assert relay.result()['metadata']['title'] == 'Simple Score'
+    assert client.get_stats()[0]['outstanding'] == 0
+
+
+def test_refused_upload_stops_relaying(stub_services):
+    """Un upload refusé par le service (429) n'est pas retenté et la réception continue"""
+    server = stub_services()
+    server.stub['busy'] = 5
+    client = AudiverisHTTPClient(service_url=url(server))
+
+    relay = client.start_upload('score.pdf')
+    for _ in range(100):
+        relay.write(b'x' * 65536)
+    relay.seek(0)
+
+    assert relay.wait() is None and relay.result() is None
+    assert server.stub['busy'] == 4
+    assert client.get_stats()[0]['outstanding'] == 0
+
+
+def test_interrupted_upload_releases_endpoint(stub_services):
+    """Un upload interrompu coupe l'envoi: rien n'est soumis et l'instance est libérée"""
+    server = stub_services()
+    client = AudiverisHTTPClient(service_url=url(server))
+
+    relay = client.start_upload('score.pdf')
+    relay.write(b'x' * 65536)
+    while not relay._chunks.empty():
+        time.sleep(0.01)
+    time.sleep(0.2)
+    relay.abort()
+    relay._thread.join(5)
+
+    assert not relay._thread.is_alive()
+    assert relay.wait() is None
+    for _ in range(50):
+        if server.stub['bodies']:
+            break
+        time.sleep(0.05)
+    # Le service a reçu le début du fichier puis la coupure, sans créer de travail
+    assert server.stub['bodies'] == [b'x' * 65536]
+    assert server.stub['jobs'] == 0
+    assert client.get_stats()[0]['outstanding'] == 0
+
+
+def test_late_submission_cancelled(stub_services):
+    """Un travail accepté après l'abandon de l'attente par wait() est annulé"""
+    server = stub_services()
+    server.stub['submit_delay'] = 0.5
+    client = AudiverisHTTPClient(service_url=url(server))
+
+    relay = client.start_upload('score.pdf')
+    relay.SUBMIT_TIMEOUT = 0.1
+    relay.write(b'x' * 65536)
+    relay.seek(0)
+
+    assert relay.wait() is None
+    relay._thread.join(5)
+    assert server.stub['jobs'] == 1 and len(server.stub['cancelled']) == 1
+    assert relay.wait() is None
+    assert client.get_stats()[0]['outstanding'] == 0
@@ -0,0 +1,71 @@
+"""
+Tests unitaires pour le stockage des projets .omr et le ré-export
+"""
+import shutil
+from pathlib import Path
+
+import pytest
+from modules.ocr_reader import AudiverisOCR
+from modules.omr_store import BookStore
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'simple_score.musicxml'
+
+
+def fake_audiveris(tmp_path):
+    """Script imitant Audiveris: note ses entrées, exporte le MusicXML et sauvegarde le projet (-save)"""
+    script = tmp_path / 'audiveris'
+    script.write_text(f"""#!/bin/sh
+save=0
+while [ $# -gt 1 ]; do
+  case "$1" in -save) save=1;; -output) shift; out=$1;; esac
+  shift
+done
+name=$(basename "$1"); name=${{name%.*}}
+echo "$1" >> {tmp_path / 'calls.log'}
+cp {FIXTURE} "$out/$name.xml"
+if [ $save = 1 ]; then echo book > "$out/$name.omr"; fi
+""")
+    script.chmod(0o755)
+    return script
+
+
+def test_book_store_lru(tmp_path):
+    """Les projets sont retrouvés par clé et les moins récents évincés"""
+    book = tmp_path / 'score.omr'
+    book.write_bytes(b'x' * 100)
+    store = BookStore(tmp_path / 'books', max_size=250)
+
+    for key in ('a', 'b', 'c'):
+        store.put(key, book)
+
+    assert store.get('a') is None
+    assert store.get('c').read_bytes() == book.read_bytes()
+    assert BookStore(tmp_path / 'books', max_size=250).get_stats()['books'] == 2
+
+
+def test_book_key_depends_on_content_and_version(tmp_path):
+    """La clé change avec le contenu, la version d'Audiveris et les options"""
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'image')
+    store = BookStore(tmp_path / 'books', audiveris_version='5.9.0')
+
+    key = store.make_key(upload)
+    assert key == store.make_key(upload)
+    assert key != BookStore(tmp_path / 'books', audiveris_version='5.10.0').make_key(upload)
+    assert key != store.make_key(upload, {'preprocess': 300})
+
+
+@pytest.mark.skipif(shutil.which('sh') is None, reason="shell indisponible")
+def test_second_read_reexports_book(tmp_path):
+    """Une partition déjà transcrite est ré-exportée depuis son projet .omr"""
+    upload = tmp_path / 'score.png'
+    upload.write_bytes(b'fake image')
+    ocr = AudiverisOCR(str(fake_audiveris(tmp_path)), book_store=BookStore(tmp_path / 'books'))
+
+    first = ocr.read_partition(upload, tmp_path / 'run1')
+    second = ocr.read_partition(upload, tmp_path / 'run2')
+
+    calls = (tmp_path / 'calls.log').read_text().split()
+    assert calls == [str(upload), str(tmp_path / 'run2' / 'score.omr')]
+    assert first['parts'] == second['parts']
+    assert ocr.book_store.get_stats()['hits'] == 1
@@ -0,0 +1,98 @@
+"""
+Tests unitaires pour le module parse_cache
+"""
+import shutil
+import zipfile
+from pathlib import Path
+
+from modules import parse_cache
+from modules.melody_extractor import read_main_part
+from modules.musicxml_parser import parse_musicxml
+from modules.parse_cache import ParseCache, dump_score, load_score, parse_with_cache
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+def create_mxl(tmp_path):
+    """Archive MXL de la partition de piano (accords, voix, liaisons)"""
+    mxl = tmp_path / 'piano.mxl'
+    with zipfile.ZipFile(mxl, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(FIXTURES_DIR / 'timeline' / 'piano_score.musicxml', 'piano.xml')
+    return mxl
+
+
+def test_binary_roundtrip(tmp_path):
+    """Une partition relue est identique à celle du parser"""
+    for source in (FIXTURES_DIR / 'simple_score.musicxml', create_mxl(tmp_path)):
+        score = parse_musicxml(source)
+        score['parts'][0]['measures'][0]['notes'].append({'type': 'note', 'duration': 1, 'voice': 1, 'onset': 0})
+
+        dump_score(score, tmp_path / 'score.bin')
+
+        assert load_score(tmp_path / 'score.bin') == score
+
+
+def test_cache_hit_skips_parsing(tmp_path):
+    """Un même contenu est relu depuis le cache, sous le nom du nouveau fichier"""
+    cache = ParseCache(tmp_path / 'cache')
+    first = create_mxl(tmp_path)
+    second = shutil.copy(first, tmp_path / 'again.mxl')
+
+    parsed = read_main_part(first, cache=cache)
+    cached = parse_with_cache(cache, second, lambda: None, variant='main_part')
+
+    assert cached == dict(parsed, source_file=str(second))
+    assert cache.get_stats()['hits'] == 1
+    # Autre lecture du même fichier: autre entrée
+    assert parse_with_cache(cache, second, lambda: None) is None
+
+
+def test_stale_entries_invalidated(tmp_path, monkeypatch):
+    """Les entrées d'une autre version du parser sont ignorées puis supprimées"""
+    cache = ParseCache(tmp_path / 'cache')
+    score = FIXTURES_DIR / 'simple_score.musicxml'
+    key = cache.make_key(score)
+    assert cache.put(key, parse_musicxml(score))
+    (cache.entries_dir / f".{key}.tmp").write_bytes(b'interrupted')
+
+    monkeypatch.setattr(parse_cache, 'PARSER_VERSION', parse_cache.PARSER_VERSION + 1)
+    upgraded = ParseCache(tmp_path / 'cache')
+
+    assert upgraded.get(key) is None
+    assert [path.name for path in (tmp_path / 'cache').iterdir()] == [upgraded.entries_dir.name]
+
+    # Entrée corrompue: écartée à la lecture
+    entry = upgraded.entries_dir / f"{key}.score"
+    entry.write_bytes(b'HTPS garbage')
+    reloaded = ParseCache(tmp_path / 'cache')
+    assert reloaded.get_stats()['entries'] == 1
+    assert reloaded.get(key) is None
+    assert not entry.exists()
+    assert reloaded.get_stats()['size'] == 0
+
+
+def test_unexpected_structure_not_cached(tmp_path):
+    """Une partition qui ne suit pas la structure du parser n'est pas mise en cache"""
+    cache = ParseCache(tmp_path / 'cache')
+    score = parse_musicxml(FIXTURES_DIR / 'simple_score.musicxml')
+    score['parts'][0]['measures'][0]['notes'][0]['lyrics'] = 'la'
+
+    assert not cache.put('key', score)
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_failed_read_keeps_rewritten_entry(tmp_path):
+    """Une lecture ratée n'écarte pas l'entrée réécrite pendant cette lecture"""
+    cache = ParseCache(tmp_path / 'cache')
+    source = FIXTURES_DIR / 'simple_score.musicxml'
+    key = cache.make_key(source)
+    score = parse_musicxml(source)
+    cache.put(key, score)
+
+    entry, serial = cache._lookup(key)
+    cache.put(key, score)  # réécrite par un autre thread pendant la lecture
+    cache._discard(key, serial, ValueError("lecture interrompue"))
+
+    assert entry.exists()
+    assert cache.get(key) == score
+    assert cache.get_stats()['hits'] == 1 and cache.get_stats()['misses'] == 1
@@ -0,0 +1,89 @@
+"""
+Tests unitaires pour le module score_merger
+"""
+from modules.score_merger import merge_scores
+
+
+def create_page(parts_measures, title=None):
+    """Crée une page: liste de parties, chacune avec une liste de mesures (notes)"""
+    return {
+        'metadata': {'title': title, 'time_signature': '4/4'},
+        'parts': [
+            {
+                'id': f"P{index + 1}",
+                'measures': [
+                    {'number': number + 1, 'notes': notes}
+                    for number, notes in enumerate(measures)
+                ]
+            }
+            for index, measures in enumerate(parts_measures)
+        ],
+        'source_file': 'page.mxl'
+    }
+
+
+def note(step, duration=4):
+    """Crée une note simple"""
+    return {'type': 'note', 'pitch': {'step': step, 'octave': 4, 'alter': 0}, 'duration': duration}
+
+
+def test_merge_renumbers_measures():
+    """Les mesures sont renumérotées en continu sur toutes les pages"""
+    page1 = create_page([[[note('C')], [note('D')]]], title='Titre')
+    page2 = create_page([[[note('E')], [note('F')], [note('G')]]])
+
+    merged = merge_scores([page1, page2])
+
+    measures = merged['parts'][0]['measures']
+    assert [m['number'] for m in measures] == [1, 2, 3, 4, 5]
+    assert [m['notes'][0]['pitch']['step'] for m in measures] == ['C', 'D', 'E', 'F', 'G']
+    assert merged['metadata']['title'] == 'Titre'
+    assert merged['pages'] == 2
+
+
+def test_merge_keeps_parts_aligned():
+    """Une partie absente ou plus courte est complétée par des silences"""
+    page1 = create_page([[[note('C')], [note('D')]], [[note('E', 8)], [note('F', 8)]]])
+    page2 = create_page([[[note('G'), note('A')]]])
+
+    merged = merge_scores([page1, page2])
+
+    assert len(merged['parts']) == 2
+    assert len(merged['parts'][0]['measures']) == len(merged['parts'][1]['measures']) == 3
+
+    padding = merged['parts'][1]['measures'][2]
+    assert padding['number'] == 3
+    assert padding['notes'] == [{'type': 'rest', 'duration': 8, 'note_type': 'whole'}]
+
+
+def test_merge_skips_failed_pages():
+    """Les pages en échec ne sont pas fusionnées"""
+    page = create_page([[[note('C')]]])
+
+    assert merge_scores([None, page])['parts'][0]['measures'][0]['number'] == 1
+    assert merge_scores([None, None]) is None
+
+
+def test_merge_aligns_parts_by_id():
+    """Les parties sont alignées par identifiant, pas par position dans la page"""
+    page1 = create_page([[[note('C')]], [[note('E', 8)]]])
+    page2 = create_page([[[note('D')]]])
+    page2['parts'][0]['id'] = 'P2'
+
+    merged = merge_scores([page1, page2])
+
+    assert [part['id'] for part in merged['parts']] == ['P1', 'P2']
+    assert merged['parts'][1]['measures'][1]['notes'][0]['pitch']['step'] == 'D'
+    assert merged['parts'][0]['measures'][1]['notes'][0]['type'] == 'rest'
+
+
+def test_merge_reports_failed_pages():
+    """Les pages non lues sont signalées, les pages sans musique simplement ignorées"""
+    page = create_page([[[note('C')]]])
+    blank = {'metadata': {}, 'parts': []}
+
+    merged = merge_scores([page, None, blank, page])
+
+    assert merged['failed_pages'] == [2]
+    assert [m['number'] for m in merged['parts'][0]['measures']] == [1, 2]
+    assert merge_scores([page, blank])['failed_pages'] == []